@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# rates_loader.py - Loads the case 1 real interest rates and the fed funds target
+# in force at every tick as aligned NumPy arrays, read through lib.data_store
+
+from typing import List, NamedTuple, Sequence
+
+import numpy as np
+
+from lib.data_store import open_dataset
+from lib.rate_filter import DEFAULT_DATA_DIR, target_paths
+
+CURRENCIES = ["HAP", "ROR", "USD"]
+
+
+class RateSeries(NamedTuple):
+    """The real rate and target of every currency, one row per tick"""
+
+    time: np.ndarray
+    # (ticks x currencies), columns in the order of currencies
+    real: np.ndarray
+    target: np.ndarray
+    currencies: List[str]
+
+
+def load_rate_series(
+    data_dir: str = DEFAULT_DATA_DIR, currencies: Sequence[str] = CURRENCIES
+) -> RateSeries:
+    """
+    The aligned series of data_dir, read through the columnar store (see
+    lib.data_store), so the CSVs are only parsed the first time or after they
+    change. Targets are filled in against the Time column of
+    interest_rates.csv, whatever times it holds.
+
+    Args:
+        data_dir (str): The case 1 data directory
+        currencies (Sequence[str]): The currencies to load, in column order
+
+    Returns:
+        RateSeries: The series, one row per tick of interest_rates.csv
+    """
+    dataset = open_dataset(data_dir)
+    rates = dataset.table("interest_rates")
+    announcements = dataset.table("announcements")
+    time = rates["Time"]
+    return RateSeries(
+        time,
+        np.column_stack([rates[currency] for currency in currencies]),
+        target_paths(
+            len(time),
+            zip(
+                announcements["Time"].tolist(),
+                announcements["Currency"].tolist(),
+                announcements["RateTarget"].tolist(),
+            ),
+            currencies,
+            time,
+        ),
+        list(currencies),
+    )
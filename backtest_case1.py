@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# backtest_case1.py - Replays the case 1 interest rates and fed funds target
+# announcements through PositionTrackerBot on a simulated clock
+#
+# Run from the repository root: python backtest_case1.py
+
+import argparse
+import asyncio
+import os
+import time
+
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from case1 import (
+    EXPIRY_DAYS,
+    LAST_RATE_HAP_USD,
+    LAST_RATE_ROR_USD,
+    TICKS_PER_DAY,
+    DAYS_IN_YEAR,
+    TICKS,
+    PositionTrackerBot,
+)
+from lib.backtest import (
+    BacktestResult,
+    SimulatedClock,
+    SyntheticMarketMaker,
+    finish_round,
+    quiet,
+    start_in_process,
+    wait_handled,
+)
+from lib.data_store import DEFAULT_STORE_DIR, open_dataset
+from lib.local_exchange import CASE_ASSETS, CASE_LIMITS, LocalExchange
+from lib.transport import InProcessTransport
+from lib.utc_bot import UTCBot
+
+DEFAULT_DATA_DIR = os.path.join("xchange", "xchange-v1.1.1", "data", "case1")
+
+CURRENCIES = ["ROR", "HAP", "USD"]
+
+
+class Case1Data(NamedTuple):
+    """The rates of every tick and the target announcements of a case 1 round"""
+
+    # (ticks x 3) gross annual rates, columns in CURRENCIES order
+    rates: np.ndarray
+    # (time, currency, target) sorted by time
+    announcements: List[Tuple[int, str, float]]
+
+
+def load_case1_data(
+    data_dir: str = DEFAULT_DATA_DIR, store_dir: str = DEFAULT_STORE_DIR
+) -> Case1Data:
+    """Load a case 1 data directory through its columnar file (see lib.data_store)"""
+    dataset = open_dataset(data_dir, store_dir)
+    rates = dataset.table("interest_rates")
+    announcements = dataset.table("announcements")
+    return Case1Data(
+        np.column_stack([rates[c] for c in CURRENCIES]),
+        sorted(
+            zip(
+                announcements["Time"].tolist(),
+                announcements["Currency"].tolist(),
+                announcements["RateTarget"].tolist(),
+            )
+        ),
+    )
+
+
+def rates_message(tick: int, rates: np.ndarray) -> str:
+    """The generic message matched by case1.re_interest_rates"""
+    ror, hap, usd = map(float, rates)
+    return f"{tick}, {ror!r}, {hap!r}, {usd!r}"
+
+
+def target_message(currency: str, target: float) -> str:
+    """The generic message matched by case1.re_interest_rate_target"""
+    return f"{currency} NEW FEDERAL FUNDS TARGET {target!r}"
+
+
+def spot_paths(n_ticks: int, vol: float, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Driftless lognormal paths for the ROR/USD and HAP/USD spot rates"""
+    rng = np.random.default_rng(seed)
+    shocks = rng.normal(0.0, vol, size=(2, n_ticks))
+    shocks[:, 0] = 0.0
+    paths = np.exp(np.cumsum(shocks - vol * vol / 2, axis=1))
+    return LAST_RATE_ROR_USD * paths[0], LAST_RATE_HAP_USD * paths[1]
+
+
+def futures_fairs(
+    tick: int, rates: np.ndarray, ror_usd: float, hap_usd: float
+) -> Dict[str, float]:
+    """
+    Interest rate parity prices of every future: 6R is ROR in USD, 6H is HAP in
+    USD and RH is HAP in ROR
+    """
+    ror, hap, usd = rates
+    day = tick / TICKS_PER_DAY
+    fairs = {"RORUSD": ror_usd}
+    for month, expiry in EXPIRY_DAYS.items():
+        years = max(expiry - day, 0) / DAYS_IN_YEAR
+        fairs["6R" + month] = ror_usd * (usd / ror) ** years
+        fairs["6H" + month] = hap_usd * (usd / hap) ** years
+        fairs["RH" + month] = hap_usd / ror_usd * (ror / hap) ** years
+    return fairs
+
+
+async def run_backtest(
+    bot: UTCBot,
+    exchange: LocalExchange,
+    clock: SimulatedClock,
+    data: Case1Data,
+    spot_vol: float = 0.002,
+    seed: int = 0,
+    n_ticks: int = 0,
+    pnl_every: int = 10,
+) -> BacktestResult:
+    """
+    Run one simulated round. Each tick announces any new fed funds targets,
+    moves the synthetic market to the new parity prices, sends the rates and a
+    market snapshot, and waits for the bot to handle all of it before moving on.
+    """
+    started = time.perf_counter()
+    n_ticks = n_ticks or len(data.rates)
+    ror_usd, hap_usd = spot_paths(n_ticks, spot_vol, seed)
+    market_maker = SyntheticMarketMaker(exchange)
+
+    bot_task = await start_in_process(bot, exchange)
+
+    next_announcement = 0
+    for tick in range(n_ticks):
+        clock.now = tick
+        while (
+            next_announcement < len(data.announcements)
+            and data.announcements[next_announcement][0] <= tick
+        ):
+            _, currency, target = data.announcements[next_announcement]
+            exchange.broadcast_message(target_message(currency, target))
+            next_announcement += 1
+
+        market_maker.quote(
+            futures_fairs(tick, data.rates[tick], ror_usd[tick], hap_usd[tick])
+        )
+        exchange.broadcast_message(rates_message(tick, data.rates[tick]))
+        exchange.publish_snapshot()
+        if tick % pnl_every == 0:
+            exchange.publish_pnl()
+        await wait_handled(exchange, bot_task)
+
+    return await finish_round(bot_task, exchange, bot, started)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest PositionTrackerBot over the case 1 rate data"
+    )
+    parser.add_argument(
+        "--data", default=DEFAULT_DATA_DIR, help="The case 1 data directory"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the spot rate paths"
+    )
+    parser.add_argument(
+        "--spot-vol", type=float, default=0.002, help="Spot volatility per tick"
+    )
+    parser.add_argument(
+        "--ticks", type=int, default=0, help="Only run the first TICKS ticks"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Show the bot's output"
+    )
+    args = parser.parse_args()
+
+    data = load_case1_data(args.data)
+    clock = SimulatedClock()
+    exchange = LocalExchange(
+        CASE_ASSETS["case1"], clock=clock, position_limits=CASE_LIMITS["case1"]
+    )
+    bot = PositionTrackerBot(
+        "backtest", "password", "", 0, transport=InProcessTransport(exchange)
+    )
+
+    with quiet(not args.verbose):
+        result = asyncio.run(
+            run_backtest(
+                bot, exchange, clock, data, args.spot_vol, args.seed, args.ticks
+            )
+        )
+
+    print(f"M2M PnL:      {result.m2m_pnl:.6f}")
+    print(f"Realized PnL: {result.realized_pnl:.6f}")
+    print(f"Positions:    {result.positions}")
+    print(f"Fills:        {result.fills} (of {result.trades} trades)")
+    print(f"Elapsed:      {result.elapsed:.2f}s")
+    for kind, stats in bot.hook_stats.items():
+        print(
+            f"  {stats.hook:<24} {stats.calls:>7} calls "
+            f"{stats.seconds / stats.calls * 1e6:>9.1f}us each ({kind})"
+        )
+    graph = bot.graph
+    print(
+        f"Graph:        {graph.total_recomputed} nodes run over {graph.recomputes} "
+        f"updates ({graph.total_recomputed / max(graph.recomputes, 1):.2f} per update)"
+    )
+    for node, count in graph.counts.items():
+        if count:
+            print(f"  {node:<24} {count:>7} runs")
+    reactions = bot.reactions
+    if reactions.latencies:
+        latencies = np.array(reactions.latencies) * 1e6
+        print(
+            f"Reactions:    {reactions.hits} precomputed, {reactions.misses} missed; "
+            f"announcement to first order {np.median(latencies):.0f}us median, "
+            f"{latencies.max():.0f}us max"
+        )
+    quotes = bot.quotes.stats
+    print(
+        f"Quotes:       {quotes.placed} placed, {quotes.modified} modified, "
+        f"{quotes.cancelled} cancelled, {quotes.saved} requests saved"
+    )
+    for direction, stats in TICKS.cache_stats.items():
+        print(
+            f"  tick {direction:<19} {stats.hits + stats.misses:>7} lookups "
+            f"{stats.hit_rate:>9.1%} hits ({stats.size} cached)"
+        )
+
+
+if __name__ == "__main__":
+    main()
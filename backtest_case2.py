@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# backtest_case2.py - Runs a case 2 bot over every underlying path in the case 2
+# data, one path per worker process, and reports the distribution of its PnL
+#
+# Run from the repository root: python backtest_case2.py
+
+import argparse
+import asyncio
+import importlib
+import math
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from lib.backtest import (
+    SharedArray,
+    SimulatedClock,
+    SyntheticMarketMaker,
+    finish_round,
+    map_shared,
+    quiet,
+    share_array,
+    start_in_process,
+    wait_handled,
+)
+from lib.data_store import DEFAULT_STORE_DIR, open_dataset
+from lib.local_exchange import CASE_ASSETS, LocalExchange
+from lib.pricing import black_scholes
+from lib.transport import InProcessTransport
+from lib.utc_bot import UTCBot
+
+DEFAULT_DATA_DIR = os.path.join("xchange", "xchange-v1.1.1", "data", "case2")
+DEFAULT_BOT = "lib.example_bot_case2:Case2ExampleBot"
+
+OPTION_STRIKES = [90, 95, 100, 105, 110]
+CHAIN_ASSETS = [f"UC{strike}{flag}" for strike in OPTION_STRIKES for flag in "CP"]
+CHAIN_STRIKES = np.repeat(np.array(OPTION_STRIKES, dtype=float), 2)
+CHAIN_IS_CALL = np.tile([True, False], len(OPTION_STRIKES))
+
+# A round covers TRADING_DAYS days of the path, and the options expire
+# EXPIRY_DAYS trading days after the round starts
+TRADING_DAYS = 5
+EXPIRY_DAYS = 21
+DAYS_IN_YEAR = 252
+
+
+class PathResult(NamedTuple):
+    """How a bot did over one underlying path"""
+
+    path: int
+    m2m_pnl: float
+    realized_pnl: float
+    fills: int
+    elapsed: float
+
+
+def load_paths(
+    data_dir: str = DEFAULT_DATA_DIR, store_dir: str = DEFAULT_STORE_DIR
+) -> np.ndarray:
+    """
+    Map every pathN.csv in data_dir as a read-only (paths x ticks) array, row
+    N holding path N. The CSVs are converted to a columnar file in store_dir
+    the first time (see lib.data_store), after which loading is an mmap.
+    """
+    dataset = open_dataset(data_dir, store_dir)
+    if "path.UnderlyingPrice" not in dataset:
+        raise FileNotFoundError(f"No pathN.csv files in {data_dir}")
+    return dataset["path.UnderlyingPrice"]
+
+
+def realized_vol(path: np.ndarray) -> float:
+    """The annualized volatility of a path's log returns"""
+    ticks_per_year = (len(path) - 1) / TRADING_DAYS * DAYS_IN_YEAR
+    return float(np.diff(np.log(path)).std() * math.sqrt(ticks_per_year))
+
+
+def case2_fairs(spot: float, day: float, vol: float) -> Dict[str, float]:
+    """The fair price of the underlying and of every option"""
+    years = (EXPIRY_DAYS - day) / DAYS_IN_YEAR
+    theos = black_scholes(spot, CHAIN_STRIKES, CHAIN_IS_CALL, years, vol).price
+    fairs = {"UC": spot}
+    fairs.update(zip(CHAIN_ASSETS, theos.tolist()))
+    return fairs
+
+
+def day_message(day: float) -> str:
+    """The generic message Case2ExampleBot reads the current day from"""
+    return f"{day!r}"
+
+
+async def run_backtest(
+    bot: UTCBot,
+    exchange: LocalExchange,
+    clock: SimulatedClock,
+    path: np.ndarray,
+    market_vol: Optional[float] = None,
+    pnl_every: int = 10,
+) -> Tuple[float, float, int]:
+    """
+    Run one simulated round over an underlying path. Each tick moves the
+    synthetic market to Black-Scholes prices at the new underlying price, sends
+    the current day and a market snapshot, and waits for the bot to handle all
+    of it before moving on.
+
+    Args:
+        bot (UTCBot): A bot built with an InProcessTransport on exchange
+        exchange (LocalExchange): A case 2 exchange
+        clock (SimulatedClock): The clock of exchange
+        path (np.ndarray): The underlying price at every tick
+        market_vol (Optional[float]): The volatility the synthetic market prices
+        options at. Defaults to the realized volatility of the path
+        pnl_every (int): Send PnL messages every pnl_every ticks
+    """
+    started = time.perf_counter()
+    if market_vol is None:
+        market_vol = realized_vol(path)
+    market_maker = SyntheticMarketMaker(exchange, spread_ticks=2)
+    ticks_per_day = len(path) / TRADING_DAYS
+
+    bot_task = await start_in_process(bot, exchange)
+
+    for tick, spot in enumerate(path.tolist()):
+        clock.now = tick
+        day = tick / ticks_per_day
+        market_maker.quote(case2_fairs(spot, day, market_vol))
+        exchange.broadcast_message(day_message(day))
+        exchange.publish_snapshot()
+        if tick % pnl_every == 0:
+            exchange.publish_pnl()
+        await wait_handled(exchange, bot_task)
+
+    result = await finish_round(bot_task, exchange, bot, started)
+    return result.m2m_pnl, result.realized_pnl, result.fills
+
+
+###
+# Worker processes
+###
+
+# Set in each worker by _init_worker
+_paths: Optional[np.ndarray] = None
+_shm: Optional[shared_memory.SharedMemory] = None
+_bot_class = None
+_market_vol: Optional[float] = None
+
+
+def load_bot_class(spec: str) -> type:
+    """Import a bot class given as module:Class"""
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _init_worker(shared: SharedArray, bot_spec: str, market_vol: Optional[float]):
+    global _paths, _shm, _bot_class, _market_vol
+    # Map the parent's array instead of copying or re-reading the paths
+    _paths, _shm = map_shared(shared)
+    _bot_class = load_bot_class(bot_spec)
+    _market_vol = market_vol
+
+
+def _run_path(index: int) -> PathResult:
+    started = time.perf_counter()
+    clock = SimulatedClock()
+    exchange = LocalExchange(CASE_ASSETS["case2"], clock=clock)
+    bot = _bot_class(
+        "backtest", "password", "", 0, transport=InProcessTransport(exchange)
+    )
+    with quiet():
+        m2m_pnl, realized_pnl, fills = asyncio.run(
+            run_backtest(bot, exchange, clock, _paths[index], _market_vol)
+        )
+    return PathResult(
+        index, m2m_pnl, realized_pnl, fills, time.perf_counter() - started
+    )
+
+
+def run_all_paths(
+    paths: np.ndarray,
+    indices: List[int],
+    bot_spec: str = DEFAULT_BOT,
+    workers: Optional[int] = None,
+    market_vol: Optional[float] = None,
+) -> List[PathResult]:
+    """
+    Backtest a bot over the given rows of paths in a pool of worker
+    processes. Every worker maps paths read-only: straight from its file if
+    it is a whole np.memmap (as from load_paths), or else from shared memory
+    it is copied into once, so each path costs the same no matter how many
+    workers there are.
+
+    Args:
+        paths (np.ndarray): The (paths x ticks) array from load_paths
+        indices (List[int]): The rows of paths to run
+        bot_spec (str): The bot class to run, as module:Class
+        workers (Optional[int]): The number of processes. Defaults to one per CPU
+        market_vol (Optional[float]): See run_backtest
+
+    Returns:
+        List[PathResult]: One result per index, in the order of indices
+    """
+    with share_array(paths) as shared:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shared, bot_spec, market_vol),
+        ) as pool:
+            return list(pool.map(_run_path, indices))
+
+
+def parse_indices(spec: str, n_paths: int) -> List[int]:
+    """Parse a list of path numbers and ranges such as 0-9,20,30-39"""
+    if not spec:
+        return list(range(n_paths))
+    indices = []
+    for part in spec.split(","):
+        first, _, last = part.partition("-")
+        indices.extend(range(int(first), int(last or first) + 1))
+    for index in indices:
+        if not 0 <= index < n_paths:
+            raise ValueError(f"There is no path {index}")
+    return indices
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest a case 2 bot over every underlying path"
+    )
+    parser.add_argument(
+        "--data", default=DEFAULT_DATA_DIR, help="The case 2 data directory"
+    )
+    parser.add_argument(
+        "--bot", default=DEFAULT_BOT, help="The bot class to run, as module:Class"
+    )
+    parser.add_argument(
+        "--paths", default="", help="The paths to run, e.g. 0-9,20. Defaults to all"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "--market-vol",
+        type=float,
+        default=None,
+        help="Volatility the market prices options at (default: each path's own)",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Show the result of every path"
+    )
+    args = parser.parse_args()
+
+    paths = load_paths(args.data)
+    indices = parse_indices(args.paths, len(paths))
+
+    started = time.perf_counter()
+    results = run_all_paths(paths, indices, args.bot, args.workers, args.market_vol)
+    elapsed = time.perf_counter() - started
+
+    if args.verbose:
+        for result in results:
+            print(
+                f"path{result.path:<3d} m2m {result.m2m_pnl:12.2f}  "
+                f"realized {result.realized_pnl:12.2f}  fills {result.fills:6d}  "
+                f"{result.elapsed:.2f}s"
+            )
+
+    pnl = np.array([result.m2m_pnl for result in results])
+    p5, p25, p50, p75, p95 = np.percentile(pnl, [5, 25, 50, 75, 95])
+    print(f"Paths:        {len(results)}")
+    print(f"Mean PnL:     {pnl.mean():.2f} (std {pnl.std():.2f})")
+    print(f"Percentiles:  5% {p5:.2f}  25% {p25:.2f}  50% {p50:.2f}  ", end="")
+    print(f"75% {p75:.2f}  95% {p95:.2f}")
+    print(f"Worst / best: {pnl.min():.2f} / {pnl.max():.2f}")
+    print(f"Profitable:   {(pnl > 0).sum()} of {len(pnl)}")
+    print(
+        f"Elapsed:      {elapsed:.2f}s "
+        f"({sum(result.elapsed for result in results):.2f}s of backtesting)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# channel_latency.py - Compares order round trip latency with orders sharing the
+# update stream's gRPC channel against orders sent over dedicated channels, while
+# the exchange floods the stream with market snapshots.
+#
+# Run from the repository root: python -m benchmarks.channel_latency
+
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import statistics
+import time
+
+from grpclib.const import Cardinality, Handler
+from grpclib.server import Server
+
+import lib.proto.utc_bot as pb
+from lib.utc_bot import OrderRequest, UTCBot
+
+ASSETS = [i + j for i in ["6R", "6H", "RH"] for j in ["H", "M", "U", "Z"]] + ["RORUSD"]
+
+
+def flood_snapshot(depth: int) -> pb.FeedMessage:
+    """A snapshot with `depth` levels per side for every case 1 asset"""
+    levels = [
+        pb.MarketSnapshotMessageBookPriceLevel(f"{0.25 + i * 0.00001:.8f}", 10 + i)
+        for i in range(depth)
+    ]
+    return pb.FeedMessage(
+        market_snapshot_msg=pb.MarketSnapshotMessage(
+            books={
+                asset: pb.MarketSnapshotMessageBook(asset, levels, levels)
+                for asset in ASSETS
+            },
+            timestamp="0",
+        )
+    )
+
+
+class FloodingExchange:
+    """
+    A stand-in exchange whose update stream sends snapshots as fast as the
+    client reads them and which acknowledges every order immediately
+    """
+
+    def __init__(self, depth: int, rate: float):
+        self.snapshot = flood_snapshot(depth)
+        self.interval = 1 / rate if rate > 0 else 0
+        self.order_count = 0
+
+    async def stream_messages(self, stream):
+        await stream.recv_message()
+        while True:
+            await stream.send_message(self.snapshot)
+            # Let the server answer order requests between snapshots
+            await asyncio.sleep(self.interval)
+
+    async def place_order(self, stream):
+        await stream.recv_message()
+        self.order_count += 1
+        await stream.send_message(
+            pb.PlaceOrderResponse(ok=True, order_id=str(self.order_count))
+        )
+
+    def __mapping__(self):
+        return {
+            "/utc_bot.ExchangeService/StreamMessages": Handler(
+                self.stream_messages,
+                Cardinality.UNARY_STREAM,
+                pb.StreamMessagesRequest,
+                pb.FeedMessage,
+            ),
+            "/utc_bot.ExchangeService/PlaceOrder": Handler(
+                self.place_order,
+                Cardinality.UNARY_UNARY,
+                pb.PlaceOrderRequest,
+                pb.PlaceOrderResponse,
+            ),
+        }
+
+
+def serve(port: int, depth: int, rate: float):
+    async def run():
+        server = Server([FloodingExchange(depth, rate)])
+        await server.start("127.0.0.1", port)
+        await server.wait_closed()
+
+    asyncio.run(run())
+
+
+async def measure(port: int, order_channels: int, selection: str, args) -> dict:
+    bot = UTCBot(
+        "bench",
+        "password",
+        "127.0.0.1",
+        port,
+        order_channels=order_channels,
+        channel_selection=selection,
+    )
+    received = 0
+
+    async def consume():
+        nonlocal received
+        async for _ in bot._transport.stream_messages(bot.creds):
+            received += 1
+
+    consumer = asyncio.ensure_future(consume())
+    await asyncio.sleep(0.5)  # let the flood reach its steady state
+
+    order = OrderRequest("6RH", pb.OrderSpecType.LIMIT, pb.OrderSpecSide.BID, 1, 0.25)
+    latencies = []
+    for _ in range(args.orders):
+        start = time.perf_counter()
+        await bot.place_order(*order[:5])
+        latencies.append(time.perf_counter() - start)
+
+    batch_times = []
+    for _ in range(args.batches):
+        start = time.perf_counter()
+        await bot.submit_orders([order] * args.batch_size)
+        batch_times.append(time.perf_counter() - start)
+
+    consumer.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await consumer
+    bot.cleanup()
+
+    latencies.sort()
+    return {
+        "mean": statistics.mean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(len(latencies) * 0.99)],
+        "batch": statistics.mean(batch_times),
+        "snapshots": received,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=9191)
+    parser.add_argument("--depth", type=int, default=10, help="Levels per side")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Snapshots per second sent on the stream (0 sends as fast as the client reads)",
+    )
+    parser.add_argument("--orders", type=int, default=20)
+    parser.add_argument("--batches", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(
+        target=serve, args=(args.port, args.depth, args.rate), daemon=True
+    )
+    server.start()
+    time.sleep(1)
+
+    configs = [
+        (0, "round_robin"),
+        (1, "round_robin"),
+        (4, "round_robin"),
+        (4, "least_busy"),
+    ]
+    print(
+        f"{'channels':>8} {'selection':>12} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'batch ms':>9} {'snapshots':>10}"
+    )
+    try:
+        for order_channels, selection in configs:
+            r = asyncio.run(measure(args.port, order_channels, selection, args))
+            print(
+                f"{order_channels:>8} {selection:>12} {r['mean'] * 1e3:>8.3f} "
+                f"{r['p50'] * 1e3:>8.3f} {r['p99'] * 1e3:>8.3f} "
+                f"{r['batch'] * 1e3:>9.3f} {r['snapshots']:>10}"
+            )
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
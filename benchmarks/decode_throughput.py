@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# decode_throughput.py - Compares how many FeedMessages per second betterproto and
+# the hand-written decoder in lib/feed_decoder.py can decode, for market snapshots
+# of several depths and for a message that falls back to betterproto.
+#
+# Run from the repository root: python -m benchmarks.decode_throughput
+
+import argparse
+import time
+
+from typing import Callable
+
+import lib.proto.utc_bot as pb
+from benchmarks.channel_latency import flood_snapshot
+from lib.feed_decoder import decode_feed_message
+
+
+def throughput(decode: Callable[[bytes], object], data: bytes, seconds: float) -> float:
+    """Messages decoded per second, running decode for about `seconds`"""
+    count = 0
+    batch = 10
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        for _ in range(batch):
+            decode(data)
+        count += batch
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - started)
+
+
+def betterproto_decode(data: bytes) -> pb.FeedMessage:
+    return pb.FeedMessage().parse(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--depths",
+        type=int,
+        nargs="+",
+        default=[1, 5, 10],
+        help="Levels per side of the snapshots decoded",
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=1.0, help="How long to time each decoder"
+    )
+    args = parser.parse_args()
+
+    messages = [
+        (f"snapshot depth {depth}", bytes(flood_snapshot(depth)))
+        for depth in args.depths
+    ]
+    fill = pb.FeedMessage(
+        fill_msg=pb.FillMessage(
+            order_id="1", asset="6RH", price="0.25000000", filled_qty=10
+        )
+    )
+    messages.append(("fill (fallback)", bytes(fill)))
+
+    print(
+        f"{'message':>20} {'bytes':>7} {'betterproto/s':>14} {'fast/s':>10} {'speedup':>8}"
+    )
+    for name, data in messages:
+        slow = throughput(betterproto_decode, data, args.seconds)
+        fast = throughput(decode_feed_message, data, args.seconds)
+        print(
+            f"{name:>20} {len(data):>7} {slow:>14.0f} {fast:>10.0f} {fast / slow:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
 #!/usr/bin/env python
 
-from lib.utc_bot import UTCBot, start_bot
+from lib.utc_bot import OrderRequest, UTCBot, start_bot
+from lib.ticks import TickGrid
+from lib.book_store import BookStore
+from lib.feed_decoder import FlatSnapshot
+from lib.oms import OrderManager
+from lib.quotes import QuoteManager
+from lib.ladder import quote_ladder
+from lib.futures import Future, FuturesPricer
+from lib.dependency_graph import DependencyGraph
+from lib.reactions import ReactionTable
+from lib.rate_filter import RateFilter, load_params
 import lib.proto.utc_bot as pb
 import betterproto
 import math
@@ -12,7 +22,12 @@ import re
 import itertools as it
 
 import asyncio
+import functools
+import os
 import random
+import time
+
+import numpy as np
 
 """Constant listed from case packet"""
 DAYS_IN_YEAR = 252
@@ -34,35 +49,41 @@ TICK_SIZES = {
     "RHZ": 0.0001,
     "RORUSD": 0.00001,
 }
+"""Prices are held as integer ticks and only converted to strings at the exchange"""
+TICKS = TickGrid(TICK_SIZES)
 FUTURES = [i + j for i in ["6R", "6H", "RH"] for j in ["H", "M", "U", "Z"]]
+"""The (currency delivered, currency priced in) of each future: 6R is ROR in USD, 6H is HAP in USD, RH is HAP in ROR"""
+FUTURE_CURRENCIES = {"6R": ("ROR", "USD"), "6H": ("HAP", "USD"), "RH": ("HAP", "ROR")}
+CURRENCIES = ["ROR", "HAP", "USD"]
+
+"""Round structure assumed by the backtester: 2520 rate ticks make one 252 day year"""
+TICKS_PER_DAY = 10
+EXPIRY_DAYS = {"H": 63, "M": 126, "U": 189, "Z": 252}
 
 MAX_FUTURES = 100
 MAX_SPOTS = 10
 
-re_interest_rate_target = re.compile('([A-Z]+) NEW FEDERAL FUNDS TARGET ([0-9.]+)')
-re_interest_rates = re.compile('([0-9]+), ([0-9.]+), ([0-9.]+), ([0-9.]+)')
+"""Fed funds targets move in steps of TARGET_STEP; the futures requoted as soon as one is announced"""
+TARGET_STEP = 0.0025
+REACT_FUTURES = ["6RH"]
+
+"""
+Market making parameters: edge and max_width are in price, limit and size in contracts.
+sweep_case1.py overrides them per bot through PositionTrackerBot(params=...)
+"""
+DEFAULT_PARAMS = {"edge": 0.005, "max_width": 0.005, "limit": 100, "size": 10, "levels": 2}
 
-PriceLevel = co.namedtuple('PriceLevel', 'px qty')
+"""Calibrated by python -m lib.rate_filter; the filter's defaults are used if it is missing"""
+RATE_FILTER_PARAMS = "rate_filter.json"
 
-def round_nearest(x, tick=0.0001):
-    """Rounds price to nearest tick_number above"""
-    return round(round(x / tick) * tick, -int(math.floor(math.log10(tick))))
+re_interest_rate_target = re.compile('([A-Z]+) NEW FEDERAL FUNDS TARGET ([0-9.]+)')
+re_interest_rates = re.compile('([0-9]+), ([0-9.]+), ([0-9.]+), ([0-9.]+)')
 
 
 def daily_rate(daily_rate):
     """Finds daily interest rates from annual rate"""
     return math.pow(daily_rate, 1 / 252)
 
-def compute_avg(order_queue):
-    total_qty = 0
-    total_sum = 0
-    for order in order_queue:
-        total_qty += order.qty
-        total_sum += order.qty * order.px
-    if total_qty == 0:
-        return None
-    return total_sum / total_qty
-
 class PositionTrackerBot(UTCBot):
     """
     An example bot that tracks its position, implements linear fading,
@@ -70,69 +91,116 @@ class PositionTrackerBot(UTCBot):
     computed by itself vs what was computed by the exchange
     """
 
+    def __init__(self, *args, params=None, **kwargs):
+        """params overrides any of DEFAULT_PARAMS for this bot"""
+        super().__init__(*args, **kwargs)
+        self.param_overrides = dict(params or {})
+
     async def place_bids(self, asset, fair):
         """
-        Places and modifies a single bid, storing it by asset
-        based upon the basic market making functionality
+        Places and modifies the bids of one asset
+        based upon the basic market making functionality. fair is in ticks
         """
-        orders = self.basic_mm(
-            asset,
-            fair,
-            self.params["edge"],
-            self.params["size"],
-            self.params["limit"],
-            self.max_widths[asset],
-        )
-        for index, price in enumerate(orders["bid_prices"]):
-            if orders["bid_sizes"][index] != 0:
-                resp = await self.modify_order(
-                    self.bidorderid[asset][index],
-                    asset,
-                    pb.OrderSpecType.LIMIT,
-                    pb.OrderSpecSide.BID,
-                    orders["bid_sizes"][index],
-                    round_nearest(price, TICK_SIZES[asset]),
-                )
-                self.bidorderid[asset][index] = resp.order_id
+        ladder = self.ladders([asset], [fair])
+        await self.quote_side(asset, pb.OrderSpecSide.BID, ladder.bid_px[0], ladder.bid_qty[0])
 
     async def place_asks(self, asset, fair):
         """
-        Places and modifies a single bid, storing it by asset
-        based upon the basic market making functionality
+        Places and modifies the asks of one asset
+        based upon the basic market making functionality. fair is in ticks
         """
-        orders = self.basic_mm(
-            asset,
-            fair,
-            self.params["edge"],
-            self.params["size"],
-            self.params["limit"],
-            self.max_widths[asset],
+        ladder = self.ladders([asset], [fair])
+        await self.quote_side(asset, pb.OrderSpecSide.ASK, ladder.ask_px[0], ladder.ask_qty[0])
+
+    async def quote_futures(self):
+        """
+        Places and modifies the bids and asks of every future around self.fair,
+        computing all of their ladders at once
+        """
+        ladder = self.ladders(FUTURES, [self.fair[asset] for asset in FUTURES])
+        await self.quotes.quote_all(self.side_ladders(FUTURES, ladder))
+
+    async def quote_side(self, asset, side, prices, sizes):
+        """Quote one side of an asset's ladder (prices in ticks) through the quote manager"""
+        await self.quotes.quote(asset, side, self.wire_ladder(asset, prices, sizes))
+
+    def wire_ladder(self, asset, prices, sizes):
+        """The (price string, size) of each level of one side of a ladder in ticks"""
+        return [(TICKS.format(asset, px), size) for px, size in zip(prices.tolist(), sizes.tolist())]
+
+    def side_ladders(self, assets, ladder, first_row=0):
+        """
+        Both sides of the ladder of each asset, ready for quote_all. Row first_row + i of
+        the ladder is assets[i]
+        """
+        return [
+            side_ladder
+            for i, asset in enumerate(assets, first_row)
+            for side_ladder in (
+                (asset, pb.OrderSpecSide.BID, self.wire_ladder(asset, ladder.bid_px[i], ladder.bid_qty[i])),
+                (asset, pb.OrderSpecSide.ASK, self.wire_ladder(asset, ladder.ask_px[i], ladder.ask_qty[i])),
+            )
+        ]
+
+    def build_reactions(self):
+        """
+        Precompute the reaction to each plausible next fed funds target of each currency:
+        the ladders of the REACT_FUTURES that depend on it, priced as if its rate were
+        already at the target, and the RORUSD hedge of the current positions (see
+        spot_hedge). Every target of every currency is priced and laddered in one NumPy
+        pass, and kept in ticks
+        """
+        plans, fair_ticks, row = [], [], 0
+        for currency, assets in self.react_assets.items():
+            current = self.targets.get(currency, self.mkt_interest_rates.get(currency))
+            if current is None:
+                continue
+            targets = self.reactions.candidates(current)
+            fairs = self.pricer.scenario_fairs(currency, targets)[:, [self.pricer.index[asset] for asset in assets]]
+            if np.isnan(fairs).any():
+                continue
+            # One ladder row per (target, asset)
+            fair_ticks.append(np.rint(fairs / [TICK_SIZES[asset] for asset in assets]).ravel())
+            plans.append((currency, assets, targets, row))
+            row += fairs.size
+        if not plans:
+            return
+        # The hedge doesn't depend on the target, only on the positions going in
+        hedge = self.spot_hedge()
+        ladder = self.ladders(
+            [asset for _, assets, targets, _ in plans for asset in assets * len(targets)], np.concatenate(fair_ticks)
         )
-        for index, price in enumerate(orders["ask_prices"]):
-            if orders["ask_sizes"][index] != 0:
-                resp = await self.modify_order(
-                    self.askorderid[asset][index],
-                    asset,
-                    pb.OrderSpecType.LIMIT,
-                    pb.OrderSpecSide.ASK,
-                    orders["ask_sizes"][index],
-                    round_nearest(price, TICK_SIZES[asset]),
-                )
-                self.askorderid[asset][index] = resp.order_id
+        for currency, assets, targets, row in plans:
+            self.reactions.set(
+                currency, targets, [(assets, ladder, row + t * len(assets), hedge) for t in range(len(targets))]
+            )
+
+    async def react_to_target(self, currency, target):
+        """Send the precomputed reaction to an announced target, hedge included, as one batch"""
+        announced = time.perf_counter()
+        reaction = self.reactions.lookup(currency, target)
+        if reaction is None:
+            return
+        assets, ladder, first_row, hedge = reaction
+        self.reacted.update(assets)
+        if await self.quotes.quote_all(self.side_ladders(assets, ladder, first_row), [hedge] if hedge else ()):
+            self.reactions.record_latency(self.quotes.sent_at - announced)
 
     def evaluate_fairs(self):
         """
         Modify your long term fair values based on market updates, statistical calculations,
-        etc.
+        etc. Right now these are the interest rate parity prices of every future, in ticks,
+        from the latest rates, RORUSD mid and day of the round (see lib.futures.FuturesPricer)
         """
-        pass
+        for asset, fair in zip(FUTURES, self.pricer.fairs().tolist()):
+            if not math.isnan(fair):
+                self.fair[asset] = TICKS.to_ticks(asset, fair)
 
-    async def spot_market(self):
+    def spot_hedge(self):
         """
-        Interaction within the spot market primarily consists
-        of zeroing out the exposure to RORUSD exchange rates
-        as best as possible, using market orders (assume spot
-        market already is quite liquid)
+        The RORUSD market order that zeroes out the exposure to RORUSD exchange rates
+        as best as possible within MAX_SPOTS, or None if there is nothing to do.
+        Outside the limit, it only brings the spot position back inside it
         """
         net_position = self.pos["RORUSD"]
         for month in ["H", "M", "U", "Z"]:
@@ -141,129 +209,176 @@ class PositionTrackerBot(UTCBot):
         bids_left = MAX_SPOTS - self.pos["RORUSD"]
         asks_left = MAX_SPOTS + self.pos["RORUSD"]
         if bids_left <= 0:
-            resp = await self.place_order(
-                "RORUSD",
-                pb.OrderSpecType.MARKET,
-                pb.OrderSpecSide.ASK,
-                abs(bids_left),
-            )
+            side, qty = pb.OrderSpecSide.ASK, abs(bids_left)
         elif asks_left <= 0:
-            resp = await self.place_order(
-                "RORUSD",
-                pb.OrderSpecType.MARKET,
-                pb.OrderSpecSide.BID,
-                abs(asks_left),
-            )
+            side, qty = pb.OrderSpecSide.BID, abs(asks_left)
         elif net_position > 0:
-            resp = await self.place_order(
-                "RORUSD",
-                pb.OrderSpecType.MARKET,
-                pb.OrderSpecSide.ASK,
-                min(abs(net_position), asks_left),
-            )
+            side, qty = pb.OrderSpecSide.ASK, min(abs(net_position), asks_left)
         elif net_position < 0:
-            resp = await self.place_order(
-                "RORUSD",
-                pb.OrderSpecType.MARKET,
-                pb.OrderSpecSide.ASK,
-                min(abs(net_position), bids_left),
-            )
+            side, qty = pb.OrderSpecSide.BID, min(abs(net_position), bids_left)
+        else:
+            return None
+        if qty <= 0:
+            return None
+        return OrderRequest("RORUSD", pb.OrderSpecType.MARKET, side, qty)
 
-    def basic_mm(self, asset, fair, width, clip, max_pos, max_range):
+    async def spot_market(self):
         """
-        Asset - Asset name on exchange
-        Fair - Your prediction of the asset's true value
-        Width - Your spread when quoting, i.e. difference between bid price and ask price
-        Clip - Your maximum quote size on each level
-        Max_Pos - The maximum number of contracts you are willing to hold (we just use risk limit here)
-        Max_Range - The greatest you are willing to adjust your fair value by
+        Interaction within the spot market primarily consists
+        of zeroing out the exposure to RORUSD exchange rates
+        as best as possible, using market orders (assume spot
+        market already is quite liquid)
         """
+        hedge = self.spot_hedge()
+        if hedge is not None:
+            await self.place_order(*hedge[:4])
 
-        ##The rate at which you fade is optimized so that you reach your max position
-        ##at the same time you reach maximum range on the adjusted fair
-        fade = (max_range / 2.0) / max_pos
-        adjusted_fair = fair - self.pos[asset] * fade
+    def ladders(self, assets, fairs):
+        """
+        The basic market making ladder of each asset, computed for all of them in one
+        NumPy pass (see lib.ladder.quote_ladder). Each asset uses:
 
-        ##Best bid, best ask prices
-        bid_p = adjusted_fair - width / 2.0
-        ask_p = adjusted_fair + width / 2.0
+        Fair - Your prediction of the asset's true value
+        Width - Your spread when quoting, i.e. difference between bid price and ask price (self.edges)
+        Clip - Your maximum quote size on each level
+        Max_Pos - The maximum number of contracts you are willing to hold (we just use risk limit here)
+        Max_Range - The greatest you are willing to adjust your fair value by (self.max_widths)
 
-        ##Next best bid, ask price
-        bid_p2 = min(
-            adjusted_fair - clip * fade - width / 2.0, bid_p - TICK_SIZES[asset]
-        )
-        ask_p2 = min(
-            adjusted_fair + clip * fade + width / 2.0, ask_p + TICK_SIZES[asset]
+        Fair, Width and Max_Range are in ticks of the asset, and so are the quoted prices.
+        The rate at which you fade is optimized so that you reach your max position
+        at the same time you reach maximum range on the adjusted fair
+        """
+        return quote_ladder(
+            fairs,
+            [self.pos[asset] for asset in assets],
+            [self.edges[asset] for asset in assets],
+            self.params["size"],
+            self.params["limit"],
+            [self.max_widths[asset] for asset in assets],
+            self.params["levels"],
         )
 
-        ##Remaining ability to quote
-        bids_left = max_pos - self.pos[asset]
-        asks_left = max_pos + self.pos[asset]
-
-        if bids_left <= 0:
-            # reduce your position as you are violating risk limits!
-            ask_p = bid_p
-            ask_s = clip
-            ask_p2 = bid_p + TICK_SIZES[asset]
-            ask_s2 = clip
-            bid_s = 0
-            bid_s2 = 0
-        elif asks_left <= 0:
-            # reduce your position as you are violating risk limits!
-            bid_p = ask_p
-            bid_s = clip
-            bid_p2 = ask_p - TICK_SIZES[asset]
-            bid_s2 = clip
-            ask_s = 0
-            ask_s2 = 0
-        else:
-            # bid and ask size setting
-            bid_s = min(bids_left, clip)
-            bid_s2 = max(0, min(bids_left - clip, clip))
-            ask_s = min(asks_left, clip)
-            ask_s2 = max(0, min(asks_left - clip, clip))
-
-        return {
-            "asset": asset,
-            "bid_prices": [bid_p, bid_p2],
-            "bid_sizes": [bid_s, bid_s2],
-            "ask_prices": [ask_p, ask_p2],
-            "ask_sizes": [ask_s, ask_s2],
-            "adjusted_fair": adjusted_fair,
-            "fade": fade,
-        }
-
     async def handle_round_started(self):
         """
         Important variables below, some can be more dynamic to improve your case.
         Others are important to tracking pnl - cash, pos,
-        Bidorderid, askorderid track order information so we can modify existing
-        orders using the basic MM information (Right now only place 2 bids/2 asks max)
+        oms tracks our live orders so we can modify existing
+        orders using the basic MM information (params["levels"] bids/asks per asset)
         """
         self.cash = 0.0
         self.pos = {asset: 0 for asset in FUTURES + ["RORUSD"]}
         self.fair = {asset: 5 for asset in FUTURES + ["RORUSD"]}
         self.mid = {asset: None for asset in FUTURES + ["RORUSD"]}
-        self.max_widths = {asset: 0.005 for asset in FUTURES}
 
+        # Filtered latent rate and reverting target of each currency. Rates revert to
+        # their target within a few days, so the futures are priced at the target, and
+        # mkt_interest_rates (and the "rate:" graph inputs) hold that same rate
         self.mkt_interest_rates = {}
+        self.rate_filter = RateFilter(load_params(RATE_FILTER_PARAMS) if os.path.exists(RATE_FILTER_PARAMS) else None)
+        self.rate_estimates = {}
 
-        self.mkt_bids = {}
-        self.mkt_asks = {}
+        # Latest snapshot of every book; see BookStore.weighted_price for depth-weighted prices
+        self.book = BookStore(FUTURES + ["RORUSD"], TICKS)
         #self.mkt_interest_rates = {}
 
+        # Interest rate parity fairs of every future, refreshed only when a rate, spot
+        # or the day changes. There is no HAPUSD book, so HAP stays at its last rate
+        self.pricer = FuturesPricer(
+            {
+                asset: Future(*FUTURE_CURRENCIES[asset[:2]], EXPIRY_DAYS[asset[2]])
+                for asset in FUTURES
+            },
+            DAYS_IN_YEAR,
+        )
+        self.pricer.set_spot("ROR", LAST_RATE_ROR_USD)
+        self.pricer.set_spot("HAP", LAST_RATE_HAP_USD)
+
+        # What each update affects: books, rates, the day, our position and orders feed the
+        # top of book, spot, fair and quoting nodes, and graph.recompute() reruns only
+        # the nodes downstream of what changed since the last update
+        self.graph = DependencyGraph()
+        for asset in FUTURES + ["RORUSD"]:
+            self.graph.add_input("book:" + asset)
+            self.graph.add_input("orders:" + asset)
+        for asset in ["6RH", "RORUSD"]:
+            self.graph.add_node("top:" + asset, functools.partial(self.top_of_book, asset), ["book:" + asset])
+        for currency in CURRENCIES:
+            self.graph.add_input("rate:" + currency)
+            self.graph.add_input("target:" + currency)
+        self.graph.add_input("day")
+        self.graph.add_input("position")
+        self.graph.add_node("spot:ROR", self.update_spot, ["top:RORUSD"])
+        self.graph.add_node("fairs", self.evaluate_fairs, ["spot:ROR", "rate:ROR", "rate:HAP", "rate:USD", "day"])
+        self.graph.add_node(
+            "arb:6RH",
+            self.update_rorusd_6r,
+            ["top:6RH", "top:RORUSD", "rate:ROR", "rate:USD", "orders:6RH"],
+            cutoff=False,
+        )
+        # Between announcements, keep a ready reaction to every plausible next target
+        self.targets = {}
+        self.reactions = ReactionTable(TARGET_STEP)
+        # Assets quoted by a reaction, which other quoting leaves alone until the next
+        # rates update so the reaction isn't replaced by a different pricing model
+        self.reacted = set()
+        self.react_assets = {
+            currency: [asset for asset in REACT_FUTURES if currency in FUTURE_CURRENCIES[asset[:2]]]
+            for currency in CURRENCIES
+        }
+        self.react_assets = {currency: assets for currency, assets in self.react_assets.items() if assets}
+        self.graph.add_node(
+            "reactions",
+            self.build_reactions,
+            ["spot:ROR", "day", "position"] + ["rate:" + c for c in CURRENCIES] + ["target:" + c for c in CURRENCIES],
+            cutoff=False,
+        )
 
-        self.bidorderid = {asset: ["", ""] for asset in FUTURES}
-        self.askorderid = {asset: ["", ""] for asset in FUTURES}
+        # Our live orders, by (asset, side, level) of the basic MM ladder, and
+        # what moves them to each new ladder without resending unchanged levels
+        self.oms = OrderManager()
+        self.quotes = QuoteManager(self, self.oms)
 
         """
         Constant params with respect to assets. Modify this is you would like to change
         parameters based on asset
         """
-        self.params = {"edge": 0.005, "limit": 100, "size": 10, "spot_limit": 10}
+        self.params = {**DEFAULT_PARAMS, **self.param_overrides}
+        self.edges = {asset: TICKS.to_ticks(asset, self.params["edge"]) for asset in FUTURES}
+        self.max_widths = {asset: TICKS.to_ticks(asset, self.params["max_width"]) for asset in FUTURES}
+
+
+
 
+    def top_of_book(self, asset):
+        """Best bid and ask in ticks; the quoting below only looks this deep"""
+        return self.book.best_bid(asset), self.book.best_ask(asset)
 
+    def update_spot(self):
+        """Update the pricer's ROR spot from the RORUSD mid, returning the mid"""
+        bid, ask = self.book.best_bid("RORUSD"), self.book.best_ask("RORUSD")
+        if bid is None or ask is None:
+            return None
+        mid = TICKS.to_price("RORUSD", (bid + ask) / 2)
+        self.pricer.set_spot("ROR", mid)
+        return mid
 
+    def set_rate(self, currency, estimate):
+        """Price a currency's futures, parity arb included, at its filtered target"""
+        self.rate_estimates[currency] = estimate
+        self.mkt_interest_rates[currency] = estimate.target
+        self.pricer.set_rate(currency, estimate.target)
+        self.graph.set("rate:" + currency, estimate.target)
+
+    def mark_orders(self, asset):
+        """Our orders in an asset changed, so requote it on the next update"""
+        if "orders:" + asset in self.graph:
+            self.graph.mark("orders:" + asset)
+
+    async def update_rorusd_6r(self):
+        if "6RH" in self.reacted:
+            return
+        await self.update_rorusd_6r_high()
+        await self.update_rorusd_6r_low()
 
     async def update_rorusd_6r_high(self):
         # trading on 6RH for now. How far out do we want to trade?
@@ -276,30 +391,19 @@ class PositionTrackerBot(UTCBot):
         fair_ratio = (1 + self.mkt_interest_rates['USD']) / (1 + self.mkt_interest_rates['ROR'])
         print("  fair ratio",fair_ratio)
 
-        #print(self.mkt_asks.keys(), self.mkt_bids.keys())
-        if '6RH' not in self.mkt_asks or 'RORUSD' not in self.mkt_bids:
-            print("6r/rorusd  not given. returning...")
-            return
-
-        bid_6r_all = self.mkt_bids['6RH']
-        ask_rorusd_all = self.mkt_asks['RORUSD']
-
-        if len(bid_6r_all) == 0 or len(ask_rorusd_all) == 0:
-            print("bid or ask queue empty. returning...")
-            return
-
-        bid_6r = bid_6r_all[0] # choose closest to center of bid-ask spread
-        ask_rorusd = ask_rorusd_all[0]
+        bid_6r = self.book.best_bid('6RH') # choose closest to center of bid-ask spread
+        ask_rorusd = self.book.best_ask('RORUSD')
         if bid_6r is None or ask_rorusd is None:
-            print("is none. returning...")
+            print("bid or ask queue empty. returning...")
             return
 
-
-        actual_ratio = bid_6r[0] / ask_rorusd[0]
+        bid_6r_px = TICKS.to_price('6RH', bid_6r)
+        ask_rorusd_px = TICKS.to_price('RORUSD', ask_rorusd)
+        actual_ratio = bid_6r_px / ask_rorusd_px
         print("  actual_ratio",actual_ratio)
         if actual_ratio > fair_ratio:
-            print("placing asks",bid_6r[0] / fair_ratio)
-            await self.place_asks('6RH', ask_rorusd[0] * fair_ratio)
+            print("placing asks",bid_6r_px / fair_ratio)
+            await self.place_asks('6RH', TICKS.to_ticks('6RH', ask_rorusd_px * fair_ratio))
 
     async def update_rorusd_6r_low(self):
         print("\ncalculating orders LOW")
@@ -309,88 +413,103 @@ class PositionTrackerBot(UTCBot):
         # 6R / RORUSD
         fair_ratio = (1 + self.mkt_interest_rates['USD']) / (1 + self.mkt_interest_rates['ROR'])
 
-        if '6RH' not in self.mkt_asks or 'RORUSD' not in self.mkt_bids:
-            print("6r/rorusd  not given. returning...")
-            return
-
-        ask_6r_all = self.mkt_asks['6RH']
-        bid_rorusd_all = self.mkt_bids['RORUSD']
-
-        if len(bid_rorusd_all) == 0 or len(ask_6r_all) == 0:
+        ask_6r = self.book.best_ask('6RH')
+        bid_rorusd = self.book.best_bid('RORUSD')
+        if bid_rorusd is None or ask_6r is None:
             print("bid or ask queue empty. returning...")
             return
 
-        ask_6r = ask_6r_all[0]
-        bid_rorusd = bid_rorusd_all[0]
-
-        actual_ratio = ask_6r[0] / bid_rorusd[0]
+        ask_6r_px = TICKS.to_price('6RH', ask_6r)
+        bid_rorusd_px = TICKS.to_price('RORUSD', bid_rorusd)
+        actual_ratio = ask_6r_px / bid_rorusd_px
         print("  actual_ratio",actual_ratio)
         if actual_ratio < fair_ratio:
-            print("placing asks",bid_rorusd[0] / fair_ratio)
-            await self.place_bids('6RH', bid_rorusd[0] * fair_ratio)
-
-    async def handle_exchange_update(self, update: pb.FeedMessage):
-        kind, value = betterproto.which_one_of(update, "msg")
-        #print(value)
+            print("placing asks",bid_rorusd_px / fair_ratio)
+            await self.place_bids('6RH', TICKS.to_ticks('6RH', bid_rorusd_px * fair_ratio))
+
+    # Possible exchange updates each have a hook: on_snapshot, on_fill, on_liquidation,
+    # on_generic, on_trade, on_pnl, etc. Only the kinds with a hook are decoded
+
+    # Identify mid price through order book updates
+    async def on_snapshot(self, msg: pb.MarketSnapshotMessage):
+        changed = self.book.update(msg)
+        self.graph.mark(*("book:" + asset for asset in changed))
+        await self.graph.recompute()
+
+    # The same, straight from the fast decoder's arrays (fast_decode=True)
+    async def handle_flat_snapshot(self, snapshot: FlatSnapshot):
+        changed = self.book.update_flat(snapshot)
+        self.graph.mark(*("book:" + asset for asset in changed))
+        await self.graph.recompute()
+
+    # Competition event messages
+    async def on_generic(self, msg: pb.GenericMessage):
+        if msg.event_type == pb.GenericMessageType.MESSAGE:
+
+            match = re_interest_rates.fullmatch(msg.message)
+            if match is not None:
+                tick, ror, hap, usd = match.groups()
+                tick = int(tick)
+                self.reacted.clear()
+                self.pricer.set_day(tick / TICKS_PER_DAY)
+                self.graph.set("day", self.pricer.day)
+                for currency, observed in zip(CURRENCIES, (ror, hap, usd)):
+                    self.set_rate(currency, self.rate_filter.update(currency, tick, float(observed)))
+
+            match = re_interest_rate_target.fullmatch(msg.message)
+            if match is not None:
+                currency, target = match.group(1), float(match.group(2))
+                await self.react_to_target(currency, target)
+                self.targets[currency] = target
+                self.rate_filter.announce(currency, target)
+                # The announcement moves the filtered rate too, so reprice now
+                estimate = self.rate_filter.estimate(currency)
+                if estimate is not None:
+                    self.set_rate(currency, estimate)
+                self.graph.set("target:" + currency, target)
+
+            await self.graph.recompute()
+        #print(msg.message)
+        #await self.quote_futures()
+        #await self.spot_market()
 
-        # Possible exchange updates: 'market_snapshot_msg','fill_msg'
-        #'liquidation_msg','generic_msg', 'trade_msg', 'pnl_msg', etc.
-        """
-        Calculate PnL based upon market to market contracts and tracked cash 
-        """
-        if kind == "pnl_msg":
-            pass
-            #my_m2m = self.cash
-            #for asset in FUTURES + ["RORUSD"]:
-            #    my_m2m += (
-            #        self.mid[asset] * self.pos[asset]
-            #        if self.mid[asset] is not None
-            #        else 0
-            #    )
-            #print("M2M", update.pnl_msg.m2m_pnl, my_m2m)
-        # Update position upon fill messages of your trades
-        elif kind == "fill_msg":
-            pass
-            #if update.fill_msg.order_side == pb.FillMessageSide.BUY:
-            #    self.cash -= update.fill_msg.filled_qty * float(update.fill_msg.price)
-            #    self.pos[update.fill_msg.asset] += update.fill_msg.filled_qty
-            #else:
-            #    self.cash += update.fill_msg.filled_qty * float(update.fill_msg.price)
-            #    self.pos[update.fill_msg.asset] -= update.fill_msg.filled_qty
-            #self.evaluate_fairs()
-            #for asset in FUTURES:
-            #    await self.place_bids(asset)
-            #    await self.place_asks(asset)
-            #await self.spot_market()
-
-        # Identify mid price through order book updates
-        elif kind == "market_snapshot_msg":
-            for asset, book in value.books.items():
-                self.mkt_bids[asset] = [*map(fix_stupid_price_level, book.bids)]
-                self.mkt_asks[asset] = [*map(fix_stupid_price_level, book.asks)]
-
-            await self.update_rorusd_6r_high()
-            await self.update_rorusd_6r_low()
-
-        # Competition event messages
-        elif kind == "generic_msg":
-            if value.event_type == pb.GenericMessageType.MESSAGE:
-
-                match = re_interest_rates.fullmatch(value.message)
-                if match is not None:
-                    _, ror, hap, usd = match.groups()
-                    self.mkt_interest_rates['ROR'] = float(ror)
-                    self.mkt_interest_rates['HAP'] = float(hap)
-                    self.mkt_interest_rates['USD'] = float(usd)
-
-                await self.update_rorusd_6r_high()
-                await self.update_rorusd_6r_low()
-            #print(update.generic_msg.message)
-            #self.evaluate_fairs()
-            #for asset in FUTURES:
-            #    await self.place_bids(asset)
-            #    await self.place_asks(asset)
-            #await self.spot_market()
+    """
+    Calculate PnL based upon market to market contracts and tracked cash
+    """
+    #async def on_pnl(self, msg: pb.PnLMessage):
+    #    my_m2m = self.cash
+    #    for asset in FUTURES + ["RORUSD"]:
+    #        my_m2m += (
+    #            self.mid[asset] * self.pos[asset]
+    #            if self.mid[asset] is not None
+    #            else 0
+    #        )
+    #    print("M2M", msg.m2m_pnl, my_m2m)
+
+    # Keep the OMS current with fills, cancels and failed requests of our orders
+    async def on_cancelled(self, msg: pb.OrderCancelledMessage):
+        self.oms.on_cancelled(msg)
+        self.mark_orders(msg.asset)
+
+    async def on_request_failed(self, msg: pb.RequestFailedMessage):
+        self.oms.on_request_failed(msg)
+
+    # Update position upon fill messages of your trades
+    async def on_fill(self, msg: pb.FillMessage):
+        self.oms.on_fill(msg)
+        if msg.order_side == pb.FillMessageSide.BUY:
+            self.cash -= msg.filled_qty * float(msg.price)
+            self.pos[msg.asset] += msg.filled_qty
+        else:
+            self.cash += msg.filled_qty * float(msg.price)
+            self.pos[msg.asset] -= msg.filled_qty
+        # The ladders fade with the position, so requote the asset, and the reactions'
+        # ladders and hedge were built for the old position
+        self.mark_orders(msg.asset)
+        self.graph.mark("position")
+    #    self.evaluate_fairs()
+    #    await self.quote_futures()
+    #    await self.spot_market()
 
     #async def handle_round_started(self):
     #    
@@ -400,8 +519,5 @@ class PositionTrackerBot(UTCBot):
     #async def handle_exchange_update(self, update: pb.FeedMessage):
     #    pass
 
-def fix_stupid_price_level(lvl):
-    return PriceLevel(px=float(lvl.px), qty=lvl.qty)
-
 if __name__ == "__main__":
     start_bot(PositionTrackerBot)
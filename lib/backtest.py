@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# backtest.py - Pieces shared by the backtesters: a simulated clock, synthetic
+# liquidity, running a bot against a LocalExchange in the same process and
+# sharing market data with worker processes
+
+import asyncio
+import contextlib
+import mmap
+import os
+import time
+
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import lib.proto.utc_bot as pb
+from lib.local_exchange import LocalExchange
+from lib.matching_engine import ASK, BID
+from lib.utc_bot import UTCBot
+
+
+class SimulatedClock:
+    """A clock that only moves when the backtest advances it"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class BacktestResult(NamedTuple):
+    """How a bot did over a simulated round"""
+
+    m2m_pnl: float
+    realized_pnl: float
+    positions: Dict[str, int]
+    fills: int
+    trades: int
+    elapsed: float
+
+
+class SyntheticMarketMaker:
+    """
+    A competitor that provides background liquidity by quoting a ladder of
+    levels on both sides of a fair price for each asset. Its quotes are
+    replaced on every call to quote, and it never opens an update stream so
+    no feed messages are built for it.
+    """
+
+    def __init__(
+        self,
+        exchange: LocalExchange,
+        levels: int = 3,
+        spread_ticks: int = 4,
+        qty: int = 20,
+        username: str = "synthetic_mm",
+    ):
+        """
+        Args:
+            exchange (LocalExchange): The exchange to quote on
+            levels (int): The number of price levels quoted per side
+            spread_ticks (int): The distance in ticks from the fair price to the
+            best bid and best ask
+            qty (int): The quantity quoted at each level
+            username (str): The name the market maker registers under
+        """
+        self.exchange = exchange
+        self.levels = levels
+        self.spread_ticks = spread_ticks
+        self.qty = qty
+        self.creds = pb.Credentials(username, "")
+        exchange.register(self.creds)
+
+        self._quotes: Dict[str, List[str]] = {}
+
+    def quote(self, fairs: Dict[str, float]):
+        """Replace the quotes of every asset in fairs around its fair price"""
+        username = self.creds.username
+        for asset, fair in fairs.items():
+            for order_id in self._quotes.get(asset, ()):
+                self.exchange.withdraw(username, order_id)
+
+            book = self.exchange.books[asset]
+            center = int(round(fair / book.tick_size))
+            ids = []
+            for level in range(self.levels):
+                offset = self.spread_ticks + level
+                for side, tick in ((BID, center - offset), (ASK, center + offset)):
+                    if 0 < tick < book.n_ticks:
+                        ids.append(
+                            self.exchange.place_limit(
+                                username, asset, side, tick, self.qty
+                            )
+                        )
+            self._quotes[asset] = ids
+
+
+async def start_in_process(bot: UTCBot, exchange: LocalExchange) -> "asyncio.Task":
+    """
+    Start a bot built with an InProcessTransport on exchange, start trading and
+    return the bot's task once its update stream is open
+    """
+    task = asyncio.ensure_future(bot.start())
+    username = bot.creds.username
+    while username not in exchange.competitors:
+        await _check_alive(task)
+    exchange.start_trading()
+    while exchange.competitors[username].feed is None:
+        await _check_alive(task)
+    return task
+
+
+async def _check_alive(task: "asyncio.Task"):
+    await asyncio.sleep(0)
+    if task.done():
+        # Surface the bot's exception (or a premature exit) instead of hanging
+        task.result()
+        raise RuntimeError("Bot stopped before its update stream was opened")
+
+
+async def wait_handled(exchange: LocalExchange, bot_task: "asyncio.Task"):
+    """
+    Wait for the bot to handle every queued update, raising if the bot task
+    stops (e.g. its handler raised) instead of waiting forever
+    """
+    handled = asyncio.ensure_future(exchange.wait_handled())
+    await asyncio.wait({handled, bot_task}, return_when=asyncio.FIRST_COMPLETED)
+    if not handled.done():
+        handled.cancel()
+        bot_task.result()
+        raise RuntimeError("Bot stopped before the round ended")
+
+
+async def finish_round(
+    bot_task: "asyncio.Task", exchange: LocalExchange, bot: UTCBot, started: float
+) -> BacktestResult:
+    """
+    End the round, wait for the bot to exit and report how it did
+
+    Args:
+        bot_task (asyncio.Task): The task returned by start_in_process
+        exchange (LocalExchange): The exchange the bot traded on
+        bot (UTCBot): The bot
+        started (float): time.perf_counter() when the backtest started
+    """
+    exchange.end_round()
+    await bot_task
+    competitor = exchange.competitors[bot.creds.username]
+    return BacktestResult(
+        m2m_pnl=exchange.m2m_pnl(competitor),
+        realized_pnl=competitor.realized_pnl,
+        positions={asset: pos for asset, pos in competitor.positions.items() if pos},
+        fills=competitor.fill_count,
+        trades=exchange.trade_count,
+        elapsed=time.perf_counter() - started,
+    )
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """Silence whatever the bot prints while the backtest runs"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+class SharedArray(NamedTuple):
+    """
+    Where a worker process finds an array shared by its parent: a file
+    ("file", path, offset) or a shared memory block ("shm", name, 0)
+    """
+
+    kind: str
+    name: str
+    offset: int
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+@contextlib.contextmanager
+def share_array(array: np.ndarray) -> Iterator[SharedArray]:
+    """
+    Share an array with worker processes for the duration of the block. A
+    whole np.memmap (as from lib.data_store) is shared as its file; anything
+    else is copied once into a shared memory block, freed afterwards.
+    """
+    # A slice of a memmap is a memmap too, but only a whole one maps the file
+    # from its offset
+    if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap):
+        yield SharedArray(
+            "file", array.filename, array.offset, array.shape, array.dtype.str
+        )
+        return
+
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    shared[:] = array
+    try:
+        yield SharedArray("shm", shm.name, 0, array.shape, array.dtype.str)
+    finally:
+        del shared
+        shm.close()
+        shm.unlink()
+
+
+def map_shared(
+    shared: SharedArray,
+) -> Tuple[np.ndarray, Optional[shared_memory.SharedMemory]]:
+    """
+    Map an array shared by share_array, read-only. Keep the returned shared
+    memory block (None for a file) referenced for as long as the array is used.
+    """
+    if shared.kind == "file":
+        array = np.memmap(
+            shared.name,
+            dtype=shared.dtype,
+            mode="r",
+            offset=shared.offset,
+            shape=shared.shape,
+        )
+        return array, None
+    shm = shared_memory.SharedMemory(name=shared.name)
+    array = np.ndarray(shared.shape, dtype=shared.dtype, buffer=shm.buf)
+    array.flags.writeable = False
+    return array, shm
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# book_store.py - The latest market snapshot of every asset, held in preallocated
+# NumPy arrays that are overwritten in place
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import lib.proto.utc_bot as pb
+from lib.feed_decoder import FlatSnapshot
+from lib.ticks import TickGrid
+
+BID = 0
+ASK = 1
+
+
+class BookStore:
+    """
+    The top levels of the book of every asset, as a struct of arrays: px[side]
+    and qty[side] are (assets x depth) arrays with prices in ticks, filled from
+    the best level outwards, and n_levels[side] counts the valid levels of each
+    asset. Snapshots overwrite the arrays in place, so handling one allocates
+    no per-level objects, and all accessors are array reads.
+
+    Levels beyond depth are dropped.
+    """
+
+    def __init__(self, assets: List[str], ticks: TickGrid, depth: int = 10):
+        """
+        Args:
+            assets (List[str]): The assets to keep books for
+            ticks (TickGrid): Converts the prices of every asset to ticks
+            depth (int): The number of levels kept per side
+        """
+        self.assets = list(assets)
+        self.index = {asset: i for i, asset in enumerate(self.assets)}
+        self.ticks = ticks
+        self.depth = depth
+        # For converting the float prices of FlatSnapshots, as TickGrid.to_ticks
+        self._tick_sizes = np.array([ticks.tick_sizes[asset] for asset in self.assets])
+
+        self.px = np.zeros((2, len(self.assets), depth), dtype=np.int64)
+        self.qty = np.zeros((2, len(self.assets), depth), dtype=np.int64)
+        self.n_levels = np.zeros((2, len(self.assets)), dtype=np.int64)
+
+    def update(self, snapshot: pb.MarketSnapshotMessage) -> List[str]:
+        """
+        Overwrite the books of every tracked asset in a snapshot
+
+        Returns:
+            List[str]: The assets whose books changed
+        """
+        changed = []
+        for asset, book in snapshot.books.items():
+            i = self.index.get(asset)
+            if i is not None:
+                bids = self._update_side(BID, i, asset, book.bids)
+                asks = self._update_side(ASK, i, asset, book.asks)
+                if bids or asks:
+                    changed.append(asset)
+        return changed
+
+    def update_flat(self, snapshot: FlatSnapshot) -> List[str]:
+        """
+        Overwrite the books of every tracked asset in a snapshot from the fast
+        decoder, converting its price array to ticks in one pass instead of
+        formatting and parsing a string per level
+
+        Returns:
+            List[str]: The assets whose books changed
+        """
+        books = np.array(
+            [self.index.get(a, -1) for a in snapshot.assets], dtype=np.int64
+        )
+        tracked = books[books >= 0]
+        if not len(tracked):
+            return []
+
+        rows = books[snapshot.asset]
+        keep = (rows >= 0) & (snapshot.level < self.depth)
+        rows, side, level = rows[keep], snapshot.side[keep], snapshot.level[keep]
+        px = np.zeros_like(self.px)
+        qty = np.zeros_like(self.qty)
+        n_levels = np.zeros_like(self.n_levels)
+        px[side, rows, level] = np.rint(snapshot.px[keep] / self._tick_sizes[rows])
+        qty[side, rows, level] = snapshot.qty[keep]
+        np.maximum.at(n_levels, (side, rows), level + 1)
+
+        # Compare only the valid levels; the arrays past n_levels are stale
+        valid = np.arange(self.depth) < n_levels[:, tracked, None]
+        differs = (px[:, tracked] != self.px[:, tracked]) | (
+            qty[:, tracked] != self.qty[:, tracked]
+        )
+        changed = tracked[
+            (n_levels[:, tracked] != self.n_levels[:, tracked]).any(axis=0)
+            | (differs & valid).any(axis=(0, 2))
+        ]
+        self.px[:, changed] = px[:, changed]
+        self.qty[:, changed] = qty[:, changed]
+        self.n_levels[:, changed] = n_levels[:, changed]
+        return [self.assets[i] for i in changed.tolist()]
+
+    def _update_side(
+        self,
+        side: int,
+        i: int,
+        asset: str,
+        levels: List[pb.MarketSnapshotMessageBookPriceLevel],
+    ) -> bool:
+        """Overwrite one side of a book, returning whether it changed"""
+        n = min(len(levels), self.depth)
+        parse = self.ticks.parse
+        px = [parse(asset, level.px) for level in levels[:n]]
+        qty = [level.qty for level in levels[:n]]
+        if (
+            n == self.n_levels[side, i]
+            and px == self.px[side, i, :n].tolist()
+            and qty == self.qty[side, i, :n].tolist()
+        ):
+            return False
+        if n:
+            self.px[side, i, :n] = px
+            self.qty[side, i, :n] = qty
+        self.n_levels[side, i] = n
+        return True
+
+    def best_bid(self, asset: str) -> Optional[int]:
+        """The best bid in ticks, or None if there are no bids"""
+        i = self.index[asset]
+        return int(self.px[BID, i, 0]) if self.n_levels[BID, i] else None
+
+    def best_ask(self, asset: str) -> Optional[int]:
+        """The best ask in ticks, or None if there are no asks"""
+        i = self.index[asset]
+        return int(self.px[ASK, i, 0]) if self.n_levels[ASK, i] else None
+
+    def levels(self, asset: str, side: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Views of the (px, qty) of the valid levels of one side, best first"""
+        i = self.index[asset]
+        n = self.n_levels[side, i]
+        return self.px[side, i, :n], self.qty[side, i, :n]
+
+    def weighted_price(
+        self, asset: str, side: int, n_levels: Optional[int] = None
+    ) -> Optional[float]:
+        """
+        The quantity-weighted average price in ticks of the best n_levels
+        levels of a side (all of them by default), or None if it is empty
+        """
+        px, qty = self.levels(asset, side)
+        if n_levels is not None:
+            px, qty = px[:n_levels], qty[:n_levels]
+        total_qty = qty.sum()
+        if total_qty == 0:
+            return None
+        return float(px @ qty) / total_qty
+
+    def cumulative_depth(self, asset: str, side: int) -> np.ndarray:
+        """The total quantity at each level of a side and every better level"""
+        return np.cumsum(self.levels(asset, side)[1])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# channel_pool.py - gRPC channels used by a UTCBot to talk to the exchange
+
+import contextlib
+import itertools
+
+from typing import Iterator, List
+
+from grpclib.client import Channel
+
+import lib.proto.utc_bot as pb
+
+CHANNEL_SELECTION_MODES = ("round_robin", "least_busy")
+
+
+class ChannelPool:
+    """
+    The gRPC channels a bot uses to reach the exchange. One channel carries the
+    update stream (and the registration calls that precede it) while order
+    requests are spread over a separate set of channels, so that orders don't
+    share HTTP/2 flow control with a busy market data stream.
+
+    With order_channels=0 order requests go over the stream channel, which is
+    the behaviour of a single-channel bot.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        order_channels: int = 0,
+        selection: str = "round_robin",
+    ):
+        """
+        Args:
+            host (str): The IP Address or URL used to locate the exchange
+            port (int): The port that the exchange is running on
+            order_channels (int): The number of channels dedicated to order
+            requests. If 0, orders share the stream channel
+            selection (str): How an order channel is picked for each request,
+            either "round_robin" or "least_busy" (fewest requests in flight)
+        """
+        if order_channels < 0:
+            raise ValueError(
+                f"order_channels must be non-negative, got {order_channels}"
+            )
+        if selection not in CHANNEL_SELECTION_MODES:
+            raise ValueError(
+                f"Unknown channel selection {selection!r}, expected one of {CHANNEL_SELECTION_MODES}"
+            )
+
+        self.stream_channel = Channel(host, port)
+        self.stream_stub = pb.ExchangeServiceStub(self.stream_channel)
+
+        if order_channels == 0:
+            self.order_channels: List[Channel] = [self.stream_channel]
+            self._order_stubs = [self.stream_stub]
+        else:
+            self.order_channels = [Channel(host, port) for _ in range(order_channels)]
+            self._order_stubs = [
+                pb.ExchangeServiceStub(channel) for channel in self.order_channels
+            ]
+
+        self.selection = selection
+        self._next = itertools.cycle(range(len(self._order_stubs)))
+        self.in_flight = [0] * len(self._order_stubs)
+
+    def _pick(self) -> int:
+        if self.selection == "least_busy":
+            return min(range(len(self.in_flight)), key=self.in_flight.__getitem__)
+        return next(self._next)
+
+    @contextlib.contextmanager
+    def order_stub(self) -> Iterator[pb.ExchangeServiceStub]:
+        """
+        Pick the stub to send an order request over, counting the request as
+        in flight on its channel until the context exits
+        """
+        index = self._pick()
+        self.in_flight[index] += 1
+        try:
+            yield self._order_stubs[index]
+        finally:
+            self.in_flight[index] -= 1
+
+    def close(self):
+        """Close every channel in the pool"""
+        self.stream_channel.close()
+        for channel in self.order_channels:
+            if channel is not self.stream_channel:
+                channel.close()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# data_store.py - Converts the xchange data directories to one columnar binary
+# file each, with a small JSON manifest, so loading a dataset is an mmap
+#
+# Convert from the repository root: python -m lib.data_store
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import re
+
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_STORE_DIR = ".data_store"
+# Every column starts on a multiple of this many bytes
+_ALIGN = 64
+_FORMAT = 1
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _parse_column(values: List[str]) -> np.ndarray:
+    """A column of CSV strings as int64, float64 or fixed-width unicode"""
+    for dtype in (np.int64, np.float64):
+        try:
+            return np.array(values, dtype=dtype)
+        except ValueError:
+            pass
+    return np.array(values, dtype=str)
+
+
+def _read_csv(path: str) -> Dict[str, np.ndarray]:
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    # pandas writes its index as an unnamed first column
+    header = [name or "index" for name in rows[0]]
+    return {
+        name: _parse_column(list(values))
+        for name, values in zip(header, zip(*rows[1:]))
+    }
+
+
+def _tables(data_dir: str) -> Iterator[Tuple[str, Dict[str, np.ndarray]]]:
+    """
+    The (name, columns) of every table in a data directory. A CSV is a table
+    of its own, except that numbered CSVs sharing a stem (path0.csv,
+    path1.csv, ...) are stacked into one table with a row per file, in
+    numeric order, and a "number" column holding each file's number.
+    """
+    numbered: Dict[str, Dict[int, str]] = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.csv"))):
+        match = re.fullmatch(r"(.*?)(\d+)\.csv", os.path.basename(path))
+        if match:
+            numbered.setdefault(match.group(1), {})[int(match.group(2))] = path
+        else:
+            yield os.path.basename(path)[: -len(".csv")], _read_csv(path)
+
+    for stem, files in numbered.items():
+        numbers = sorted(files)
+        tables = [_read_csv(files[n]) for n in numbers]
+        for table in tables[1:]:
+            if [(k, len(v)) for k, v in table.items()] != [
+                (k, len(v)) for k, v in tables[0].items()
+            ]:
+                raise ValueError(f"The {stem}N.csv files in {data_dir} differ in shape")
+        stacked = {"number": np.array(numbers, dtype=np.int64)}
+        for name in tables[0]:
+            stacked[name] = np.stack([table[name] for table in tables])
+        yield stem, stacked
+
+
+def _source_hashes(data_dir: str) -> Dict[str, str]:
+    return {
+        os.path.basename(path): _file_hash(path)
+        for path in sorted(glob.glob(os.path.join(data_dir, "*.csv")))
+    }
+
+
+def _dataset_key(hashes: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(hashes, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class Dataset(Mapping[str, np.ndarray]):
+    """
+    The columns of a converted data directory, as read-only np.memmaps named
+    "table.column", e.g. "path.UnderlyingPrice" is the (paths x ticks) prices
+    of case 2 and "interest_rates.ROR" the ROR rates of case 1. Pages are
+    shared with every other process mapping the same file.
+    """
+
+    def __init__(self, path: str, manifest: Dict):
+        """
+        Args:
+            path (str): The binary file
+            manifest (Dict): Its manifest, see convert
+        """
+        self.path = path
+        self.manifest = manifest
+        self._columns: Dict[str, np.ndarray] = {}
+
+    @property
+    def key(self) -> str:
+        """The hash of the CSVs the dataset was converted from"""
+        return _dataset_key(self.manifest["sources"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        column = self._columns.get(name)
+        if column is None:
+            spec = self.manifest["columns"][name]
+            column = np.memmap(
+                self.path,
+                dtype=np.dtype(spec["dtype"]),
+                mode="r",
+                offset=spec["offset"],
+                shape=tuple(spec["shape"]),
+            )
+            self._columns[name] = column
+        return column
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manifest["columns"])
+
+    def __len__(self) -> int:
+        return len(self.manifest["columns"])
+
+    def table(self, name: str) -> Dict[str, np.ndarray]:
+        """Every column of one table, by column name"""
+        prefix = name + "."
+        return {
+            column[len(prefix) :]: self[column]
+            for column in self
+            if column.startswith(prefix)
+        }
+
+
+def convert(data_dir: str, store_dir: str = DEFAULT_STORE_DIR) -> str:
+    """
+    Write every table of a data directory into one binary file in store_dir,
+    each column contiguous and aligned, with a JSON manifest of each
+    column's dtype, shape and offset next to it. Files are named by the hash
+    of the CSVs' contents, so identical directories share one file.
+
+    Returns:
+        str: The path of the manifest
+    """
+    hashes = _source_hashes(data_dir)
+    if not hashes:
+        raise FileNotFoundError(f"No CSV files in {data_dir}")
+    base = os.path.join(store_dir, _dataset_key(hashes))
+    columns = {
+        f"{table}.{name}": np.ascontiguousarray(column)
+        for table, table_columns in _tables(data_dir)
+        for name, column in table_columns.items()
+    }
+
+    specs, offset = {}, 0
+    for name, column in columns.items():
+        offset = -(-offset // _ALIGN) * _ALIGN
+        specs[name] = {
+            "dtype": column.dtype.str,
+            "shape": list(column.shape),
+            "offset": offset,
+        }
+        offset += column.nbytes
+
+    os.makedirs(store_dir, exist_ok=True)
+    partial = base + ".bin.partial"
+    with open(partial, "wb") as f:
+        for name, column in columns.items():
+            f.seek(specs[name]["offset"])
+            f.write(column.tobytes())
+        f.truncate(max(offset, 1))
+    os.replace(partial, base + ".bin")
+    _write_json(
+        base + ".json", {"format": _FORMAT, "sources": hashes, "columns": specs}
+    )
+    return base + ".json"
+
+
+def open_dataset(data_dir: str, store_dir: str = DEFAULT_STORE_DIR) -> Dataset:
+    """
+    Map the converted data directory, converting it first if it never was or
+    its CSVs changed. Which file a directory maps to is kept in an index in
+    store_dir, checked by the CSVs' modification times and, only if those
+    moved, their hashes.
+    """
+    index_path = os.path.join(store_dir, "index.json")
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+
+    source = os.path.abspath(data_dir)
+    mtimes = {
+        os.path.basename(path): os.stat(path).st_mtime_ns
+        for path in sorted(glob.glob(os.path.join(data_dir, "*.csv")))
+    }
+    entry = index.get(source)
+    manifest_path: Optional[str] = None
+    if entry is not None and entry["mtimes"] == mtimes:
+        manifest_path = os.path.join(store_dir, entry["key"] + ".json")
+    if manifest_path is None or not os.path.exists(manifest_path):
+        key = _dataset_key(_source_hashes(data_dir))
+        manifest_path = os.path.join(store_dir, key + ".json")
+        if not os.path.exists(manifest_path):
+            convert(data_dir, store_dir)
+        index[source] = {"mtimes": mtimes, "key": key}
+        _write_json(index_path, index)
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    return Dataset(manifest_path[: -len(".json")] + ".bin", manifest)
+
+
+def _write_json(path: str, value: Dict):
+    partial = path + ".partial"
+    with open(partial, "w") as f:
+        json.dump(value, f, indent=2)
+    os.replace(partial, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert xchange data directories to memory-mapped columns"
+    )
+    parser.add_argument(
+        "dirs",
+        nargs="*",
+        help="Data directories (defaults to every xchange/*/data/case*)",
+    )
+    parser.add_argument(
+        "--store",
+        default=DEFAULT_STORE_DIR,
+        help=f"Where to write the files (defaults to {DEFAULT_STORE_DIR})",
+    )
+    args = parser.parse_args()
+
+    for data_dir in args.dirs or sorted(glob.glob("xchange/*/data/case*")):
+        dataset = open_dataset(data_dir, args.store)
+        print(f"{data_dir} -> {dataset.path}")
+        for name in dataset:
+            column = dataset[name]
+            print(f"  {name:28s} {str(column.dtype):6s} {column.shape}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# dependency_graph.py - Recomputes only what an update affects: a graph from
+# inputs (books, rates, positions) to the values and actions derived from them
+
+import heapq
+import inspect
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set, Union
+
+_UNSET = object()
+
+
+class DependencyGraph:
+    """
+    A graph of inputs and the nodes computed from them. Updates mark inputs
+    dirty; recompute then runs every node downstream of a dirty input once,
+    in dependency order, and nothing else.
+
+    A node whose result equals (==) its previous result doesn't dirty the
+    nodes that depend on it, so e.g. a node holding the top of a book stops
+    a change deeper in the book from requoting. Nodes added with
+    cutoff=False always pass changes on, for results that can't be compared.
+
+    Nodes must be added after everything they depend on, which makes the
+    order they are added in a valid order to compute them in.
+    """
+
+    def __init__(self):
+        self._order: Dict[str, int] = {}
+        self._compute: List[Callable[[], Union[Any, Awaitable[Any]]]] = []
+        self._cutoff: List[bool] = []
+        self._dependents: List[List[int]] = []
+        self._values: List[Any] = []
+        self._names: List[str] = []
+        self._dirty: Set[int] = set()
+
+        # The number of nodes run by the last recompute and by all of them
+        self.recomputed = 0
+        self.total_recomputed = 0
+        self.recomputes = 0
+        # The number of times each node has run
+        self.counts: Dict[str, int] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._order
+
+    def add_input(self, name: str, value: Any = _UNSET):
+        """Add an input, optionally with its initial value (see set)"""
+        self._add(name, None, (), False)
+        self._values[-1] = value
+
+    def add_node(
+        self,
+        name: str,
+        compute: Callable[[], Union[Any, Awaitable[Any]]],
+        inputs: Iterable[str],
+        cutoff: bool = True,
+    ):
+        """
+        Add a node
+
+        Args:
+            name (str): The name of the node
+            compute (Callable[[], Union[Any, Awaitable[Any]]]): Computes the
+            node's result from the current state; may be a coroutine function
+            inputs (Iterable[str]): The inputs and nodes the result depends on
+            cutoff (bool): If true, a result equal to the previous one doesn't
+            dirty the nodes that depend on this one
+        """
+        self._add(name, compute, inputs, cutoff)
+        self.counts[name] = 0
+
+    def _add(self, name, compute, inputs, cutoff):
+        if name in self._order:
+            raise ValueError(f"{name!r} is already in the graph")
+        index = len(self._names)
+        for source in inputs:
+            if source not in self._order:
+                raise ValueError(
+                    f"{name!r} depends on {source!r}, which isn't in the graph"
+                )
+            self._dependents[self._order[source]].append(index)
+        self._order[name] = index
+        self._names.append(name)
+        self._compute.append(compute)
+        self._cutoff.append(cutoff)
+        self._dependents.append([])
+        self._values.append(_UNSET)
+
+    def mark(self, *names: str):
+        """Mark inputs (or nodes) as changed"""
+        for name in names:
+            self._dirty.add(self._order[name])
+
+    def set(self, name: str, value: Any):
+        """Set the value of an input, marking it changed if it is different"""
+        index = self._order[name]
+        if self._values[index] is _UNSET or self._values[index] != value:
+            self._values[index] = value
+            self._dirty.add(index)
+
+    def value(self, name: str) -> Any:
+        """The value of an input or the last result of a node (None if unset)"""
+        value = self._values[self._order[name]]
+        return None if value is _UNSET else value
+
+    async def recompute(self) -> int:
+        """
+        Run every node downstream of the inputs and nodes marked since the
+        last recompute, each once and after everything it depends on
+
+        Returns:
+            int: The number of nodes run
+        """
+        pending: List[int] = []
+        queued: Set[int] = set()
+        for index in self._dirty:
+            for dependent in self._dependents[index]:
+                if dependent not in queued:
+                    queued.add(dependent)
+                    heapq.heappush(pending, dependent)
+        self._dirty.clear()
+
+        recomputed = 0
+        while pending:
+            index = heapq.heappop(pending)
+            value = self._compute[index]()
+            if inspect.isawaitable(value):
+                value = await value
+            recomputed += 1
+            self.counts[self._names[index]] += 1
+
+            previous = self._values[index]
+            self._values[index] = value
+            if self._cutoff[index] and previous is not _UNSET and previous == value:
+                continue
+            for dependent in self._dependents[index]:
+                if dependent not in queued:
+                    queued.add(dependent)
+                    heapq.heappush(pending, dependent)
+
+        self.recomputed = recomputed
+        self.total_recomputed += recomputed
+        self.recomputes += 1
+        return recomputed
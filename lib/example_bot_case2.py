@@ -1,16 +1,23 @@
 #!/usr/bin/env python
 
 from dataclasses import astuple
-from utc_bot import UTCBot, start_bot
-import proto.utc_bot as pb
+from lib.utc_bot import UTCBot, OrderRequest, start_bot
+import lib.proto.utc_bot as pb
+from lib.pricing import ImpliedVolSolver, black_scholes, bs_price
 import betterproto
 
 import asyncio
 import random
 
+import numpy as np
 
 option_strikes = [90, 95, 100, 105, 110]
 
+# The option chain as arrays, one element per option in the order the quotes are sent
+chain_assets = [f"UC{strike}{flag}" for strike in option_strikes for flag in ["C", "P"]]
+chain_strikes = np.repeat(np.array(option_strikes, dtype=float), 2)
+chain_is_call = np.tile([True, False], len(option_strikes))
+
 
 class Case2ExampleBot(UTCBot):
     """
@@ -41,13 +48,42 @@ class Case2ExampleBot(UTCBot):
         # Stores the current value of the underlying asset
         self.underlying_price = 100
 
+        # Solves for the implied volatility of every option in each snapshot, starting from the
+        # previous snapshot's solution
+        self.iv_solver = ImpliedVolSolver(
+            chain_strikes, chain_is_call, initial_vol=0.35
+        )
+        self.vol_estimate = 0.35
+
     def compute_vol_estimate(self) -> float:
         """
-        This function is used to provide an estimate of underlying's volatility. Because this is
-        an example bot, we just use a placeholder value here. We recommend that you look into
-        different ways of finding what the true volatility of the underlying is.
+        This function is used to provide an estimate of underlying's volatility. This example bot
+        uses the median implied volatility of the options market (see update_implied_vols), which
+        just follows the market. We recommend that you look into different ways of finding what
+        the true volatility of the underlying is.
+        """
+        return self.vol_estimate
+
+    def compute_time_to_expiry(self) -> float:
+        # What should this value actually be?
+        return 21 / 252
+
+    def update_implied_vols(self, books):
+        """
+        Solve for the implied volatility of every option with a two-sided market. Options whose
+        mid price has no implied volatility are left out of the estimate rather than raising.
         """
-        return 0.35
+        mids = np.full(len(chain_assets), np.nan)
+        for i, asset_name in enumerate(chain_assets):
+            book = books.get(asset_name)
+            if book is not None and book.bids and book.asks:
+                mids[i] = (float(book.bids[0].px) + float(book.asks[0].px)) / 2
+
+        result = self.iv_solver.solve(
+            mids, self.underlying_price, self.compute_time_to_expiry()
+        )
+        if result.converged.any():
+            self.vol_estimate = float(np.median(result.vol[result.converged]))
 
     def compute_options_price(
         self,
@@ -65,8 +101,11 @@ class Case2ExampleBot(UTCBot):
             - Are there tricks you can use to do this more quickly?
         You may want to look into the py_vollib library, which is installed by default in your
         virtual environment.
+
+        To price the whole chain at once (along with its greeks), use lib.pricing.black_scholes
+        as update_options_quotes does.
         """
-        return 1.0
+        return bs_price(flag, underlying_px, strike_px, time_to_expiry, volatility)
 
     async def update_options_quotes(self):
         """
@@ -76,77 +115,77 @@ class Case2ExampleBot(UTCBot):
         quotes at the new theoretical price every time a price update happens. We don't recommend
         that you do this in the actual competition
         """
-        # What should this value actually be?
-        time_to_expiry = 21 / 252
+        time_to_expiry = self.compute_time_to_expiry()
         vol = self.compute_vol_estimate()
 
-        for strike in option_strikes:
-            for flag in ["C", "P"]:
-                asset_name = f"UC{strike}{flag}"
-                theo = self.compute_options_price(
-                    flag, self.underlying_price, strike, time_to_expiry, vol
-                )
-
-                bid_response = await self.place_order(
-                    asset_name,
-                    pb.OrderSpecType.LIMIT,
-                    pb.OrderSpecSide.BID,
-                    1,  # How should this quantity be chosen?
-                    theo - 0.30,  # How should this price be chosen?
+        # Price every option in one call instead of once per (strike, flag)
+        theos = black_scholes(
+            self.underlying_price, chain_strikes, chain_is_call, time_to_expiry, vol
+        ).price
+
+        orders = []
+        for asset_name, theo in zip(chain_assets, theos.tolist()):
+            # Prices must be on the 0.01 tick grid, and bids must be positive
+            bid_px = round(theo - 0.30, 2)  # How should this price be chosen?
+            if bid_px > 0:
+                orders.append(
+                    OrderRequest(
+                        asset_name,
+                        pb.OrderSpecType.LIMIT,
+                        pb.OrderSpecSide.BID,
+                        1,  # How should this quantity be chosen?
+                        bid_px,
+                    )
                 )
-                assert bid_response.ok
-
-                ask_response = await self.place_order(
+            orders.append(
+                OrderRequest(
                     asset_name,
                     pb.OrderSpecType.LIMIT,
                     pb.OrderSpecSide.ASK,
                     1,
-                    theo + 0.30,
+                    round(theo + 0.30, 2),
                 )
-                assert ask_response.ok
+            )
 
-    async def handle_exchange_update(self, update: pb.FeedMessage):
-        kind, _ = betterproto.which_one_of(update, "msg")
+        # Send the whole requote at once instead of one round trip per order
+        for response in await self.submit_orders(orders):
+            assert response.ok
 
-        if kind == "pnl_msg":
-            # When you hear from the exchange about your PnL, print it out
-            print("My PnL:", update.pnl_msg.m2m_pnl)
+    # Each kind of exchange update has its own hook (on_pnl, on_fill, ...). Only the kinds with a
+    # hook are decoded and handed to the bot
 
-        elif kind == "fill_msg":
-            # When you hear about a fill you had, update your positions
-            fill_msg = update.fill_msg
+    async def on_pnl(self, msg: pb.PnLMessage):
+        # When you hear from the exchange about your PnL, print it out
+        print("My PnL:", msg.m2m_pnl)
 
-            if fill_msg.order_side == pb.FillMessageSide.BUY:
-                self.positions[fill_msg.asset] += update.fill_msg.filled_qty
-            else:
-                self.positions[fill_msg.asset] -= update.fill_msg.filled_qty
+    async def on_fill(self, msg: pb.FillMessage):
+        # When you hear about a fill you had, update your positions
+        if msg.order_side == pb.FillMessageSide.BUY:
+            self.positions[msg.asset] += msg.filled_qty
+        else:
+            self.positions[msg.asset] -= msg.filled_qty
 
-        elif kind == "market_snapshot_msg":
-            # When we receive a snapshot of what's going on in the market, update our information
-            # about the underlying price.
-            book = update.market_snapshot_msg.books["UC"]
+    async def on_snapshot(self, msg: pb.MarketSnapshotMessage):
+        # When we receive a snapshot of what's going on in the market, update our information
+        # about the underlying price.
+        book = msg.books["UC"]
 
-            # Compute the mid price of the market and store it
-            self.underlying_price = (
-                float(book.bids[0].px) + float(book.asks[0].px)
-            ) / 2
+        # Compute the mid price of the market and store it
+        self.underlying_price = (float(book.bids[0].px) + float(book.asks[0].px)) / 2
 
-            await self.update_options_quotes()
+        self.update_implied_vols(msg.books)
+        await self.update_options_quotes()
 
-        elif (
-            kind == "generic_msg"
-            and update.generic_msg.event_type == pb.GenericMessageType.MESSAGE
-        ):
-            # The platform will regularly send out what day it currently is (starting from day 0 at
-            # the start of the case)
-            self.current_day = float(update.generic_msg.message)
+    async def on_generic(self, msg: pb.GenericMessage):
+        if msg.event_type == pb.GenericMessageType.MESSAGE:
+            # The platform will regularly send out what day it currently is (starting from day 0
+            # at the start of the case)
+            self.current_day = float(msg.message)
 
-        elif kind == "trade_msg":
-            # There are other pieces of information the exchange provides feeds for. See if you can
-            # find ways to use them to your advantage (especially when more than one competitor is
-            # in the market)
-            pass
+    # There are other pieces of information the exchange provides feeds for, like on_trade. See if
+    # you can find ways to use them to your advantage (especially when more than one competitor is
+    # in the market)
 
 
 if __name__ == "__main__":
-    start_bot(Case2ExampleBot)
\ No newline at end of file
+    start_bot(Case2ExampleBot)
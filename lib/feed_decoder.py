@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# feed_decoder.py - A hand-written decoder for FeedMessage that reads market
+# snapshots straight off the wire into flat arrays, leaving every other kind of
+# message to betterproto
+
+from typing import List, NamedTuple, Tuple, Union
+
+import numpy as np
+
+import lib.proto.utc_bot as pb
+
+BID = 0
+ASK = 1
+
+# Protobuf wire types
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+_FIXED32 = 5
+
+# The field number of each kind of message in the FeedMessage oneof
+FEED_MESSAGE_FIELDS = {
+    "request_failed_msg": 1,
+    "pnl_msg": 2,
+    "trade_msg": 3,
+    "fill_msg": 4,
+    "market_snapshot_msg": 5,
+    "liquidation_msg": 6,
+    "generic_msg": 7,
+    "order_cancelled_msg": 8,
+}
+
+# The tag of FeedMessage.market_snapshot_msg (field 5, length delimited)
+_SNAPSHOT_TAG = (5 << 3) | _LENGTH_DELIMITED
+# The tags of PriceLevel.px and PriceLevel.qty
+_PX_TAG = (1 << 3) | _LENGTH_DELIMITED
+_QTY_TAG = (2 << 3) | _VARINT
+
+
+class RawFeedMessage:
+    """
+    Stands in for pb.FeedMessage as the reply type of a gRPC stream so that
+    grpclib hands over each message's bytes instead of decoding them
+    """
+
+    @staticmethod
+    def FromString(data: bytes) -> bytes:
+        return data
+
+
+class FlatSnapshot(NamedTuple):
+    """
+    A market snapshot with one row per price level. Row i is level level[i]
+    (0 is the best) on side side[i] of the book of assets[asset[i]]. Books
+    with no levels appear in assets but have no rows.
+    """
+
+    assets: List[str]
+    asset: np.ndarray
+    side: np.ndarray
+    level: np.ndarray
+    px: np.ndarray
+    qty: np.ndarray
+    timestamp: str
+
+    def to_message(self) -> pb.FeedMessage:
+        """
+        Rebuild the betterproto message, for handlers written against
+        pb.FeedMessage. Prices are formatted with 8 decimals.
+        """
+        books = {
+            asset: pb.MarketSnapshotMessageBook(asset=asset) for asset in self.assets
+        }
+        for i, side, px, qty in zip(
+            self.asset.tolist(),
+            self.side.tolist(),
+            self.px.tolist(),
+            self.qty.tolist(),
+        ):
+            book = books[self.assets[i]]
+            levels = book.bids if side == BID else book.asks
+            levels.append(pb.MarketSnapshotMessageBookPriceLevel(f"{px:.8f}", qty))
+        return pb.FeedMessage(
+            market_snapshot_msg=pb.MarketSnapshotMessage(
+                books=books, timestamp=self.timestamp
+            )
+        )
+
+    def merged_with(self, newer: "FlatSnapshot") -> "FlatSnapshot":
+        """
+        The books of newer, plus the books of this snapshot for any asset
+        newer does not include
+        """
+        newer_assets = set(newer.assets)
+        kept = [asset for asset in self.assets if asset not in newer_assets]
+        if not kept:
+            return newer
+        assets = newer.assets + kept
+        remap = np.full(len(self.assets), -1, dtype=np.int32)
+        for asset in kept:
+            remap[self.assets.index(asset)] = assets.index(asset)
+        rows = remap[self.asset] >= 0
+        return FlatSnapshot(
+            assets,
+            np.concatenate([newer.asset, remap[self.asset[rows]]]),
+            np.concatenate([newer.side, self.side[rows]]),
+            np.concatenate([newer.level, self.level[rows]]),
+            np.concatenate([newer.px, self.px[rows]]),
+            np.concatenate([newer.qty, self.qty[rows]]),
+            newer.timestamp,
+        )
+
+
+def peek_field(data: bytes) -> int:
+    """
+    The field number of the kind of message a serialized FeedMessage holds
+    (see FEED_MESSAGE_FIELDS), read from its first tag without decoding
+    anything else. 0 for an empty message.
+    """
+    if not data:
+        return 0
+    return _read_varint(data, 0)[0] >> 3
+
+
+def parse_feed_message(data: bytes) -> pb.FeedMessage:
+    """Decode a serialized FeedMessage with betterproto"""
+    return pb.FeedMessage().parse(data)
+
+
+def decode_feed_message(data: bytes) -> Union[FlatSnapshot, pb.FeedMessage]:
+    """
+    Decode a serialized FeedMessage. Market snapshots are decoded by hand into
+    a FlatSnapshot without building any betterproto objects; every other kind
+    of message is parsed by betterproto as usual.
+    """
+    if data and data[0] == _SNAPSHOT_TAG:
+        length, pos = _read_varint(data, 1)
+        if pos + length == len(data):
+            return _decode_snapshot(data, pos, pos + length)
+    return parse_feed_message(data)
+
+
+def _decode_snapshot(data: bytes, pos: int, end: int) -> FlatSnapshot:
+    assets: List[str] = []
+    rows_asset: List[int] = []
+    rows_side: List[int] = []
+    rows_level: List[int] = []
+    rows_px: List[float] = []
+    rows_qty: List[int] = []
+    timestamp = ""
+
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type != _LENGTH_DELIMITED:
+            pos = _skip(data, pos, wire_type)
+            continue
+        length, pos = _read_varint(data, pos)
+        field_end = pos + length
+
+        if field == 1:
+            # A map entry of books: key = 1 (the asset), value = 2 (the book)
+            asset, book = "", None
+            while pos < field_end:
+                key, pos = _read_varint(data, pos)
+                if key & 7 != _LENGTH_DELIMITED:
+                    pos = _skip(data, pos, key & 7)
+                    continue
+                length, pos = _read_varint(data, pos)
+                if key == (1 << 3) | _LENGTH_DELIMITED:
+                    asset = data[pos : pos + length].decode()
+                elif key == (2 << 3) | _LENGTH_DELIMITED:
+                    book = (pos, pos + length)
+                pos += length
+            index = len(assets)
+            assets.append(asset)
+            if book is not None:
+                levels = [0, 0]
+                pos, book_end = book
+                while pos < book_end:
+                    key = data[pos]
+                    side = (key >> 3) - 2
+                    if key & 7 != _LENGTH_DELIMITED or not (side == BID or side == ASK):
+                        key, pos = _read_varint(data, pos)
+                        pos = _skip(data, pos, key & 7)
+                        continue
+                    length, pos = _read_varint(data, pos + 1)
+                    level_end = pos + length
+
+                    # Levels are almost always a short px string followed by a
+                    # small qty; read those inline and anything else the slow way
+                    if (
+                        data[pos] == _PX_TAG
+                        and data[pos + 1] < 0x80
+                        and pos + 2 + data[pos + 1] + 2 == level_end
+                        and data[level_end - 2] == _QTY_TAG
+                        and data[level_end - 1] < 0x80
+                    ):
+                        px = float(data[pos + 2 : level_end - 2])
+                        qty = data[level_end - 1]
+                    else:
+                        px, qty = _decode_price_level(data, pos, level_end)
+
+                    rows_asset.append(index)
+                    rows_side.append(side)
+                    rows_level.append(levels[side])
+                    rows_px.append(px)
+                    rows_qty.append(qty)
+                    levels[side] += 1
+                    pos = level_end
+        elif field == 2:
+            timestamp = data[pos:field_end].decode()
+        pos = field_end
+
+    return FlatSnapshot(
+        assets,
+        np.array(rows_asset, dtype=np.int32),
+        np.array(rows_side, dtype=np.int8),
+        np.array(rows_level, dtype=np.int32),
+        np.array(rows_px, dtype=np.float64),
+        np.array(rows_qty, dtype=np.int64),
+        timestamp,
+    )
+
+
+def _decode_price_level(data: bytes, pos: int, end: int) -> Tuple[float, int]:
+    px, qty = 0.0, 0
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        if key == _PX_TAG:
+            length, pos = _read_varint(data, pos)
+            px = float(data[pos : pos + length])
+            pos += length
+        elif key == _QTY_TAG:
+            qty, pos = _read_varint(data, pos)
+            # int32 is sign extended to 64 bits on the wire
+            if qty >= 1 << 63:
+                qty -= 1 << 64
+        else:
+            pos = _skip(data, pos, key & 7)
+    return px, qty
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    byte = data[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    result, shift = byte & 0x7F, 7
+    while True:
+        pos += 1
+        byte = data[pos]
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos + 1
+        shift += 7
+
+
+def _skip(data: bytes, pos: int, wire_type: int) -> int:
+    """The position after the value of an unknown field"""
+    if wire_type == _VARINT:
+        return _read_varint(data, pos)[1]
+    if wire_type == _FIXED64:
+        return pos + 8
+    if wire_type == _LENGTH_DELIMITED:
+        length, pos = _read_varint(data, pos)
+        return pos + length
+    if wire_type == _FIXED32:
+        return pos + 4
+    raise ValueError(f"Unsupported protobuf wire type {wire_type}")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# futures.py - Interest rate parity fair values of currency futures, kept
+# current as rates, spot prices and the day of the round change
+
+import math
+
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+NUMERAIRE = "USD"
+
+
+class Future(NamedTuple):
+    """A future on one currency, priced in another, expiring on a given day"""
+
+    base: str
+    quote: str
+    expiry: float
+
+
+class FuturesPricer:
+    """
+    Prices a set of futures by interest rate parity: a future on base priced
+    in quote is worth the spot price of base in quote, grown by the ratio of
+    the two currencies' daily rates over the days left to expiry,
+
+        spot * (daily(quote) / daily(base)) ** days_left
+
+    with rates given as gross annual rates (e.g. 1.05) and
+    daily(r) = r ** (1 / days_in_year), as in case1.daily_rate.
+
+    Each future's carry (the growth factor) and spot are cached in arrays and
+    only recomputed when one of its inputs changes: setting a rate or the day
+    refreshes the carries, setting a spot refreshes the spots, and fairs
+    multiplies the two only if either was refreshed since it last ran.
+    """
+
+    def __init__(self, futures: Dict[str, Future], days_in_year: int = 252):
+        """
+        Args:
+            futures (Dict[str, Future]): Map from asset code to the future
+            days_in_year (int): The number of days a rate is quoted over
+        """
+        self.names = list(futures)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.days_in_year = days_in_year
+
+        currencies = {NUMERAIRE}
+        for future in futures.values():
+            currencies.update((future.base, future.quote))
+        self.currencies = sorted(currencies)
+        self._currency = {currency: i for i, currency in enumerate(self.currencies)}
+        self._base = np.array([self._currency[f.base] for f in futures.values()])
+        self._quote = np.array([self._currency[f.quote] for f in futures.values()])
+        self._expiry = np.array([f.expiry for f in futures.values()], dtype=float)
+
+        # Log gross annual rate and price in the numeraire of each currency
+        self._log_rate = np.full(len(self.currencies), np.nan)
+        self._usd_price = np.full(len(self.currencies), np.nan)
+        self._usd_price[self._currency[NUMERAIRE]] = 1.0
+
+        # Per future: years left to expiry, carry, spot and fair value
+        self._years = np.empty(len(self.names))
+        self._carry = np.full(len(self.names), np.nan)
+        self._spot = np.full(len(self.names), np.nan)
+        self._fairs = np.full(len(self.names), np.nan)
+        self._stale_carry = True
+        self._stale_spot = True
+        self._stale_fairs = True
+        self.day = 0.0
+        self.set_day(0.0)
+
+    def set_day(self, day: float):
+        """Set the day of the round, which decides the days left to each expiry"""
+        self.day = day
+        np.maximum(self._expiry - day, 0.0, out=self._years)
+        self._years /= self.days_in_year
+        self._stale_carry = True
+
+    def set_rate(self, currency: str, rate: float):
+        """Set the gross annual interest rate of a currency"""
+        log_rate = math.log(rate)
+        i = self._currency[currency]
+        if self._log_rate[i] != log_rate:
+            self._log_rate[i] = log_rate
+            self._stale_carry = True
+
+    def set_spot(self, currency: str, price: float):
+        """Set the spot price of a currency in the numeraire (USD)"""
+        i = self._currency[currency]
+        if self._usd_price[i] != price:
+            self._usd_price[i] = price
+            self._stale_spot = True
+
+    def fairs(self) -> np.ndarray:
+        """
+        The fair value of every future, in the order of names. NaN for any
+        future missing a rate or spot. The array is reused between calls.
+        """
+        if self._stale_carry:
+            # (daily(quote) / daily(base)) ** days_left, in logs
+            np.exp(
+                (self._log_rate[self._quote] - self._log_rate[self._base])
+                * self._years,
+                out=self._carry,
+            )
+            self._stale_carry = False
+            self._stale_fairs = True
+        if self._stale_spot:
+            np.divide(
+                self._usd_price[self._base],
+                self._usd_price[self._quote],
+                out=self._spot,
+            )
+            self._stale_spot = False
+            self._stale_fairs = True
+        if self._stale_fairs:
+            np.multiply(self._spot, self._carry, out=self._fairs)
+            self._stale_fairs = False
+        return self._fairs
+
+    def scenario_fairs(self, currency: str, rates: np.ndarray) -> np.ndarray:
+        """
+        The fair value of every future if a currency's rate were each of
+        rates instead, as a (rates x futures) array. Nothing is changed.
+        """
+        log_rate = np.tile(self._log_rate, (len(rates), 1))
+        log_rate[:, self._currency[currency]] = np.log(rates)
+        carry = np.exp(
+            (log_rate[:, self._quote] - log_rate[:, self._base]) * self._years
+        )
+        return carry * (self._usd_price[self._base] / self._usd_price[self._quote])
+
+    def fair(self, name: str) -> float:
+        return float(self.fairs()[self.index[name]])
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# ladder.py - Quote ladders of any depth for many assets at once: a linear-fade
+# market maker's prices and sizes as (assets x levels) arrays
+
+from typing import NamedTuple
+
+import numpy as np
+
+from lib.pricing import ArrayLike
+
+
+class Ladder(NamedTuple):
+    """
+    The quotes of every asset, one row per asset and one column per level
+    (0 is the best). Prices are in ticks; a size of 0 means no order.
+    """
+
+    bid_px: np.ndarray
+    bid_qty: np.ndarray
+    ask_px: np.ndarray
+    ask_qty: np.ndarray
+    adjusted_fair: np.ndarray
+    fade: np.ndarray
+
+
+def quote_ladder(
+    fair: ArrayLike,
+    pos: ArrayLike,
+    width: ArrayLike,
+    clip: ArrayLike,
+    max_pos: ArrayLike,
+    max_range: ArrayLike,
+    depth: int = 2,
+) -> Ladder:
+    """
+    The ladder of a market maker that fades its fair value linearly with its
+    position, so it reaches max_range / 2 away from fair just as it reaches
+    max_pos. Level k is quoted k * clip * fade further out than the best
+    level (and always at least one tick behind the level before it), with
+    clip lots, until the position that would result reaches max_pos.
+
+    An asset at or beyond its limit on one side quotes only the other side,
+    crossing its own best price to reduce its position: at max_pos long it
+    offers clip lots at its best bid price and each tick above it, and at
+    max_pos short it bids at its best ask price and each tick below it.
+
+    The arguments broadcast against each other, one element per asset.
+
+    Args:
+        fair (ArrayLike): The fair value of each asset, in ticks
+        pos (ArrayLike): The current position in each asset
+        width (ArrayLike): The spread between the best bid and ask, in ticks
+        clip (ArrayLike): The size of each level
+        max_pos (ArrayLike): The largest position to hold either way
+        max_range (ArrayLike): The most the fair value is faded, in ticks
+        depth (int): The number of levels per side
+
+    Returns:
+        Ladder: (assets x depth) prices and sizes of each side
+    """
+    # Everything is a column (one row per asset, or one row for all of them)
+    # so it broadcasts against the levels along axis 1
+    fair, pos, width, clip, max_pos, max_range = (
+        np.asarray(a, dtype=float).reshape(-1, 1)
+        for a in (fair, pos, width, clip, max_pos, max_range)
+    )
+    rows = np.zeros(
+        (
+            max(
+                len(fair), len(pos), len(width), len(clip), len(max_pos), len(max_range)
+            ),
+            1,
+        )
+    )
+
+    fade = (max_range / 2.0) / max_pos + rows
+    adjusted_fair = fair - pos * fade
+
+    # Column k holds level k. Each level is at least a tick behind the one
+    # before it: b[k] = min(raw[k], b[k - 1] - 1), which unrolls to a running
+    # minimum of raw[j] + j, shifted back by k (a running maximum for asks)
+    k = np.arange(depth)
+    step = k * (clip * fade)
+    half_width = width / 2.0
+    bid_px = (
+        np.minimum.accumulate(np.rint(adjusted_fair - step - half_width) + k, axis=1)
+        - k
+    )
+    ask_px = (
+        np.maximum.accumulate(np.rint(adjusted_fair + step + half_width) - k, axis=1)
+        + k
+    )
+
+    bids_left = max_pos - pos + rows
+    asks_left = max_pos + pos + rows
+    behind = k * clip
+    bid_qty = np.minimum(np.maximum(bids_left - behind, 0), clip)
+    ask_qty = np.minimum(np.maximum(asks_left - behind, 0), clip)
+
+    # Risk limits: only reduce the position, crossing the best price
+    if bids_left.min() <= 0 or asks_left.min() <= 0:
+        too_long = bids_left <= 0
+        too_short = ~too_long & (asks_left <= 0)
+        best_bid, best_ask = bid_px[:, :1], ask_px[:, :1]
+        bid_px = np.where(too_short, best_ask - k, bid_px)
+        ask_px = np.where(too_long, best_bid + k, ask_px)
+        bid_qty = np.where(too_long, 0, np.where(too_short, clip, bid_qty))
+        ask_qty = np.where(too_short, 0, np.where(too_long, clip, ask_qty))
+
+    return Ladder(
+        bid_px.astype(np.int64),
+        bid_qty.astype(np.int64),
+        ask_px.astype(np.int64),
+        ask_qty.astype(np.int64),
+        adjusted_fair[:, 0],
+        fade[:, 0],
+    )
@@ -0,0 +1,826 @@
+#!/usr/bin/env python
+# local_exchange.py - A pure Python stand-in for the xchange binary, serving the
+# utc_bot.ExchangeService gRPC API on top of the order books in matching_engine.py
+#
+# Run from the repository root: python -m lib.local_exchange case1
+
+import argparse
+import asyncio
+import collections
+import itertools
+import time
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from grpclib.const import Cardinality, Handler
+from grpclib.server import Server
+
+import lib.proto.utc_bot as pb
+from lib.matching_engine import ASK, BID, Match, Order, OrderBook
+
+
+def _case1_assets() -> Dict[str, Tuple[float, float]]:
+    assets = {}
+    for month in ["H", "M", "U", "Z"]:
+        assets["6R" + month] = (0.00001, 1.0)
+        assets["6H" + month] = (0.00002, 2.0)
+        assets["RH" + month] = (0.0001, 10.0)
+    assets["RORUSD"] = (0.00001, 1.0)
+    return assets
+
+
+def _case2_assets() -> Dict[str, Tuple[float, float]]:
+    assets = {"UC": (0.01, 1000.0)}
+    for strike in [90, 95, 100, 105, 110]:
+        for flag in ["C", "P"]:
+            assets[f"UC{strike}{flag}"] = (0.01, 1000.0)
+    return assets
+
+
+# Map from case name to {asset code: (tick size, maximum price)}
+CASE_ASSETS = {"case1": _case1_assets(), "case2": _case2_assets()}
+
+# Map from case name to {asset code: the largest position either way}, for the
+# cases whose rules limit positions
+CASE_LIMITS = {
+    "case1": {asset: 10 if asset == "RORUSD" else 100 for asset in CASE_ASSETS["case1"]}
+}
+
+SIDES = {pb.OrderSpecSide.BID: BID, pb.OrderSpecSide.ASK: ASK}
+
+
+class Competitor:
+    """A registered competitor: its feed, open orders and positions"""
+
+    def __init__(self, username: str, password: str):
+        self.username = username
+        self.password = password
+
+        # The queue of updates for this competitor's stream, if one is open
+        self.feed: "Optional[asyncio.Queue[Optional[pb.FeedMessage]]]" = None
+        self.orders: Dict[str, Order] = {}
+
+        self.cash = 0.0
+        self.realized_pnl = 0.0
+        self.fill_count = 0
+        self.positions: Dict[str, int] = collections.defaultdict(int)
+        self.avg_price: Dict[str, float] = collections.defaultdict(float)
+
+    def send(self, update: pb.FeedMessage):
+        """Queue an update for the competitor's stream (dropped if none is open)"""
+        if self.feed is not None:
+            self.feed.put_nowait(update)
+
+
+class LocalExchange:
+    """
+    The state of a local exchange: competitors, order books and the feed of
+    every competitor. All order handling is synchronous and independent of
+    gRPC, so this can be driven directly in-process as well as through
+    ExchangeServicer.
+
+    Order requests follow the semantics the example bots rely on: a modify
+    cancels the old order if it is still resting and then places the new one,
+    so modifying an unknown or already filled order (e.g. "") just places it.
+    Orders that could take a position past its limit, were they and every
+    other resting order on their side filled, are rejected.
+    """
+
+    def __init__(
+        self,
+        assets: Dict[str, Tuple[float, float]],
+        snapshot_depth: int = 10,
+        clock: Callable[[], float] = time.time,
+        position_limits: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Args:
+            assets (Dict[str, Tuple[float, float]]): Map from asset code to its
+            (tick size, maximum price)
+            snapshot_depth (int): The number of levels per side in snapshots
+            clock (Callable[[], float]): Source of timestamps, in seconds
+            position_limits (Optional[Dict[str, int]]): The largest position
+            either way in each asset; assets without one are unlimited
+        """
+        self.books = {
+            asset: OrderBook(asset, tick_size, max_price)
+            for asset, (tick_size, max_price) in assets.items()
+        }
+        self.snapshot_depth = snapshot_depth
+        self.clock = clock
+        self.position_limits = position_limits or {}
+
+        self.competitors: Dict[str, Competitor] = {}
+        self.last_trade: Dict[str, float] = {}
+        self._order_ids = itertools.count(1)
+        self._started: Optional[asyncio.Event] = None
+
+        self.order_count = 0
+        self.trade_count = 0
+
+    def timestamp(self) -> str:
+        return f"{self.clock():.6f}"
+
+    @property
+    def started(self) -> asyncio.Event:
+        """Set once trading has started (created lazily on the running loop)"""
+        if self._started is None:
+            self._started = asyncio.Event()
+        return self._started
+
+    def _authenticate(self, creds: Optional[pb.Credentials]) -> Optional[Competitor]:
+        if creds is None:
+            return None
+        competitor = self.competitors.get(creds.username)
+        if competitor is None or competitor.password != creds.password:
+            return None
+        return competitor
+
+    ###
+    # Round lifecycle
+    ###
+
+    def register(self, creds: pb.Credentials) -> pb.RegisterResponse:
+        competitor = self.competitors.get(creds.username)
+        if competitor is not None and competitor.password != creds.password:
+            return pb.RegisterResponse(ok=False, message="Username already taken")
+        if competitor is None:
+            self.competitors[creds.username] = Competitor(
+                creds.username, creds.password
+            )
+        return pb.RegisterResponse(ok=True)
+
+    async def await_trading_start(
+        self, creds: pb.Credentials
+    ) -> pb.AwaitTradingStartResponse:
+        if self._authenticate(creds) is None:
+            return pb.AwaitTradingStartResponse(
+                started=False, message="Competitor not registered"
+            )
+        await self.started.wait()
+        return pb.AwaitTradingStartResponse(started=True)
+
+    def start_trading(self):
+        self.started.set()
+
+    def open_feed(
+        self, creds: pb.Credentials
+    ) -> "Optional[asyncio.Queue[Optional[pb.FeedMessage]]]":
+        """
+        Open the update stream of a competitor, replacing any stream it already
+        had. A None on the queue marks the end of the stream.
+        """
+        competitor = self._authenticate(creds)
+        if competitor is None:
+            return None
+        if competitor.feed is not None:
+            competitor.send(
+                self._generic(
+                    "Stream replaced by a new connection",
+                    pb.GenericMessageType.CHANNEL_REPLACED,
+                )
+            )
+            competitor.feed.put_nowait(None)
+        competitor.feed = asyncio.Queue()
+        return competitor.feed
+
+    def end_round(self):
+        """Tell every competitor the round is over and close their streams"""
+        self.broadcast(self._generic("Round ended", pb.GenericMessageType.ROUND_ENDED))
+        for competitor in self.competitors.values():
+            if competitor.feed is not None:
+                competitor.feed.put_nowait(None)
+                competitor.feed = None
+
+    async def wait_handled(self):
+        """
+        Wait until every update queued for an open stream has been handled.
+        Only streams that mark updates done (see transport.InProcessTransport)
+        can be waited on.
+        """
+        while True:
+            feeds = [c.feed for c in self.competitors.values() if c.feed is not None]
+            for feed in feeds:
+                await feed.join()
+            if all(feed.empty() for feed in feeds):
+                return
+
+    ###
+    # Order entry
+    ###
+
+    def place_order(
+        self, creds: pb.Credentials, order: pb.OrderSpec
+    ) -> pb.PlaceOrderResponse:
+        competitor = self._authenticate(creds)
+        if competitor is None:
+            return pb.PlaceOrderResponse(ok=False, message="Invalid credentials")
+
+        order_id = self._next_order_id()
+        error = self._validate(order) or self._check_limit(competitor, order)
+        if error is not None:
+            self._request_failed(
+                competitor,
+                pb.RequestFailedMessageType.PLACE,
+                order.asset,
+                error,
+                place_order_id=order_id,
+            )
+            return pb.PlaceOrderResponse(ok=False, message=error)
+
+        self._submit(competitor, order, order_id)
+        return pb.PlaceOrderResponse(ok=True, order_id=order_id)
+
+    def modify_order(
+        self, creds: pb.Credentials, order_id: str, new_order: pb.OrderSpec
+    ) -> pb.ModifyOrderResponse:
+        competitor = self._authenticate(creds)
+        if competitor is None:
+            return pb.ModifyOrderResponse(ok=False, message="Invalid credentials")
+
+        new_order_id = self._next_order_id()
+        error = self._validate(new_order)
+        if error is None and order_id and order_id not in competitor.orders:
+            if any(order_id in c.orders for c in self.competitors.values()):
+                error = f"Order {order_id} belongs to another competitor"
+        if error is None:
+            error = self._check_limit(competitor, new_order, order_id)
+        if error is not None:
+            self._request_failed(
+                competitor,
+                pb.RequestFailedMessageType.MODIFY,
+                new_order.asset,
+                error,
+                place_order_id=new_order_id,
+                cancel_order_id=order_id,
+            )
+            return pb.ModifyOrderResponse(ok=False, message=error)
+
+        old = competitor.orders.pop(order_id, None)
+        if old is not None:
+            self.books[old.asset].remove(old)
+            self._cancelled(competitor, old.asset, [order_id], True)
+
+        self._submit(competitor, new_order, new_order_id)
+        return pb.ModifyOrderResponse(ok=True, order_id=new_order_id)
+
+    def cancel_order(
+        self, creds: pb.Credentials, order_id: str
+    ) -> pb.CancelOrderResponse:
+        competitor = self._authenticate(creds)
+        if competitor is None:
+            return pb.CancelOrderResponse(ok=False, message="Invalid credentials")
+
+        order = competitor.orders.pop(order_id, None)
+        if order is None:
+            error = f"Order {order_id} is not resting on the book"
+            self._request_failed(
+                competitor,
+                pb.RequestFailedMessageType.CANCEL,
+                "",
+                error,
+                cancel_order_id=order_id,
+            )
+            return pb.CancelOrderResponse(ok=False, message=error)
+
+        self.books[order.asset].remove(order)
+        self._cancelled(competitor, order.asset, [order_id], True)
+        return pb.CancelOrderResponse(ok=True)
+
+    def _next_order_id(self) -> str:
+        return str(next(self._order_ids))
+
+    def _validate(self, order: pb.OrderSpec) -> Optional[str]:
+        book = self.books.get(order.asset)
+        if book is None:
+            return f"Unknown asset {order.asset!r}"
+        if order.quantity <= 0:
+            return f"Invalid quantity {order.quantity}"
+        if order.type != pb.OrderSpecType.MARKET:
+            try:
+                price = float(order.price)
+            except ValueError:
+                return f"Invalid price {order.price!r}"
+            if book.to_tick(price) is None:
+                return f"Price {order.price} is not on the tick grid of {order.asset}"
+        return None
+
+    def _check_limit(
+        self, competitor: Competitor, order: pb.OrderSpec, replaced: str = ""
+    ) -> Optional[str]:
+        """
+        Why an order would breach its asset's position limit, if it would,
+        counting every resting order on its side but the one it replaces
+        """
+        limit = self.position_limits.get(order.asset)
+        if limit is None:
+            return None
+        side = SIDES[order.side]
+        resting = sum(
+            o.qty
+            for o in competitor.orders.values()
+            if o.asset == order.asset and o.side == side and o.order_id != replaced
+        )
+        pos = competitor.positions[order.asset]
+        if side == BID:
+            breach = pos + resting + order.quantity > limit
+        else:
+            breach = pos - resting - order.quantity < -limit
+        if breach:
+            return f"Order could take {order.asset} past its position limit of {limit}"
+        return None
+
+    def _submit(self, competitor: Competitor, spec: pb.OrderSpec, order_id: str):
+        """Match a validated order and rest whatever remains of a limit order"""
+        book = self.books[spec.asset]
+        side = SIDES[spec.side]
+        if spec.type == pb.OrderSpecType.MARKET:
+            tick = book.n_ticks - 1 if side == BID else 0
+        else:
+            tick = book.to_tick(float(spec.price))
+
+        remaining = self._match(
+            competitor, order_id, spec.asset, side, tick, spec.quantity
+        )
+        if remaining == 0:
+            return
+        if spec.type == pb.OrderSpecType.LIMIT:
+            self._rest(competitor, order_id, spec.asset, side, tick, remaining)
+        else:
+            self._cancelled(
+                competitor,
+                spec.asset,
+                [order_id],
+                False,
+                "Remaining quantity could not be filled",
+            )
+
+    def _match(
+        self,
+        competitor: Competitor,
+        order_id: str,
+        asset: str,
+        side: int,
+        tick: int,
+        qty: int,
+    ) -> int:
+        """Match an incoming order against the book, returning the unfilled qty"""
+        self.order_count += 1
+        matches = self.books[asset].match(side, tick, qty)
+        remaining = qty - sum(m.qty for m in matches)
+        if matches:
+            self._execute(competitor, order_id, asset, side, matches, remaining)
+        return remaining
+
+    def _rest(
+        self,
+        competitor: Competitor,
+        order_id: str,
+        asset: str,
+        side: int,
+        tick: int,
+        qty: int,
+    ):
+        order = Order(order_id, competitor.username, asset, side, tick, qty)
+        self.books[asset].add(order)
+        competitor.orders[order_id] = order
+
+    def place_limit(
+        self, username: str, asset: str, side: int, tick: int, qty: int
+    ) -> str:
+        """
+        Place a limit order for a registered competitor without any protobuf
+        requests or responses. Meant for liquidity provided by a simulation
+        itself; the order must already be valid.
+
+        Returns:
+            str The ID of the new order
+        """
+        competitor = self.competitors[username]
+        order_id = self._next_order_id()
+        remaining = self._match(competitor, order_id, asset, side, tick, qty)
+        if remaining:
+            self._rest(competitor, order_id, asset, side, tick, remaining)
+        return order_id
+
+    def withdraw(self, username: str, order_id: str) -> bool:
+        """Cancel an order placed with place_limit. Returns whether it was resting"""
+        competitor = self.competitors[username]
+        order = competitor.orders.pop(order_id, None)
+        if order is None:
+            return False
+        self.books[order.asset].remove(order)
+        self._cancelled(competitor, order.asset, [order_id], True)
+        return True
+
+    ###
+    # Fills and PnL
+    ###
+
+    def _execute(
+        self,
+        aggressor: Competitor,
+        order_id: str,
+        asset: str,
+        side: int,
+        matches: List[Match],
+        remaining: int,
+    ):
+        book = self.books[asset]
+        aggressor_left = remaining + sum(m.qty for m in matches)
+        for resting, tick, qty in matches:
+            price = book.to_price(tick)
+            px = f"{price:.8f}"
+            self.last_trade[asset] = price
+            self.trade_count += 1
+
+            owner = self.competitors[resting.owner]
+            if resting.qty == 0:
+                owner.orders.pop(resting.order_id, None)
+            self._fill(
+                owner,
+                resting.order_id,
+                asset,
+                resting.side,
+                price,
+                px,
+                qty,
+                resting.qty,
+            )
+
+            aggressor_left -= qty
+            self._fill(aggressor, order_id, asset, side, price, px, qty, aggressor_left)
+
+            if self.has_streams:
+                self.broadcast(
+                    pb.FeedMessage(
+                        trade_msg=pb.TradeMessage(
+                            asset=asset, price=px, qty=qty, timestamp=self.timestamp()
+                        )
+                    )
+                )
+
+    def _fill(
+        self,
+        competitor: Competitor,
+        order_id: str,
+        asset: str,
+        side: int,
+        price: float,
+        px: str,
+        qty: int,
+        remaining: int,
+    ):
+        signed = qty if side == BID else -qty
+        pos = competitor.positions[asset]
+        avg = competitor.avg_price[asset]
+
+        # Average cost accounting: the part of the fill that reduces the
+        # position realizes PnL, the rest moves the average price
+        closing = min(abs(signed), abs(pos)) if pos * signed < 0 else 0
+        if closing:
+            direction = 1 if pos > 0 else -1
+            competitor.realized_pnl += closing * (price - avg) * direction
+        new_pos = pos + signed
+        if new_pos == 0:
+            competitor.avg_price[asset] = 0.0
+        elif pos * new_pos <= 0:
+            competitor.avg_price[asset] = price
+        elif abs(new_pos) > abs(pos):
+            competitor.avg_price[asset] = (avg * abs(pos) + price * qty) / abs(new_pos)
+
+        competitor.positions[asset] = new_pos
+        competitor.cash -= signed * price
+        competitor.fill_count += 1
+
+        # Building feed messages dominates the cost of a fill, so skip it for
+        # competitors that aren't listening
+        if competitor.feed is None:
+            return
+        competitor.send(
+            pb.FeedMessage(
+                fill_msg=pb.FillMessage(
+                    order_id=order_id,
+                    asset=asset,
+                    order_side=(
+                        pb.FillMessageSide.BUY
+                        if side == BID
+                        else pb.FillMessageSide.SELL
+                    ),
+                    price=px,
+                    filled_qty=qty,
+                    remaining_qty=remaining,
+                    timestamp=self.timestamp(),
+                )
+            )
+        )
+
+    def mark(self, asset: str) -> Optional[float]:
+        """The mark price of an asset: the book mid, else the last trade"""
+        mid = self.books[asset].mid()
+        return mid if mid is not None else self.last_trade.get(asset)
+
+    def m2m_pnl(self, competitor: Competitor) -> float:
+        pnl = competitor.cash
+        for asset, pos in competitor.positions.items():
+            if pos:
+                mark = self.mark(asset)
+                pnl += pos * (mark if mark is not None else competitor.avg_price[asset])
+        return pnl
+
+    ###
+    # Feed messages
+    ###
+
+    @property
+    def has_streams(self) -> bool:
+        """Whether any competitor currently has an update stream open"""
+        return any(c.feed is not None for c in self.competitors.values())
+
+    def broadcast(self, update: pb.FeedMessage):
+        for competitor in self.competitors.values():
+            competitor.send(update)
+
+    def broadcast_message(self, message: str):
+        """Send a generic MESSAGE event (e.g. interest rates) to everyone"""
+        self.broadcast(self._generic(message, pb.GenericMessageType.MESSAGE))
+
+    def snapshot(self) -> pb.FeedMessage:
+        books = {}
+        for asset, book in self.books.items():
+            books[asset] = pb.MarketSnapshotMessageBook(
+                asset=asset,
+                bids=[
+                    pb.MarketSnapshotMessageBookPriceLevel(
+                        f"{tick * book.tick_size:.8f}", qty
+                    )
+                    for tick, qty in book.depth(BID, self.snapshot_depth)
+                ],
+                asks=[
+                    pb.MarketSnapshotMessageBookPriceLevel(
+                        f"{tick * book.tick_size:.8f}", qty
+                    )
+                    for tick, qty in book.depth(ASK, self.snapshot_depth)
+                ],
+            )
+        return pb.FeedMessage(
+            market_snapshot_msg=pb.MarketSnapshotMessage(
+                books=books, timestamp=self.timestamp()
+            )
+        )
+
+    def publish_snapshot(self):
+        self.broadcast(self.snapshot())
+
+    def publish_pnl(self):
+        timestamp = self.timestamp()
+        for competitor in self.competitors.values():
+            if competitor.feed is None:
+                continue
+            competitor.send(
+                pb.FeedMessage(
+                    pnl_msg=pb.PnLMessage(
+                        realized_pnl=f"{competitor.realized_pnl:.8f}",
+                        m2m_pnl=f"{self.m2m_pnl(competitor):.8f}",
+                        timestamp=timestamp,
+                    )
+                )
+            )
+
+    def _generic(
+        self, message: str, event_type: pb.GenericMessageType
+    ) -> pb.FeedMessage:
+        return pb.FeedMessage(
+            generic_msg=pb.GenericMessage(event_type=event_type, message=message)
+        )
+
+    def _cancelled(
+        self,
+        competitor: Competitor,
+        asset: str,
+        order_ids: List[str],
+        intentional: bool,
+        message: str = "",
+    ):
+        if competitor.feed is None:
+            return
+        competitor.send(
+            pb.FeedMessage(
+                order_cancelled_msg=pb.OrderCancelledMessage(
+                    order_ids=order_ids,
+                    asset=asset,
+                    intentional=intentional,
+                    message=message,
+                    timestamp=self.timestamp(),
+                )
+            )
+        )
+
+    def _request_failed(
+        self,
+        competitor: Competitor,
+        request_type: pb.RequestFailedMessageType,
+        asset: str,
+        message: str,
+        place_order_id: str = "",
+        cancel_order_id: str = "",
+    ):
+        if competitor.feed is None:
+            return
+        competitor.send(
+            pb.FeedMessage(
+                request_failed_msg=pb.RequestFailedMessage(
+                    type=request_type,
+                    place_order_id=place_order_id,
+                    cancel_order_id=cancel_order_id,
+                    message=message,
+                    asset=asset,
+                    timestamp=self.timestamp(),
+                )
+            )
+        )
+
+
+class ExchangeServicer:
+    """Serves a LocalExchange over the utc_bot.ExchangeService gRPC API"""
+
+    def __init__(self, exchange: LocalExchange):
+        self.exchange = exchange
+
+    async def register(self, stream):
+        request = await stream.recv_message()
+        await stream.send_message(self.exchange.register(request.creds))
+
+    async def await_trading_start(self, stream):
+        request = await stream.recv_message()
+        await stream.send_message(
+            await self.exchange.await_trading_start(request.creds)
+        )
+
+    async def stream_messages(self, stream):
+        request = await stream.recv_message()
+        feed = self.exchange.open_feed(request.creds)
+        if feed is None:
+            return
+        while True:
+            update = await feed.get()
+            if update is None:
+                break
+            await stream.send_message(update)
+
+    async def place_order(self, stream):
+        request = await stream.recv_message()
+        await stream.send_message(
+            self.exchange.place_order(request.creds, request.order)
+        )
+
+    async def modify_order(self, stream):
+        request = await stream.recv_message()
+        await stream.send_message(
+            self.exchange.modify_order(
+                request.creds, request.order_id, request.new_order
+            )
+        )
+
+    async def cancel_order(self, stream):
+        request = await stream.recv_message()
+        await stream.send_message(
+            self.exchange.cancel_order(request.creds, request.order_id)
+        )
+
+    def __mapping__(self):
+        route = "/utc_bot.ExchangeService/"
+        return {
+            route
+            + "Register": Handler(
+                self.register,
+                Cardinality.UNARY_UNARY,
+                pb.RegisterRequest,
+                pb.RegisterResponse,
+            ),
+            route
+            + "AwaitTradingStart": Handler(
+                self.await_trading_start,
+                Cardinality.UNARY_UNARY,
+                pb.AwaitTradingStartRequest,
+                pb.AwaitTradingStartResponse,
+            ),
+            route
+            + "StreamMessages": Handler(
+                self.stream_messages,
+                Cardinality.UNARY_STREAM,
+                pb.StreamMessagesRequest,
+                pb.FeedMessage,
+            ),
+            route
+            + "PlaceOrder": Handler(
+                self.place_order,
+                Cardinality.UNARY_UNARY,
+                pb.PlaceOrderRequest,
+                pb.PlaceOrderResponse,
+            ),
+            route
+            + "ModifyOrder": Handler(
+                self.modify_order,
+                Cardinality.UNARY_UNARY,
+                pb.ModifyOrderRequest,
+                pb.ModifyOrderResponse,
+            ),
+            route
+            + "CancelOrder": Handler(
+                self.cancel_order,
+                Cardinality.UNARY_UNARY,
+                pb.CancelOrderRequest,
+                pb.CancelOrderResponse,
+            ),
+        }
+
+
+async def serve(
+    exchange: LocalExchange,
+    host: str,
+    port: int,
+    competitors: int,
+    snapshot_interval: float,
+    pnl_interval: float,
+):
+    """
+    Serve the exchange until cancelled, starting trading once `competitors`
+    competitors have registered and then publishing snapshots and PnL updates
+    periodically
+    """
+    server = Server([ExchangeServicer(exchange)])
+    await server.start(host, port)
+    print(f" > Local exchange listening on {host}:{port}")
+
+    while len(exchange.competitors) < competitors:
+        await asyncio.sleep(0.1)
+    exchange.start_trading()
+    print(" > Trading started")
+
+    last_pnl = time.monotonic()
+    try:
+        while True:
+            await asyncio.sleep(snapshot_interval)
+            exchange.publish_snapshot()
+            if time.monotonic() - last_pnl >= pnl_interval:
+                exchange.publish_pnl()
+                last_pnl = time.monotonic()
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a local stand-in for the xchange exchange server"
+    )
+    parser.add_argument("case", choices=sorted(CASE_ASSETS), help="The case to run")
+    parser.add_argument("-t", "--host", type=str, default="localhost")
+    parser.add_argument("-p", "--port", type=int, default=9090)
+    parser.add_argument(
+        "-n",
+        "--competitors",
+        type=int,
+        default=1,
+        help="The number of competitors to wait for before trading starts",
+    )
+    parser.add_argument(
+        "--snapshot-interval",
+        type=float,
+        default=0.1,
+        help="Seconds between market snapshots (defaults to 0.1)",
+    )
+    parser.add_argument(
+        "--pnl-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between PnL updates (defaults to 1)",
+    )
+    parser.add_argument(
+        "--depth", type=int, default=10, help="Levels per side in snapshots"
+    )
+    args = parser.parse_args()
+
+    exchange = LocalExchange(
+        CASE_ASSETS[args.case],
+        snapshot_depth=args.depth,
+        position_limits=CASE_LIMITS.get(args.case),
+    )
+    try:
+        asyncio.run(
+            serve(
+                exchange,
+                args.host,
+                args.port,
+                args.competitors,
+                args.snapshot_interval,
+                args.pnl_interval,
+            )
+        )
+    except KeyboardInterrupt:
+        print(" > Keyboard interrupt received, terminating...")
+
+
+if __name__ == "__main__":
+    main()
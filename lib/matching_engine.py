@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# matching_engine.py - Price-time priority limit order books used by the local
+# stand-in exchange
+
+import collections
+
+from array import array
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+BID = 0
+ASK = 1
+
+
+class Order:
+    """A resting (or incoming) order. Prices are tick indices into the book"""
+
+    __slots__ = ("order_id", "owner", "asset", "side", "tick", "qty")
+
+    def __init__(
+        self, order_id: str, owner: str, asset: str, side: int, tick: int, qty: int
+    ):
+        self.order_id = order_id
+        self.owner = owner
+        self.asset = asset
+        self.side = side
+        self.tick = tick
+        self.qty = qty
+
+
+class Match(NamedTuple):
+    """A single execution between an incoming order and a resting order"""
+
+    resting: Order
+    tick: int
+    qty: int
+
+
+class OrderBook:
+    """
+    A limit order book for one asset. Price levels live in arrays indexed by
+    tick (price / tick size), each holding a FIFO of the orders resting there
+    and the aggregate quantity. Adding an order and matching at the touch are
+    O(1); only moving the best price past levels that have emptied scans the
+    arrays.
+    """
+
+    def __init__(self, asset: str, tick_size: float, max_price: float):
+        """
+        Args:
+            asset (str): The code of the asset traded in this book
+            tick_size (float): The minimum price increment
+            max_price (float): The highest price an order may be placed at
+        """
+        self.asset = asset
+        self.tick_size = tick_size
+        self.n_ticks = int(round(max_price / tick_size)) + 1
+
+        self._levels: Tuple[List[Optional[Deque[Order]]], ...] = (
+            [None] * self.n_ticks,
+            [None] * self.n_ticks,
+        )
+        self._qty = (
+            array("q", bytes(8 * self.n_ticks)),
+            array("q", bytes(8 * self.n_ticks)),
+        )
+
+        # The number of non-empty levels on each side
+        self.n_levels = [0, 0]
+
+        # The best bid is -1 and the best ask is n_ticks while that side is empty
+        self.best_bid = -1
+        self.best_ask = self.n_ticks
+
+    def to_tick(self, price: float) -> Optional[int]:
+        """The tick index of a price, or None if it is off the grid or out of range"""
+        scaled = price / self.tick_size
+        tick = int(round(scaled))
+        if abs(scaled - tick) > 1e-6 or not 0 < tick < self.n_ticks:
+            return None
+        return tick
+
+    def to_price(self, tick: int) -> float:
+        return tick * self.tick_size
+
+    def level_qty(self, side: int, tick: int) -> int:
+        return self._qty[side][tick]
+
+    def match(self, side: int, tick: int, qty: int) -> List[Match]:
+        """
+        Execute an incoming order against the opposite side of the book, up to
+        qty lots at prices no worse than tick. Emptied resting orders are
+        removed from the book. The incoming order is not added to the book.
+        """
+        matches: List[Match] = []
+        if side == BID:
+            levels, level_qty = self._levels[ASK], self._qty[ASK]
+            while qty > 0 and self.best_ask <= tick:
+                qty = self._match_level(levels, level_qty, self.best_ask, qty, matches)
+                if level_qty[self.best_ask] == 0:
+                    self.n_levels[ASK] -= 1
+                    self.best_ask = self._next_ask(self.best_ask + 1)
+        else:
+            levels, level_qty = self._levels[BID], self._qty[BID]
+            while qty > 0 and self.best_bid >= tick:
+                qty = self._match_level(levels, level_qty, self.best_bid, qty, matches)
+                if level_qty[self.best_bid] == 0:
+                    self.n_levels[BID] -= 1
+                    self.best_bid = self._next_bid(self.best_bid - 1)
+        return matches
+
+    def _match_level(
+        self,
+        levels: List[Optional[Deque[Order]]],
+        level_qty: array,
+        tick: int,
+        qty: int,
+        matches: List[Match],
+    ) -> int:
+        queue = levels[tick]
+        while qty > 0 and queue:
+            resting = queue[0]
+            traded = min(qty, resting.qty)
+            resting.qty -= traded
+            level_qty[tick] -= traded
+            qty -= traded
+            matches.append(Match(resting, tick, traded))
+            if resting.qty == 0:
+                queue.popleft()
+        return qty
+
+    def add(self, order: Order):
+        """Rest an order at the back of the queue for its price level"""
+        side, tick = order.side, order.tick
+        queue = self._levels[side][tick]
+        if queue is None:
+            queue = self._levels[side][tick] = collections.deque()
+        queue.append(order)
+        if self._qty[side][tick] == 0:
+            self.n_levels[side] += 1
+        self._qty[side][tick] += order.qty
+
+        if side == BID:
+            if tick > self.best_bid:
+                self.best_bid = tick
+        elif tick < self.best_ask:
+            self.best_ask = tick
+
+    def remove(self, order: Order):
+        """Take a resting order out of the book"""
+        side, tick = order.side, order.tick
+        self._levels[side][tick].remove(order)
+        self._qty[side][tick] -= order.qty
+
+        if self._qty[side][tick] == 0:
+            self.n_levels[side] -= 1
+            if side == BID and tick == self.best_bid:
+                self.best_bid = self._next_bid(tick - 1)
+            elif side == ASK and tick == self.best_ask:
+                self.best_ask = self._next_ask(tick + 1)
+
+    def _next_bid(self, tick: int) -> int:
+        if self.n_levels[BID] == 0:
+            return -1
+        level_qty = self._qty[BID]
+        while tick >= 0 and level_qty[tick] == 0:
+            tick -= 1
+        return tick
+
+    def _next_ask(self, tick: int) -> int:
+        if self.n_levels[ASK] == 0:
+            return self.n_ticks
+        level_qty = self._qty[ASK]
+        while tick < self.n_ticks and level_qty[tick] == 0:
+            tick += 1
+        return tick
+
+    def depth(self, side: int, n_levels: int) -> List[Tuple[int, int]]:
+        """The (tick, qty) of the best n_levels non-empty levels on a side"""
+        level_qty = self._qty[side]
+        out: List[Tuple[int, int]] = []
+        n_levels = min(n_levels, self.n_levels[side])
+        if side == BID:
+            tick, step, end = self.best_bid, -1, -1
+        else:
+            tick, step, end = self.best_ask, 1, self.n_ticks
+        while tick != end and len(out) < n_levels:
+            if level_qty[tick]:
+                out.append((tick, level_qty[tick]))
+            tick += step
+        return out
+
+    def mid(self) -> Optional[float]:
+        """The mid price, or None if either side of the book is empty"""
+        if self.best_bid < 0 or self.best_ask >= self.n_ticks:
+            return None
+        return (self.best_bid + self.best_ask) * self.tick_size / 2
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# oms.py - A local order management system: the bot's live orders, indexed by
+# order ID and by the (asset, side, level) slot a strategy quotes them in, kept
+# current from order responses and the update stream
+
+import collections
+
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import lib.proto.utc_bot as pb
+
+Slot = Tuple[str, int, int]
+
+# The most fills and cancels kept for orders whose responses haven't arrived,
+# and the most replaced or cancelled orders kept awaiting their cancel message
+_MAX_EARLY_UPDATES = 1024
+
+
+class Order:
+    """A live order: what was asked for and how much of it still rests"""
+
+    __slots__ = ("order_id", "asset", "side", "level", "px", "qty", "remaining")
+
+    def __init__(
+        self,
+        order_id: str,
+        asset: str,
+        side: pb.OrderSpecSide,
+        level: int,
+        px: Union[float, str],
+        qty: int,
+    ):
+        self.order_id = order_id
+        self.asset = asset
+        self.side = side
+        self.level = level
+        self.px = px
+        self.qty = qty
+        self.remaining = qty
+
+    @property
+    def slot(self) -> Slot:
+        return (self.asset, self.side, self.level)
+
+    @property
+    def filled(self) -> int:
+        return self.qty - self.remaining
+
+    def __repr__(self) -> str:
+        return (
+            f"Order({self.order_id!r}, {self.asset}, {self.side.name}, "
+            f"level {self.level}, {self.remaining}/{self.qty} @ {self.px})"
+        )
+
+
+class OrderManager:
+    """
+    Tracks the bot's resting orders so strategies never have to ask the
+    exchange. Each order occupies a slot (asset, side, level), where level is
+    whatever index the strategy quotes it under (e.g. 0 for its best bid);
+    placing or modifying into an occupied slot replaces the order there.
+
+    Responses to order requests are applied with on_response and
+    on_cancel_response, and the fill, order cancelled and request failed
+    messages of the update stream with on_fill, on_cancelled and
+    on_request_failed. Every update is O(1), and resting_qty is kept current
+    as they are applied.
+
+    Fills and cancels can arrive on the stream before the response that
+    carries their order's ID; they are held and applied once it arrives.
+    Orders dropped by a modify or cancel response are remembered until the
+    exchange's cancel message for them arrives, which is then ignored.
+    """
+
+    def __init__(self):
+        self.orders: Dict[str, Order] = {}
+        self._slots: Dict[Slot, Order] = {}
+        self._resting: Dict[Tuple[str, int], int] = collections.defaultdict(int)
+        # Remaining quantity (0 once cancelled) of orders not yet known
+        self._early: "collections.OrderedDict[str, int]" = collections.OrderedDict()
+        # Orders replaced by a modify or cancelled, whose cancel message is due
+        self._retired: "collections.OrderedDict[str, None]" = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __iter__(self) -> Iterator[Order]:
+        return iter(list(self.orders.values()))
+
+    def get(self, order_id: str) -> Optional[Order]:
+        return self.orders.get(order_id)
+
+    def at(self, asset: str, side: pb.OrderSpecSide, level: int) -> Optional[Order]:
+        """The live order in a slot, if any"""
+        return self._slots.get((asset, side, level))
+
+    def order_id(self, asset: str, side: pb.OrderSpecSide, level: int) -> Optional[str]:
+        """
+        The ID of the live order in a slot, to modify it, or None if the slot
+        is empty and a new order should be placed
+        """
+        order = self._slots.get((asset, side, level))
+        return order.order_id if order is not None else None
+
+    def resting_qty(self, asset: str, side: pb.OrderSpecSide) -> int:
+        """The total unfilled quantity of the live orders on one side of an asset"""
+        return self._resting.get((asset, side), 0)
+
+    def on_response(
+        self,
+        asset: str,
+        side: pb.OrderSpecSide,
+        level: int,
+        qty: int,
+        px: Union[float, str],
+        response: Union[pb.PlaceOrderResponse, pb.ModifyOrderResponse],
+    ) -> Optional[Order]:
+        """
+        Record the exchange's response to placing or modifying the order in a
+        slot. A successful response replaces the slot's order (a modify
+        cancels it on the exchange); a failed one leaves the slot as it was.
+
+        Returns:
+            Optional[Order]: The new order, or None if it isn't live
+        """
+        if not response.ok:
+            return None
+        replaced = self._slots.get((asset, side, level))
+        self._remove(replaced)
+        if replaced is not None and isinstance(response, pb.ModifyOrderResponse):
+            self._retire(replaced.order_id)
+
+        order = Order(response.order_id, asset, side, level, px, qty)
+        early = self._early.pop(order.order_id, None)
+        if early is not None:
+            order.remaining = min(early, qty)
+        if order.remaining <= 0:
+            return None
+        self.orders[order.order_id] = order
+        self._slots[order.slot] = order
+        self._resting[(asset, side)] += order.remaining
+        return order
+
+    def on_cancel_response(self, order_id: str, response: pb.CancelOrderResponse):
+        """Record the exchange's response to cancelling an order"""
+        order = self.orders.get(order_id)
+        if response.ok and order is not None:
+            self._remove(order)
+            self._retire(order_id)
+
+    def on_fill(self, msg: pb.FillMessage):
+        order = self.orders.get(msg.order_id)
+        if order is None:
+            if msg.order_id not in self._retired:
+                self._hold(msg.order_id, msg.remaining_qty)
+            return
+        self._resting[(order.asset, order.side)] -= order.remaining - msg.remaining_qty
+        order.remaining = msg.remaining_qty
+        if order.remaining <= 0:
+            self._remove(order)
+
+    def on_cancelled(self, msg: pb.OrderCancelledMessage):
+        for order_id in msg.order_ids:
+            order = self.orders.get(order_id)
+            if order_id in self._retired:
+                del self._retired[order_id]
+            elif order is None:
+                self._hold(order_id, 0)
+            else:
+                self._remove(order)
+
+    def on_request_failed(self, msg: pb.RequestFailedMessage):
+        """
+        Drop the order a failed request was for. A failed place or modify
+        means place_order_id never rested; a failed cancel means
+        cancel_order_id was no longer resting.
+        """
+        if msg.type == pb.RequestFailedMessageType.CANCEL:
+            order_id = msg.cancel_order_id
+        else:
+            order_id = msg.place_order_id
+        self._remove(self.orders.get(order_id))
+
+    def _remove(self, order: Optional[Order]):
+        if order is None:
+            return
+        del self.orders[order.order_id]
+        if self._slots.get(order.slot) is order:
+            del self._slots[order.slot]
+        self._resting[(order.asset, order.side)] -= order.remaining
+
+    def _retire(self, order_id: str):
+        retired = self._retired
+        retired[order_id] = None
+        if len(retired) > _MAX_EARLY_UPDATES:
+            retired.popitem(last=False)
+
+    def _hold(self, order_id: str, remaining: int):
+        early = self._early
+        early[order_id] = min(remaining, early.get(order_id, remaining))
+        if len(early) > _MAX_EARLY_UPDATES:
+            early.popitem(last=False)
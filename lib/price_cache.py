@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# price_cache.py - Bounded LRU caches for converting prices between the
+# exchange's strings and the values bots compute with, in both directions
+
+import collections
+
+from typing import Any, Callable, Dict, Generic, Hashable, NamedTuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups answered from the cache, 0 before any"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Memoizes a function of one hashable argument, keeping the maxsize most
+    recently used results. Calling the cache returns the function's result.
+    """
+
+    def __init__(self, compute: Callable[[K], V], maxsize: int = 4096):
+        """
+        Args:
+            compute (Callable[[K], V]): The function whose results are cached
+            maxsize (int): The most results kept. If 0, nothing is cached
+        """
+        if maxsize < 0:
+            raise ValueError(f"maxsize must be at least 0, not {maxsize}")
+        self._compute = compute
+        self._data: "collections.OrderedDict[K, V]" = collections.OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, key: K) -> V:
+        data = self._data
+        try:
+            value = data[key]
+        except KeyError:
+            self.misses += 1
+            value = self._compute(key)
+            if self.maxsize:
+                data[key] = value
+                if len(data) > self.maxsize:
+                    data.popitem(last=False)
+            return value
+        self.hits += 1
+        data.move_to_end(key)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        """Drop every cached result and reset the counters"""
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, len(self._data), self.maxsize)
+
+
+class PriceCache:
+    """
+    Converts prices between strings and values in both directions, caching
+    each direction separately. Prices on a tick grid repeat endlessly, so
+    after warming up almost every conversion is a dict lookup.
+
+    value(key) parses and string(key) formats; what a key is (e.g. a price
+    string, or an (asset, price string) pair) is up to parse and format.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[Hashable], Any],
+        format: Callable[[Hashable], str],
+        maxsize: int = 4096,
+    ):
+        """
+        Args:
+            parse (Callable[[Hashable], Any]): Converts a key holding a price
+            string to a value
+            format (Callable[[Hashable], str]): Converts a key holding a
+            value to a price string
+            maxsize (int): The most results kept per direction
+        """
+        self.value: LRUCache[Hashable, Any] = LRUCache(parse, maxsize)
+        self.string: LRUCache[Hashable, str] = LRUCache(format, maxsize)
+
+    @property
+    def stats(self) -> Dict[str, CacheStats]:
+        """The counters of each direction, keyed by "parse" and "format" """
+        return {"parse": self.value.stats, "format": self.string.stats}
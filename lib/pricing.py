@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# pricing.py - Black-Scholes prices and greeks for a whole option chain at once
+
+import math
+
+from typing import NamedTuple, Union
+
+import numpy as np
+
+ArrayLike = Union[float, np.ndarray]
+
+_MINUS_SQRT_HALF = -math.sqrt(0.5)
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+
+# numpy has no erf. For chains of a few dozen options calling math.erfc per
+# element is both exact and faster than evaluating a polynomial fit with
+# numpy ufuncs, whose cost is dominated by per-call overhead
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+
+class ChainGreeks(NamedTuple):
+    """
+    The theoretical price and greeks of every option in a chain, one array
+    element per option. Vega is per unit of volatility (1.00 = 100 vol points)
+    and theta is per year.
+    """
+
+    price: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+    theta: np.ndarray
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    """The standard normal CDF"""
+    return 0.5 * np.asarray(_erfc(x * _MINUS_SQRT_HALF), dtype=float)
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
+
+def black_scholes(
+    spot: ArrayLike,
+    strikes: ArrayLike,
+    is_call: ArrayLike,
+    years: ArrayLike,
+    vol: ArrayLike,
+) -> ChainGreeks:
+    """
+    Price European options on a non-dividend paying underlying with zero
+    interest rates, as in case 2. The arguments broadcast against each other,
+    so a chain is usually priced with a scalar spot, years and vol and arrays
+    of strikes and flags.
+
+    Options with no time or no volatility left are worth their intrinsic
+    value and have no gamma, vega or theta.
+
+    Args:
+        spot (ArrayLike): The price of the underlying
+        strikes (ArrayLike): The strike of each option
+        is_call (ArrayLike): True for calls and False for puts
+        years (ArrayLike): The time to expiry, in years
+        vol (ArrayLike): The annualized volatility of the underlying
+
+    Returns:
+        ChainGreeks: The price and greeks of each option
+    """
+    spot = np.asarray(spot, dtype=float)
+    strikes = np.asarray(strikes, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+
+    sqrt_years = np.sqrt(years)
+    stdev = np.asarray(vol, dtype=float) * sqrt_years
+    live = stdev > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = np.log(spot / strikes) / stdev + 0.5 * stdev
+        cdf_d1 = norm_cdf(d1)
+        pdf_d1 = norm_pdf(d1)
+
+        call = spot * cdf_d1 - strikes * norm_cdf(d1 - stdev)
+        # Put-call parity with zero rates
+        price = np.where(is_call, call, call - spot + strikes)
+        delta = np.where(is_call, cdf_d1, cdf_d1 - 1)
+        gamma = pdf_d1 / (spot * stdev)
+        vega = spot * pdf_d1 * sqrt_years
+        theta = -0.5 * spot * pdf_d1 * stdev / years
+
+    if not live.all():
+        intrinsic = np.where(is_call, spot - strikes, strikes - spot)
+        in_the_money = intrinsic > 0
+        price = np.where(live, price, np.maximum(intrinsic, 0.0))
+        delta = np.where(
+            live, delta, np.where(in_the_money, np.where(is_call, 1.0, -1.0), 0.0)
+        )
+        gamma = np.where(live, gamma, 0.0)
+        vega = np.where(live, vega, 0.0)
+        theta = np.where(live, theta, 0.0)
+
+    return ChainGreeks(price, delta, gamma, vega, theta)
+
+
+def bs_price(
+    flag: str, underlying_px: float, strike_px: float, years: float, vol: float
+) -> float:
+    """
+    The price of a single option, for code written against the scalar
+    signature of Case2ExampleBot.compute_options_price
+
+    Args:
+        flag (str): "C" for a call, "P" for a put
+        underlying_px (float): The price of the underlying
+        strike_px (float): The strike of the option
+        years (float): The time to expiry, in years
+        vol (float): The annualized volatility of the underlying
+    """
+    return float(black_scholes(underlying_px, strike_px, flag == "C", years, vol).price)
+
+
+class ImpliedVols(NamedTuple):
+    """
+    The result of solving for the implied volatility of each option. vol is
+    NaN wherever converged is False, e.g. for a missing (NaN) price or one
+    outside the no-arbitrage bounds.
+    """
+
+    vol: np.ndarray
+    converged: np.ndarray
+    # The number of Newton/bisection steps taken by the slowest option
+    iterations: int
+
+
+def implied_vol(
+    prices: ArrayLike,
+    spot: float,
+    strikes: ArrayLike,
+    is_call: ArrayLike,
+    years: float,
+    guess: ArrayLike = 0.3,
+    tol: float = 1e-6,
+    max_iter: int = 50,
+    min_vol: float = 1e-4,
+    max_vol: float = 5.0,
+) -> ImpliedVols:
+    """
+    Invert black_scholes for the volatility of every option at once. Each
+    step takes a Newton step using the vega of every unconverged option, and
+    falls back to bisecting a bracket of the root wherever the Newton step
+    would leave the bracket, so every option with an attainable price
+    converges. Options that fail are reported in the result instead of raising.
+
+    Args:
+        prices (ArrayLike): The price of each option, NaN if there is none
+        spot (float): The price of the underlying
+        strikes (ArrayLike): The strike of each option
+        is_call (ArrayLike): True for calls and False for puts
+        years (float): The time to expiry, in years
+        guess (ArrayLike): The starting volatility, per option or for all
+        tol (float): The largest acceptable pricing error
+        max_iter (int): The most steps to take before giving up
+        min_vol (float): The lowest volatility searched
+        max_vol (float): The highest volatility searched
+
+    Returns:
+        ImpliedVols: The volatility of each option and whether it converged
+    """
+    prices = np.asarray(prices, dtype=float)
+    strikes = np.asarray(strikes, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+    shape = np.broadcast(prices, strikes, is_call).shape
+
+    lo = np.full(shape, min_vol)
+    hi = np.full(shape, max_vol)
+    vol = np.clip(np.broadcast_to(np.asarray(guess, dtype=float), shape), lo, hi)
+    # A NaN guess (e.g. a strike that has never converged) starts mid-bracket
+    vol = np.where(np.isnan(vol), 0.5 * (min_vol + max_vol), vol)
+
+    # A price outside (intrinsic value, the most the option can be worth) has
+    # no implied volatility; neither has a missing price
+    intrinsic = np.maximum(np.where(is_call, spot - strikes, strikes - spot), 0.0)
+    upper = np.where(is_call, spot, strikes)
+    with np.errstate(invalid="ignore"):
+        active = (prices > intrinsic) & (prices < upper)
+    converged = np.zeros(shape, dtype=bool)
+
+    iterations = 0
+    while True:
+        greeks = black_scholes(spot, strikes, is_call, years, vol)
+        error = greeks.price - prices
+        done = active & (np.abs(error) <= tol)
+        converged |= done
+        # Give up where the bracket has collapsed without reaching the price,
+        # i.e. the price is only attainable outside [min_vol, max_vol]
+        active &= ~done & (hi - lo > 1e-12)
+        if iterations == max_iter or not active.any():
+            break
+
+        hi = np.where(active & (error > 0), vol, hi)
+        lo = np.where(active & (error < 0), vol, lo)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = vol - error / greeks.vega
+        inside = (newton > lo) & (newton < hi)
+        vol = np.where(active, np.where(inside, newton, 0.5 * (lo + hi)), vol)
+        iterations += 1
+
+    return ImpliedVols(np.where(converged, vol, np.nan), converged, iterations)
+
+
+class ImpliedVolSolver:
+    """
+    Solves for the implied volatilities of the same chain again and again,
+    starting each solve from the previous solution. Between two market
+    snapshots the implied volatilities barely move, so most solves converge
+    in one or two steps.
+    """
+
+    def __init__(
+        self,
+        strikes: ArrayLike,
+        is_call: ArrayLike,
+        initial_vol: float = 0.3,
+        **options,
+    ):
+        """
+        Args:
+            strikes (ArrayLike): The strike of each option in the chain
+            is_call (ArrayLike): True for calls and False for puts
+            initial_vol (float): The guess used until an option first converges
+            options: Passed on to implied_vol (tol, max_iter, min_vol, max_vol)
+        """
+        self.strikes = np.asarray(strikes, dtype=float)
+        self.is_call = np.asarray(is_call, dtype=bool)
+        self.options = options
+        self.guess = np.full(self.strikes.shape, initial_vol)
+
+    def solve(self, prices: ArrayLike, spot: float, years: float) -> ImpliedVols:
+        """Solve for the chain at the given prices. See implied_vol"""
+        result = implied_vol(
+            prices,
+            spot,
+            self.strikes,
+            self.is_call,
+            years,
+            guess=self.guess,
+            **self.options,
+        )
+        # Options that failed keep their last good solution as the next guess
+        self.guess = np.where(result.converged, result.vol, self.guess)
+        return result
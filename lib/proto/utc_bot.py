@@ -224,6 +224,22 @@ class LiquidationMessage(betterproto.Message):
     timestamp: str = betterproto.string_field(4)
 
 
+@dataclass
+class OrderCancelledMessage(betterproto.Message):
+    # The order IDs that were cancelled
+    order_ids: List[str] = betterproto.string_field(1)
+    # The Asset code that the order was cancelled for
+    asset: str = betterproto.string_field(2)
+    # Whether the cancellation was intentional (i.e. the result of a cancellation
+    # request by the user) or unintentional (e.g. due to a competitor going over
+    # their risk limits)
+    intentional: bool = betterproto.bool_field(3)
+    # If not intentional, a message detailing why the cancellation took effect
+    message: str = betterproto.string_field(4)
+    # Timestamp that market order was *initiated*
+    timestamp: str = betterproto.string_field(5)
+
+
 @dataclass
 class FeedMessage(betterproto.Message):
     """An update from the exchange"""
@@ -239,6 +255,9 @@ class FeedMessage(betterproto.Message):
     )
     liquidation_msg: "LiquidationMessage" = betterproto.message_field(6, group="msg")
     generic_msg: "GenericMessage" = betterproto.message_field(7, group="msg")
+    order_cancelled_msg: "OrderCancelledMessage" = betterproto.message_field(
+        8, group="msg"
+    )
 
 
 @dataclass
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# quotes.py - Moves a bot's resting orders to a target ladder of quotes with
+# the fewest order requests, skipping levels that are already quoted as wanted
+
+import time
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import lib.proto.utc_bot as pb
+from lib.oms import OrderManager
+from lib.utc_bot import OrderRequest, UTCBot
+
+# The (price, size) of one level of a ladder; a size of 0 means no order
+Quote = Tuple[Union[float, str], int]
+# A ladder for one side of one asset
+SideLadder = Tuple[str, pb.OrderSpecSide, Sequence[Quote]]
+
+
+class QuoteStats(NamedTuple):
+    placed: int
+    modified: int
+    cancelled: int
+    # Levels that were already quoted as wanted, so needed no request
+    saved: int
+
+
+class QuoteManager:
+    """
+    Quotes ladders through a bot, using its OrderManager to know what is
+    resting in each (asset, side, level) slot. A level whose order rests at
+    the wanted price with the wanted size is left alone, keeping its place in
+    the queue and saving a request; every other level is placed, modified or
+    cancelled as needed.
+
+    Prices are compared as given, so pass price strings from a TickGrid (or
+    always the same float for the same price).
+    """
+
+    def __init__(self, bot: UTCBot, oms: OrderManager):
+        """
+        Args:
+            bot (UTCBot): The bot that sends the order requests
+            oms (OrderManager): The bot's live orders, kept current by the bot
+        """
+        self.bot = bot
+        self.oms = oms
+        # The longest ladder quoted on each side of each asset, so levels a
+        # shorter ladder drops can be cancelled
+        self._depth: Dict[Tuple[str, int], int] = {}
+
+        self.placed = 0
+        self.modified = 0
+        self.cancelled = 0
+        self.saved = 0
+        # time.perf_counter() when the last batch of requests was sent
+        self.sent_at: Optional[float] = None
+
+    @property
+    def stats(self) -> QuoteStats:
+        return QuoteStats(self.placed, self.modified, self.cancelled, self.saved)
+
+    async def quote(self, asset: str, side: pb.OrderSpecSide, ladder: Sequence[Quote]):
+        """
+        Make the orders on one side of an asset match a ladder: level i of the
+        ladder is quoted in slot (asset, side, i), and any order in a slot
+        beyond the end of the ladder is cancelled
+
+        Args:
+            asset (str): The asset to quote
+            side (pb.OrderSpecSide): The side to quote
+            ladder (Sequence[Quote]): The (price, size) of each level, best first
+        """
+        await self.quote_all([(asset, side, ladder)])
+
+    async def quote_all(
+        self, ladders: Sequence[SideLadder], orders: Sequence[OrderRequest] = ()
+    ) -> int:
+        """
+        Quote several ladders (see quote), sending every request they need as
+        one batch
+
+        Args:
+            ladders (Sequence[SideLadder]): The (asset, side, ladder) to quote
+            orders (Sequence[OrderRequest]): Orders outside any ladder (e.g.
+            market order hedges) to send in the same batch. They take no slot,
+            so whatever of them rests isn't tracked
+
+        Returns:
+            int: The number of requests sent
+        """
+        oms = self.oms
+        requests: List[OrderRequest] = []
+        slots: List[Tuple[str, pb.OrderSpecSide, int]] = []
+        cancels: List[str] = []
+        for asset, side, ladder in ladders:
+            self._diff(asset, side, ladder, requests, slots, cancels)
+        # After the ladders' requests, so zipping responses with slots skips them
+        requests.extend(orders)
+        self.placed += len(orders)
+
+        if not requests and not cancels:
+            return 0
+        self.sent_at = time.perf_counter()
+        # One window for both kinds, so a requote never has more than the
+        # bot's max_orders_in_flight requests outstanding
+        responses, cancel_responses = await self.bot.submit_and_cancel(
+            requests, cancels
+        )
+        for (asset, side, level), request, response in zip(slots, requests, responses):
+            if request.order_id is None:
+                self.placed += 1
+            else:
+                self.modified += 1
+            oms.on_response(asset, side, level, request.qty, request.px, response)
+        for order_id, response in zip(cancels, cancel_responses):
+            self.cancelled += 1
+            oms.on_cancel_response(order_id, response)
+        return len(requests) + len(cancels)
+
+    def _diff(
+        self,
+        asset: str,
+        side: pb.OrderSpecSide,
+        ladder: Sequence[Quote],
+        requests: List[OrderRequest],
+        slots: List[Tuple[str, pb.OrderSpecSide, int]],
+        cancels: List[str],
+    ):
+        """Add the requests that move one side of an asset to a ladder"""
+        oms = self.oms
+        for level, (px, qty) in enumerate(ladder):
+            order = oms.at(asset, side, level)
+            if qty <= 0:
+                if order is not None:
+                    cancels.append(order.order_id)
+            elif order is None:
+                requests.append(
+                    OrderRequest(asset, pb.OrderSpecType.LIMIT, side, qty, px)
+                )
+                slots.append((asset, side, level))
+            elif order.px == px and order.remaining == qty:
+                self.saved += 1
+            else:
+                requests.append(
+                    OrderRequest(
+                        asset, pb.OrderSpecType.LIMIT, side, qty, px, order.order_id
+                    )
+                )
+                slots.append((asset, side, level))
+
+        depth = self._depth.get((asset, side), 0)
+        for level in range(len(ladder), depth):
+            order = oms.at(asset, side, level)
+            if order is not None:
+                cancels.append(order.order_id)
+        self._depth[(asset, side)] = max(depth, len(ladder))
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# rate_filter.py - A Kalman filter tracking each currency's latent interest rate
+# and the target it reverts to, calibrated offline from the case 1 data
+#
+# Calibrate from the repository root: python -m lib.rate_filter
+
+import argparse
+import json
+import math
+import os
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from lib.data_store import open_dataset
+
+DEFAULT_DATA_DIR = os.path.join("xchange", "xchange-v1.1.1", "data", "case1")
+DEFAULT_PARAMS_PATH = "rate_filter.json"
+
+
+class RateFilterParams(NamedTuple):
+    """
+    The model of one currency, per rate tick: the latent rate r reverts to
+    the target m as r' - m = phi * (r - m) + N(0, rate_var), the target
+    drifts as m' = m + N(0, target_var) between announcements, and each
+    observed rate is r + N(0, obs_var). The defaults are roughly what the
+    case 1 data calibrates to.
+    """
+
+    phi: float = 0.9
+    rate_var: float = 2.5e-6
+    target_var: float = 2e-7
+    obs_var: float = 2e-7
+
+
+class RateEstimate(NamedTuple):
+    """The filtered latent rate and target of a currency, with standard deviations"""
+
+    rate: float
+    target: float
+    rate_sd: float
+    target_sd: float
+
+
+def target_paths(
+    n_ticks: int,
+    announcements: Iterable[Tuple[int, str, float]],
+    currencies: Sequence[str],
+    times: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    The target in force at every tick, as a (ticks x currencies) array. NaN
+    before a currency's first announcement.
+
+    Args:
+        n_ticks (int): The number of ticks
+        announcements (Iterable[Tuple[int, str, float]]): (tick, currency, target)
+        currencies (Sequence[str]): The currency of each column
+        times (Optional[np.ndarray]): The ascending time of each tick, in the
+        announcements' units. Defaults to 0, 1, ..., n_ticks - 1
+    """
+    announcements = sorted(announcements)
+    ticks = np.arange(n_ticks) if times is None else times
+    paths = np.full((n_ticks, len(currencies)), np.nan)
+    for j, currency in enumerate(currencies):
+        times = np.array([t for t, c, _ in announcements if c == currency], dtype=int)
+        targets = np.array([x for _, c, x in announcements if c == currency])
+        if len(times) == 0:
+            continue
+        index = np.searchsorted(times, ticks, side="right") - 1
+        paths[:, j] = np.where(index >= 0, targets[np.maximum(index, 0)], np.nan)
+    return paths
+
+
+def calibrate(rates: np.ndarray, targets: np.ndarray) -> List[RateFilterParams]:
+    """
+    Fit the parameters of every currency at once from observed rates and the
+    targets in force, one column per currency.
+
+    The gap e = observed - target is an AR(1) plus white noise, so its
+    autocovariances are g0 = s + obs_var, g1 = phi * s and g2 = phi^2 * s,
+    with s the variance of the AR(1) part: phi = g2 / g1, and the rest
+    follows. target_var spreads the squared target moves over the ticks.
+
+    Args:
+        rates (np.ndarray): (ticks x currencies) observed rates
+        targets (np.ndarray): (ticks x currencies) targets, see target_paths
+
+    Returns:
+        List[RateFilterParams]: The parameters of each column
+    """
+    gap = rates - targets
+    known = ~np.isnan(gap)
+    gap = np.where(known, gap, 0.0)
+    counts = known.sum(axis=0)
+
+    def autocovariance(lag):
+        return (gap[lag:] * gap[: len(gap) - lag]).sum(axis=0) / (counts - lag)
+
+    g0, g1, g2 = autocovariance(0), autocovariance(1), autocovariance(2)
+    phi = np.clip(g2 / g1, 0.0, 0.999)
+    ar_var = np.minimum(g1 / phi, g0)
+    obs_var = np.maximum(g0 - ar_var, 1e-12)
+    rate_var = ar_var * (1 - phi * phi)
+    moves = np.diff(np.where(np.isnan(targets), np.nan, targets), axis=0)
+    target_var = np.nansum(moves * moves, axis=0) / counts
+
+    return [
+        RateFilterParams(*map(float, column))
+        for column in zip(phi, rate_var, target_var, obs_var)
+    ]
+
+
+def save_params(path: str, params: Dict[str, RateFilterParams]):
+    with open(path, "w") as f:
+        json.dump(
+            {currency: p._asdict() for currency, p in params.items()}, f, indent=2
+        )
+
+
+def load_params(path: str) -> Dict[str, RateFilterParams]:
+    with open(path) as f:
+        return {currency: RateFilterParams(**p) for currency, p in json.load(f).items()}
+
+
+class _State:
+    """The mean and covariance of one currency's (rate, target)"""
+
+    __slots__ = ("tick", "rate", "target", "p_rr", "p_rm", "p_mm")
+
+    def __init__(self, tick, rate, target, p_rr, p_rm, p_mm):
+        self.tick = tick
+        self.rate = rate
+        self.target = target
+        self.p_rr = p_rr
+        self.p_rm = p_rm
+        self.p_mm = p_mm
+
+
+class RateFilter:
+    """
+    Tracks the latent rate and the target it reverts to of each currency
+    from noisy rate observations and target announcements. Each update is a
+    constant-time 2-state Kalman step in plain floats, which for two states
+    is far cheaper than NumPy.
+
+    An announcement sets the target exactly, and moves the rate estimate by
+    however much it was correlated with the target estimate.
+    """
+
+    def __init__(self, params: Optional[Dict[str, RateFilterParams]] = None):
+        """
+        Args:
+            params (Optional[Dict[str, RateFilterParams]]): The parameters of
+            each currency; currencies without any use the defaults
+        """
+        self.params = params or {}
+        self._states: Dict[str, _State] = {}
+        # Targets announced before the currency's first observation
+        self._announced: Dict[str, float] = {}
+
+    def _params(self, currency: str) -> RateFilterParams:
+        params = self.params.get(currency)
+        return RateFilterParams() if params is None else params
+
+    def update(self, currency: str, tick: int, observed: float) -> RateEstimate:
+        """
+        Add an observed rate, predicting the state forward from the last
+        observation's tick first
+
+        Returns:
+            RateEstimate: The estimate after the observation
+        """
+        params = self._params(currency)
+        state = self._states.get(currency)
+        if state is None:
+            # Start at the observation, with the target at the announced one
+            # or, failing that, unknown around the observation
+            target = self._announced.pop(currency, None)
+            state = _State(
+                tick,
+                observed,
+                observed if target is None else target,
+                params.obs_var,
+                0.0,
+                params.rate_var / (1 - params.phi**2) if target is None else 0.0,
+            )
+            self._states[currency] = state
+            return self._estimate(state)
+
+        phi, rate_var, target_var = params.phi, params.rate_var, params.target_var
+        for _ in range(max(tick - state.tick, 0)):
+            # x' = F x with F = [[phi, 1 - phi], [0, 1]]; P' = F P F^T + Q
+            a, b = phi, 1 - phi
+            p_rr = a * a * state.p_rr + 2 * a * b * state.p_rm + b * b * state.p_mm
+            p_rm = a * state.p_rm + b * state.p_mm
+            state.rate = a * state.rate + b * state.target
+            state.p_rr = p_rr + rate_var
+            state.p_rm = p_rm
+            state.p_mm += target_var
+        state.tick = max(tick, state.tick)
+
+        # Observe r with noise obs_var
+        innovation = observed - state.rate
+        s = state.p_rr + params.obs_var
+        k_r, k_m = state.p_rr / s, state.p_rm / s
+        state.rate += k_r * innovation
+        state.target += k_m * innovation
+        state.p_mm -= k_m * state.p_rm
+        state.p_rm -= k_m * state.p_rr
+        state.p_rr -= k_r * state.p_rr
+        return self._estimate(state)
+
+    def announce(self, currency: str, target: float):
+        """Condition on the currency's target being exactly target"""
+        state = self._states.get(currency)
+        if state is None:
+            self._announced[currency] = target
+            return
+        if state.p_mm > 0:
+            gain = state.p_rm / state.p_mm
+            state.rate += gain * (target - state.target)
+            state.p_rr -= gain * state.p_rm
+        state.target = target
+        state.p_rm = 0.0
+        state.p_mm = 0.0
+
+    def estimate(self, currency: str) -> Optional[RateEstimate]:
+        """The current estimate of a currency, or None before it is observed"""
+        state = self._states.get(currency)
+        return None if state is None else self._estimate(state)
+
+    @staticmethod
+    def _estimate(state: _State) -> RateEstimate:
+        return RateEstimate(
+            state.rate,
+            state.target,
+            math.sqrt(max(state.p_rr, 0.0)),
+            math.sqrt(max(state.p_mm, 0.0)),
+        )
+
+
+def load_case1_csvs(
+    data_dir: str, currencies: Sequence[str]
+) -> Tuple[np.ndarray, List[Tuple[int, str, float]]]:
+    """
+    The (ticks x currencies) observed rates and the target announcements,
+    through the data directory's columnar file (see lib.data_store)
+    """
+    dataset = open_dataset(data_dir)
+    rates = dataset.table("interest_rates")
+    announcements = dataset.table("announcements")
+    return np.column_stack([rates[c] for c in currencies]), list(
+        zip(
+            announcements["Time"].tolist(),
+            announcements["Currency"].tolist(),
+            announcements["RateTarget"].tolist(),
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Calibrate the interest rate filter from the case 1 data"
+    )
+    parser.add_argument(
+        "--data", default=DEFAULT_DATA_DIR, help="The case 1 data directory"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=DEFAULT_PARAMS_PATH,
+        help=f"Where to write the parameters (defaults to {DEFAULT_PARAMS_PATH})",
+    )
+    args = parser.parse_args()
+
+    currencies = ["ROR", "HAP", "USD"]
+    rates, announcements = load_case1_csvs(args.data, currencies)
+    fitted = calibrate(rates, target_paths(len(rates), announcements, currencies))
+    params = dict(zip(currencies, fitted))
+    save_params(args.output, params)
+    for currency, p in params.items():
+        print(
+            f"{currency}: phi {p.phi:.4f}, rate sd {math.sqrt(p.rate_var):.6f}, "
+            f"target sd {math.sqrt(p.target_var):.6f}, obs sd {math.sqrt(p.obs_var):.6f}"
+        )
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
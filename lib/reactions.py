@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# reactions.py - Reactions to fed funds target announcements, precomputed for
+# every plausible next target so that reacting is a lookup
+
+from typing import Dict, Generic, List, Optional, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+class ReactionTable(Generic[T]):
+    """
+    Holds a precomputed reaction (e.g. the orders to send) for each plausible
+    next fed funds target of each currency. Targets move in whole steps
+    (0.0025 in case 1), so the plausible targets are the last one plus or
+    minus up to max_steps steps, and a target is looked up by its number of
+    steps, never by comparing floats.
+
+    Also records how long each reaction took from the announcement arriving
+    to its first order being sent.
+    """
+
+    def __init__(self, step: float = 0.0025, max_steps: int = 3):
+        """
+        Args:
+            step (float): The increment targets move in
+            max_steps (int): The largest move, in steps, to precompute for
+        """
+        self.step = step
+        self.max_steps = max_steps
+        self._reactions: Dict[str, Dict[int, T]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        # Seconds from each announcement to the first order of its reaction
+        self.latencies: List[float] = []
+
+    def candidates(self, current: float) -> np.ndarray:
+        """The plausible next targets after current, which is rounded to a step"""
+        steps = round(current / self.step) + np.arange(
+            -self.max_steps, self.max_steps + 1
+        )
+        return steps * self.step
+
+    def set(self, currency: str, targets: Sequence[float], reactions: Sequence[T]):
+        """Replace the reactions of a currency, one per target"""
+        steps = np.rint(np.asarray(targets) / self.step).astype(int).tolist()
+        self._reactions[currency] = dict(zip(steps, reactions))
+
+    def lookup(self, currency: str, target: float) -> Optional[T]:
+        """
+        The reaction to an announced target, or None if none was precomputed.
+        Only lookups for currencies with reactions count as hits or misses.
+        """
+        reactions = self._reactions.get(currency)
+        if reactions is None:
+            return None
+        reaction = reactions.get(round(target / self.step))
+        if reaction is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return reaction
+
+    def record_latency(self, seconds: float):
+        self.latencies.append(seconds)
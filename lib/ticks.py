@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# ticks.py - Integer tick prices: prices held as whole numbers of an asset's tick
+# size, converted to and from the exchange's decimal strings only at the wire
+
+from decimal import Decimal
+from typing import Dict, Tuple
+
+from lib.price_cache import CacheStats, PriceCache
+
+
+class TickGrid:
+    """
+    Converts prices of a set of assets between integer ticks and the decimal
+    strings the exchange sends and expects. Tick sizes are split into an
+    integer number of units of 10^-decimals (e.g. 0.00002 is 2 units of
+    10^-5), so parsing and formatting are exact integer arithmetic and a
+    price in ticks can never be off the grid.
+
+    Conversions in both directions go through a bounded LRU cache, since the
+    prices on a grid repeat endlessly; see cache_stats for its hit rates.
+    """
+
+    def __init__(self, tick_sizes: Dict[str, float], cache_size: int = 16384):
+        """
+        Args:
+            tick_sizes (Dict[str, float]): Map from asset code to tick size
+            cache_size (int): The most conversions cached in each direction.
+            If 0, nothing is cached
+        """
+        self.tick_sizes = dict(tick_sizes)
+        self._units: Dict[str, Tuple[int, int]] = {}
+        for asset, tick_size in tick_sizes.items():
+            # repr gives the shortest decimal that round-trips, e.g. "2e-05"
+            sign, digits, exponent = Decimal(repr(tick_size)).as_tuple()
+            if sign or exponent > 0:
+                raise ValueError(f"Bad tick size {tick_size!r} for {asset}")
+            units = int("".join(map(str, digits)))
+            self._units[asset] = (units, -exponent)
+        self._cache = PriceCache(
+            lambda key: self._parse(*key), lambda key: self._format(*key), cache_size
+        )
+
+    def to_ticks(self, asset: str, px: float) -> int:
+        """The nearest number of ticks to a price computed as a float"""
+        return round(px / self.tick_sizes[asset])
+
+    def to_price(self, asset: str, ticks: int) -> float:
+        return ticks * self.tick_sizes[asset]
+
+    def parse(self, asset: str, px: str) -> int:
+        """
+        The number of ticks of a price string from the exchange, e.g. a level
+        of a market snapshot, rounded to the nearest tick
+        """
+        return self._cache.value((asset, px))
+
+    def format(self, asset: str, ticks: int) -> str:
+        """The price string sent to the exchange for a number of ticks"""
+        return self._cache.string((asset, ticks))
+
+    @property
+    def cache_stats(self) -> Dict[str, CacheStats]:
+        """The hit counters of the "parse" and "format" caches"""
+        return self._cache.stats
+
+    def _parse(self, asset: str, px: str) -> int:
+        units, decimals = self._units[asset]
+        whole, _, frac = px.partition(".")
+        negative = whole.startswith("-")
+        # Keep every digit, including any past the tick precision, so the
+        # rounding below is to the nearest tick of the whole price
+        digits = max(len(frac), decimals)
+        scaled = abs(int(whole or "0")) * 10**digits + int(
+            frac.ljust(digits, "0") or "0"
+        )
+        step = units * 10 ** (digits - decimals)
+        ticks, remainder = divmod(scaled, step)
+        if 2 * remainder >= step:
+            ticks += 1
+        return -ticks if negative else ticks
+
+    def _format(self, asset: str, ticks: int) -> str:
+        units, decimals = self._units[asset]
+        scaled = ticks * units
+        sign = "-" if scaled < 0 else ""
+        whole, frac = divmod(abs(scaled), 10**decimals)
+        if not decimals:
+            return f"{sign}{whole}"
+        return f"{sign}{whole}.{frac:0{decimals}d}"
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# transport.py - The ways a UTCBot can reach an exchange: over gRPC, or by calling
+# a LocalExchange in the same process
+
+import abc
+import asyncio
+
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+from grpclib.const import Cardinality
+
+import lib.proto.utc_bot as pb
+from lib.channel_pool import ChannelPool
+from lib.feed_decoder import RawFeedMessage
+
+if TYPE_CHECKING:
+    # Only for annotations: bots on the real exchange shouldn't import the
+    # local server and its matching engine
+    from lib.local_exchange import LocalExchange
+
+
+class Transport(abc.ABC):
+    """
+    The calls a UTCBot makes to the exchange. Subclasses decide how requests
+    reach the exchange; every method takes and returns the same protobuf
+    messages as pb.ExchangeServiceStub.
+    """
+
+    # Whether updates arrive serialized, so stream_raw_messages is cheaper than
+    # stream_messages rather than an extra serialization of every update
+    native_raw_stream = False
+
+    @abc.abstractmethod
+    async def register(self, creds: pb.Credentials) -> pb.RegisterResponse: ...
+
+    @abc.abstractmethod
+    async def await_trading_start(
+        self, creds: pb.Credentials
+    ) -> pb.AwaitTradingStartResponse: ...
+
+    @abc.abstractmethod
+    def stream_messages(
+        self, creds: pb.Credentials
+    ) -> AsyncIterator[pb.FeedMessage]: ...
+
+    async def stream_raw_messages(self, creds: pb.Credentials) -> AsyncIterator[bytes]:
+        """
+        The update stream as serialized FeedMessages, for bots that decode
+        updates themselves (see lib.feed_decoder). By default every message of
+        stream_messages is serialized again.
+        """
+        async for update in self.stream_messages(creds):
+            yield bytes(update)
+
+    @abc.abstractmethod
+    async def place_order(
+        self, creds: pb.Credentials, order: pb.OrderSpec
+    ) -> pb.PlaceOrderResponse: ...
+
+    @abc.abstractmethod
+    async def modify_order(
+        self, creds: pb.Credentials, order_id: str, new_order: pb.OrderSpec
+    ) -> pb.ModifyOrderResponse: ...
+
+    @abc.abstractmethod
+    async def cancel_order(
+        self, creds: pb.Credentials, order_id: str
+    ) -> pb.CancelOrderResponse: ...
+
+    def defer_handled(self):
+        """
+        Called before reading the stream by a bot that handles updates some
+        time after reading them (e.g. through a SnapshotConflatingQueue). The
+        bot then calls mark_handled as it finishes handling each update,
+        instead of an update counting as handled once the next one is read.
+        Transports that don't track handling ignore both.
+        """
+
+    def mark_handled(self, count: int = 1):
+        """Record that count more updates of the stream have been handled"""
+
+    def close(self):
+        pass
+
+
+class GrpcTransport(Transport):
+    """Talks to an exchange server over gRPC, using the channels of a ChannelPool"""
+
+    native_raw_stream = True
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        order_channels: int = 0,
+        channel_selection: str = "round_robin",
+    ):
+        """
+        Args:
+            host (str): The IP Address or URL used to locate the exchange
+            port (int): The port that the exchange is running on
+            order_channels (int): The number of gRPC channels dedicated to
+            order requests. If 0, orders share the channel of the update stream
+            channel_selection (str): How an order channel is chosen for each
+            request, either "round_robin" or "least_busy"
+        """
+        self.channels = ChannelPool(host, port, order_channels, channel_selection)
+
+    async def register(self, creds: pb.Credentials) -> pb.RegisterResponse:
+        return await self.channels.stream_stub.register(creds=creds)
+
+    async def await_trading_start(
+        self, creds: pb.Credentials
+    ) -> pb.AwaitTradingStartResponse:
+        return await self.channels.stream_stub.await_trading_start(creds=creds)
+
+    def stream_messages(self, creds: pb.Credentials) -> AsyncIterator[pb.FeedMessage]:
+        return self.channels.stream_stub.stream_messages(creds=creds)
+
+    async def stream_raw_messages(self, creds: pb.Credentials) -> AsyncIterator[bytes]:
+        """The update stream with each message's bytes as received, undecoded"""
+        async with self.channels.stream_channel.request(
+            "/utc_bot.ExchangeService/StreamMessages",
+            Cardinality.UNARY_STREAM,
+            pb.StreamMessagesRequest,
+            RawFeedMessage,
+        ) as stream:
+            await stream.send_message(pb.StreamMessagesRequest(creds=creds), end=True)
+            async for data in stream:
+                yield data
+
+    async def place_order(
+        self, creds: pb.Credentials, order: pb.OrderSpec
+    ) -> pb.PlaceOrderResponse:
+        with self.channels.order_stub() as stub:
+            return await stub.place_order(creds=creds, order=order)
+
+    async def modify_order(
+        self, creds: pb.Credentials, order_id: str, new_order: pb.OrderSpec
+    ) -> pb.ModifyOrderResponse:
+        with self.channels.order_stub() as stub:
+            return await stub.modify_order(
+                creds=creds, order_id=order_id, new_order=new_order
+            )
+
+    async def cancel_order(
+        self, creds: pb.Credentials, order_id: str
+    ) -> pb.CancelOrderResponse:
+        with self.channels.order_stub() as stub:
+            return await stub.cancel_order(creds=creds, order_id=order_id)
+
+    def close(self):
+        self.channels.close()
+
+
+class InProcessTransport(Transport):
+    """
+    Drives a LocalExchange living in the same process. Feed messages are
+    handed to the bot as the exchange created them and order requests are
+    plain function calls, so nothing is serialized or sent over a socket.
+
+    Each update is marked done on the exchange's feed queue once the bot has
+    finished handling it, so whoever drives the exchange can wait for the bot
+    to catch up with LocalExchange.wait_handled(). By default that is when the
+    bot reads the next update; after defer_handled, it is when the bot calls
+    mark_handled.
+    """
+
+    def __init__(self, exchange: "LocalExchange"):
+        """
+        Args:
+            exchange (LocalExchange): The exchange to trade on
+        """
+        self.exchange = exchange
+        self._feed: "Optional[asyncio.Queue[Optional[pb.FeedMessage]]]" = None
+        self._deferred = False
+
+    async def register(self, creds: pb.Credentials) -> pb.RegisterResponse:
+        return self.exchange.register(creds)
+
+    async def await_trading_start(
+        self, creds: pb.Credentials
+    ) -> pb.AwaitTradingStartResponse:
+        return await self.exchange.await_trading_start(creds)
+
+    async def stream_messages(
+        self, creds: pb.Credentials
+    ) -> AsyncIterator[pb.FeedMessage]:
+        feed = self.exchange.open_feed(creds)
+        if feed is None:
+            return
+        self._feed = feed
+        while True:
+            update: Optional[pb.FeedMessage] = await feed.get()
+            if update is None:
+                feed.task_done()
+                break
+            try:
+                yield update
+            finally:
+                if not self._deferred:
+                    feed.task_done()
+
+    def defer_handled(self):
+        self._deferred = True
+
+    def mark_handled(self, count: int = 1):
+        if self._feed is not None:
+            for _ in range(count):
+                self._feed.task_done()
+
+    async def place_order(
+        self, creds: pb.Credentials, order: pb.OrderSpec
+    ) -> pb.PlaceOrderResponse:
+        return self.exchange.place_order(creds, order)
+
+    async def modify_order(
+        self, creds: pb.Credentials, order_id: str, new_order: pb.OrderSpec
+    ) -> pb.ModifyOrderResponse:
+        return self.exchange.modify_order(creds, order_id, new_order)
+
+    async def cancel_order(
+        self, creds: pb.Credentials, order_id: str
+    ) -> pb.CancelOrderResponse:
+        return self.exchange.cancel_order(creds, order_id)
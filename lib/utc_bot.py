@@ -4,19 +4,48 @@
 
 import argparse
 import asyncio
+import collections
+import itertools
 import random
 import sys
 import os
+import time
 import warnings
 
 
-from typing import Type, Dict, Any, Callable, Optional
+from typing import (
+    Type,
+    Dict,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Collection,
+    Callable,
+    Deque,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 import betterproto
 
-from grpclib.client import Channel
 from grpclib.exceptions import StreamTerminatedError
 
 import lib.proto.utc_bot as pb
+from lib.feed_decoder import (
+    FEED_MESSAGE_FIELDS,
+    FlatSnapshot,
+    decode_feed_message,
+    parse_feed_message,
+    peek_field,
+)
+from lib.price_cache import CacheStats, LRUCache
+from lib.transport import GrpcTransport, Transport
 
 
 class XChangeWarning(Warning):
@@ -46,13 +75,195 @@ def panic_exc_handler(
     return handler
 
 
+T = TypeVar("T")
+
+
+class OrderRequest(NamedTuple):
+    """
+    A single order sent as part of a batch (see UTCBot.submit_orders). If
+    order_id is set, the new order replaces that existing order like
+    UTCBot.modify_order does; otherwise a new order is placed.
+    """
+
+    asset_code: str
+    order_type: pb.OrderSpecType
+    order_side: pb.OrderSpecSide
+    qty: int
+    px: Optional[Union[float, str]] = None
+    order_id: Optional[str] = None
+
+
+def format_price(px: float) -> str:
+    """The price string of a price computed as a float"""
+    return f"{px:.8f}"
+
+
+Update = Union[pb.FeedMessage, FlatSnapshot]
+
+
+class _Queued:
+    """
+    A queued update and the number of stream messages merged into it. Holds
+    FlatSnapshots, which are immutable, so they can be merged into
+    """
+
+    __slots__ = ("update", "count")
+
+    def __init__(self, update: Update):
+        self.update = update
+        self.count = 1
+
+
+class SnapshotConflatingQueue:
+    """
+    A bounded FIFO of feed messages sitting between the exchange stream and the
+    bot's handler. A market snapshot that arrives while an older snapshot is
+    still waiting at the tail of the queue is merged into it, so the waiting
+    snapshot always carries the newest book for every asset. Once any other
+    message (fill, cancel, liquidation, generic message, ...) is queued behind
+    a snapshot, later snapshots are queued after it instead of merged, so the
+    bot never sees a book from after a message before that message. Nothing
+    is reordered or dropped; when the queue is full the producer waits instead.
+
+    Snapshots may be either pb.FeedMessages or FlatSnapshots from the fast
+    decoder.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        Args:
+            maxsize (int): The maximum number of messages waiting to be handled
+        """
+        self._maxsize = maxsize
+        self._queue: Deque[_Queued] = collections.deque()
+        self._pending_snapshot: Optional[_Queued] = None
+        self._cond = asyncio.Condition()
+        self._closed = False
+
+        # The number of snapshots that were merged into an older snapshot
+        # instead of being queued on their own
+        self.conflated = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    async def put(self, update: Update):
+        """Queue an update, merging it into a pending snapshot if possible"""
+        if isinstance(update, FlatSnapshot):
+            is_snapshot = True
+        else:
+            msg_type, value = betterproto.which_one_of(update, "msg")
+            is_snapshot = msg_type == "market_snapshot_msg"
+
+        async with self._cond:
+            if is_snapshot and self._pending_snapshot is not None:
+                pending = self._pending_snapshot
+                if isinstance(pending.update, FlatSnapshot):
+                    pending.update = pending.update.merged_with(update)
+                else:
+                    snapshot = pending.update.market_snapshot_msg
+                    snapshot.books.update(value.books)
+                    snapshot.timestamp = value.timestamp
+                pending.count += 1
+                self.conflated += 1
+                return
+
+            while len(self._queue) >= self._maxsize and not self._closed:
+                await self._cond.wait()
+
+            item = _Queued(update)
+            self._queue.append(item)
+            # Only a snapshot at the tail can be merged into without moving a
+            # newer book ahead of the messages queued after it
+            self._pending_snapshot = item if is_snapshot else None
+            self._cond.notify_all()
+
+    async def get(self) -> Optional[Update]:
+        """
+        Wait for the next update. Returns None once the queue has been closed
+        and everything queued before that has been handed out.
+        """
+        counted = await self.get_counted()
+        return None if counted is None else counted[0]
+
+    async def get_counted(self) -> Optional[Tuple[Update, int]]:
+        """Like get, but with the number of stream messages merged into the update"""
+        async with self._cond:
+            while not self._queue and not self._closed:
+                await self._cond.wait()
+
+            if not self._queue:
+                return None
+
+            item = self._queue.popleft()
+            if item is self._pending_snapshot:
+                self._pending_snapshot = None
+            self._cond.notify_all()
+            return item.update, item.count
+
+    async def close(self):
+        """Signal that no more updates will be put on the queue"""
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+# Kinds of update that are always checked for warnings, subscribed or not
+REQUIRED_KINDS = frozenset({"request_failed_msg", "liquidation_msg", "generic_msg"})
+
+_SNAPSHOT_FIELD = FEED_MESSAGE_FIELDS["market_snapshot_msg"]
+
+# The UTCBot method that handles each kind of update, passed the kind's message
+HOOKS = {
+    "request_failed_msg": "on_request_failed",
+    "pnl_msg": "on_pnl",
+    "trade_msg": "on_trade",
+    "fill_msg": "on_fill",
+    "market_snapshot_msg": "on_snapshot",
+    "liquidation_msg": "on_liquidation",
+    "generic_msg": "on_generic",
+    "order_cancelled_msg": "on_cancelled",
+}
+
+
+class HookStats(NamedTuple):
+    """How often the handler of one kind of update ran and for how long"""
+
+    hook: str
+    calls: int
+    seconds: float
+
+
 class UTCBot:
     """
     A bot that will trade in the 2021 UChicago Trading Competition. Should be
     subclassed by competitors when creating their bots.
     """
 
-    def __init__(self, username: str, key: str, host: str, port: int):
+    # The kinds of FeedMessage (names of its msg fields, e.g. "fill_msg") the
+    # bot handles. Updates of other kinds are skipped before they are decoded
+    # when the transport delivers them serialized. Request failures,
+    # liquidations and generic events other than MESSAGE are still decoded and
+    # warned about. If None, a bot that overrides handle_exchange_update gets
+    # every update, and any other bot gets the kinds it has on_* hooks for.
+    subscribed_kinds: Optional[Collection[str]] = None
+
+    def __init__(
+        self,
+        username: str,
+        key: str,
+        host: str,
+        port: int,
+        *,
+        conflate_snapshots: bool = False,
+        feed_queue_size: int = 1024,
+        max_orders_in_flight: int = 16,
+        order_channels: int = 0,
+        channel_selection: str = "round_robin",
+        transport: Optional[Transport] = None,
+        fast_decode: bool = False,
+        price_cache_size: int = 4096,
+    ):
         """
         Initializes the bot for trading in the 2021 UTC
 
@@ -61,14 +272,129 @@ class UTCBot:
             key (str): The private key used to identify the competitor
             host (str): The IP Address or URL used to locate the exchange
             port (int): The port that the exchange is running on
+            conflate_snapshots (bool): If true, read the update stream in a
+            separate task and only hand the newest book of each asset to
+            handle_exchange_update when the handler falls behind
+            feed_queue_size (int): The maximum number of unhandled updates kept
+            when conflating snapshots
+            max_orders_in_flight (int): The default maximum number of order
+            requests a batch keeps outstanding at once
+            order_channels (int): The number of gRPC channels dedicated to
+            order requests. If 0, orders share the channel of the update stream
+            channel_selection (str): How an order channel is chosen for each
+            request, either "round_robin" or "least_busy"
+            transport (Optional[Transport]): How to reach the exchange. Defaults
+            to gRPC to host:port; pass an InProcessTransport to trade against a
+            LocalExchange in the same process (host and port are then unused)
+            fast_decode (bool): If true, decode market snapshots by hand
+            into FlatSnapshots and pass them to handle_flat_snapshot instead of
+            having betterproto build them (see lib.feed_decoder)
+            price_cache_size (int): The most price strings of float order
+            prices kept for reuse. If 0, every price is formatted afresh
         """
         if username == "":
             username = f"{type(self).__name__}_{random.randrange(0, 10000):04}"
             print(f" > No username provided, using {username}")
 
         self.creds = pb.Credentials(username, key)
-        self._channel = Channel(host, port)
-        self._service_stub = pb.ExchangeServiceStub(self._channel)
+        self._transport = (
+            transport
+            if transport is not None
+            else GrpcTransport(host, port, order_channels, channel_selection)
+        )
+
+        self._conflate_snapshots = conflate_snapshots
+        self._fast_decode = fast_decode
+
+        self._feed_queue_size = feed_queue_size
+        self._feed_queue: Optional[SnapshotConflatingQueue] = None
+        self.max_orders_in_flight = max_orders_in_flight
+        self._price_strings = LRUCache(format_price, price_cache_size)
+
+        # Resolve the handler of every kind of update once, into a table
+        # indexed by the kind's oneof field number (0 is an empty message)
+        n_fields = max(FEED_MESSAGE_FIELDS.values()) + 1
+        self._hook_names = ["handle_exchange_update"] * n_fields
+        self._handlers: List[Callable[[pb.FeedMessage, Any], Awaitable[None]]] = [
+            self.__handle_update
+        ] * n_fields
+        hooked_kinds = []
+        for kind, hook in HOOKS.items():
+            if self.__overrides(hook):
+                field = FEED_MESSAGE_FIELDS[kind]
+                self._hook_names[field] = hook
+                self._handlers[field] = self.__hook_caller(getattr(self, hook))
+                hooked_kinds.append(kind)
+        if self.__overrides("handle_flat_snapshot"):
+            hooked_kinds.append("market_snapshot_msg")
+        self._hook_calls = [0] * n_fields
+        self._hook_seconds = [0.0] * n_fields
+
+        subscribed_kinds = self.subscribed_kinds
+        if subscribed_kinds is None and not self.__overrides("handle_exchange_update"):
+            subscribed_kinds = hooked_kinds
+        self._subscribed_fields: Optional[FrozenSet[int]] = None
+        if subscribed_kinds is not None:
+            unknown = set(subscribed_kinds) - FEED_MESSAGE_FIELDS.keys()
+            if unknown:
+                raise ValueError(f"Unknown FeedMessage kinds {sorted(unknown)}")
+            self._subscribed_fields = frozenset(
+                FEED_MESSAGE_FIELDS[kind] for kind in subscribed_kinds
+            )
+
+        # The number of updates not handed to the handlers because the bot
+        # isn't subscribed to their kind
+        self.updates_skipped = 0
+
+    def __overrides(self, method: str) -> bool:
+        return getattr(type(self), method) is not getattr(UTCBot, method)
+
+    @staticmethod
+    def __hook_caller(
+        hook: Callable[[Any], Awaitable[None]],
+    ) -> Callable[[pb.FeedMessage, Any], Awaitable[None]]:
+        def call(update: pb.FeedMessage, value: Any) -> Awaitable[None]:
+            return hook(value)
+
+        return call
+
+    def __handle_update(self, update: pb.FeedMessage, value: Any) -> Awaitable[None]:
+        return self.handle_exchange_update(update)
+
+    @property
+    def hook_stats(self) -> Dict[str, HookStats]:
+        """
+        The number of calls to and total time spent in the handler of each
+        kind of update that has been handled, keyed by kind. Flat snapshots
+        count as market_snapshot_msg.
+        """
+        return {
+            kind: HookStats(
+                self._hook_names[field],
+                self._hook_calls[field],
+                self._hook_seconds[field],
+            )
+            for kind, field in FEED_MESSAGE_FIELDS.items()
+            if self._hook_calls[field]
+        }
+
+    @property
+    def price_cache_stats(self) -> CacheStats:
+        """The hit counters of the cache of float order price strings"""
+        return self._price_strings.stats
+
+    def _wire_price(self, px: Optional[Union[float, str]]) -> str:
+        """The price field of an OrderSpec"""
+        if px is None:
+            return ""
+        if isinstance(px, str):
+            return px
+        return self._price_strings(px)
+
+    @property
+    def snapshots_conflated(self) -> int:
+        """The number of market snapshots merged into an older, unhandled one"""
+        return self._feed_queue.conflated if self._feed_queue is not None else 0
 
     async def place_order(
         self,
@@ -76,7 +402,7 @@ class UTCBot:
         order_type: pb.OrderSpecType,
         order_side: pb.OrderSpecSide,
         qty: int,
-        px: "Optional[float]" = None,
+        px: "Optional[Union[float, str]]" = None,
     ) -> pb.PlaceOrderResponse:
         """
         Place an order on the exchange
@@ -86,8 +412,9 @@ class UTCBot:
             order_type (pb.OrderSpecType): The type of order this is
             order_side (pb.OrderSpecSide): The side of the order
             qty (int): The # of lots of the asset to buy
-            px (Optional[float]): The price to buy/sell at. Not required if this
-            is a market order.
+            px (Optional[Union[float, str]]): The price to buy/sell at, or the
+            price string to send as is (see lib.ticks.TickGrid.format). Not
+            required if this is a market order.
 
         Returns:
             pb.PlaceOrderResponse The response from the exchange
@@ -98,14 +425,14 @@ class UTCBot:
                 f"Error placing order: order type was {order_type.name} but price was not specified"
             )
 
-        resp = await self._service_stub.place_order(
-            creds=self.creds,
-            order=pb.OrderSpec(
+        resp = await self._transport.place_order(
+            self.creds,
+            pb.OrderSpec(
                 type=order_type,
                 side=order_side,
                 asset=asset_code,
                 quantity=qty,
-                price=f"{px:.8f}" if px is not None else "",
+                price=self._wire_price(px),
             ),
         )
 
@@ -118,7 +445,7 @@ class UTCBot:
         order_type: pb.OrderSpecType,
         order_side: pb.OrderSpecSide,
         qty: int,
-        px: "Optional[float]" = None,
+        px: "Optional[Union[float, str]]" = None,
     ) -> pb.ModifyOrderResponse:
         """
         Modify an order that you've already placed (equivalent to atomic cancel + place)
@@ -129,8 +456,9 @@ class UTCBot:
             order_type (pb.OrderSpecType): The type of order this is
             order_side (pb.OrderSpecSide): The side of the order
             qty (int): The # of lots of the asset to buy
-            px (Optional[float]): The price to buy/sell at. Not required if this
-            is a market order.
+            px (Optional[Union[float, str]]): The price to buy/sell at, or the
+            price string to send as is (see lib.ticks.TickGrid.format). Not
+            required if this is a market order.
 
         Returns:
             pb.ModifyOrderResponse Whether the modify was successful and the full response
@@ -141,15 +469,15 @@ class UTCBot:
                 f"Error modifying order: order type was {order_type.name} but price was not specified"
             )
 
-        resp = await self._service_stub.modify_order(
-            creds=self.creds,
-            order_id=order_id,
-            new_order=pb.OrderSpec(
+        resp = await self._transport.modify_order(
+            self.creds,
+            order_id,
+            pb.OrderSpec(
                 type=order_type,
                 side=order_side,
                 asset=asset_code,
                 quantity=qty,
-                price=f"{px:.8f}" if px is not None else "",
+                price=self._wire_price(px),
             ),
         )
         return resp
@@ -165,17 +493,151 @@ class UTCBot:
             pb.CancelOrderResponse The response sent back from the exchange
         """
 
-        resp = await self._service_stub.cancel_order(
-            creds=self.creds, order_id=order_id
-        )
+        resp = await self._transport.cancel_order(self.creds, order_id)
 
         return resp
 
+    async def submit_orders(
+        self,
+        orders: Sequence[OrderRequest],
+        max_in_flight: Optional[int] = None,
+    ) -> List[Union[pb.PlaceOrderResponse, pb.ModifyOrderResponse]]:
+        """
+        Send a batch of orders concurrently rather than waiting for each
+        response before sending the next request
+
+        Args:
+            orders (Sequence[OrderRequest]): The orders to place (or modify, for
+            requests with an order_id)
+            max_in_flight (Optional[int]): The maximum number of requests
+            outstanding at once. Defaults to self.max_orders_in_flight
+
+        Returns:
+            List[Union[pb.PlaceOrderResponse, pb.ModifyOrderResponse]] The
+            responses from the exchange, in the same order as the requests
+        """
+
+        return await self._gather_limited(
+            (self._send_order(o) for o in orders), max_in_flight
+        )
+
+    async def cancel_orders(
+        self,
+        order_ids: Sequence[str],
+        max_in_flight: Optional[int] = None,
+    ) -> List[pb.CancelOrderResponse]:
+        """
+        Cancel a batch of orders concurrently
+
+        Args:
+            order_ids (Sequence[str]): The IDs of the orders to cancel
+            max_in_flight (Optional[int]): The maximum number of requests
+            outstanding at once. Defaults to self.max_orders_in_flight
+
+        Returns:
+            List[pb.CancelOrderResponse] The responses from the exchange, in the
+            same order as order_ids
+        """
+
+        return await self._gather_limited(
+            (self.cancel_order(order_id) for order_id in order_ids), max_in_flight
+        )
+
+    async def submit_and_cancel(
+        self,
+        orders: Sequence[OrderRequest],
+        order_ids: Sequence[str],
+        max_in_flight: Optional[int] = None,
+    ) -> Tuple[
+        List[Union[pb.PlaceOrderResponse, pb.ModifyOrderResponse]],
+        List[pb.CancelOrderResponse],
+    ]:
+        """
+        Send a batch of orders (see submit_orders) and cancels (see
+        cancel_orders) concurrently, with at most max_in_flight requests of
+        either kind outstanding at once
+
+        Returns:
+            Tuple[List[Union[pb.PlaceOrderResponse, pb.ModifyOrderResponse]],
+            List[pb.CancelOrderResponse]] The responses to the orders and to
+            the cancels, each in the same order as its requests
+        """
+        responses = await self._gather_limited(
+            itertools.chain(
+                (self._send_order(o) for o in orders),
+                (self.cancel_order(order_id) for order_id in order_ids),
+            ),
+            max_in_flight,
+        )
+        return responses[: len(orders)], responses[len(orders) :]
+
+    def _send_order(
+        self, o: OrderRequest
+    ) -> Awaitable[Union[pb.PlaceOrderResponse, pb.ModifyOrderResponse]]:
+        """Place the order, or modify it if the request has an order_id"""
+        if o.order_id is None:
+            return self.place_order(
+                o.asset_code, o.order_type, o.order_side, o.qty, o.px
+            )
+        return self.modify_order(
+            o.order_id, o.asset_code, o.order_type, o.order_side, o.qty, o.px
+        )
+
+    async def _gather_limited(
+        self, requests: Iterable[Awaitable[T]], max_in_flight: Optional[int]
+    ) -> List[T]:
+        """Await requests concurrently, keeping at most max_in_flight outstanding"""
+        limit = asyncio.Semaphore(max_in_flight or self.max_orders_in_flight)
+
+        async def send(request: Awaitable[T]) -> T:
+            async with limit:
+                return await request
+
+        return list(await asyncio.gather(*(send(request) for request in requests)))
+
     async def handle_exchange_update(self, update: pb.FeedMessage):
-        """Handle updates coming from the exchange"""
+        """
+        Handle updates coming from the exchange. Only called for kinds of
+        update that don't have an on_* hook overridden
+        """
         # TODO when you subclass this bot, you should implement this
         pass
 
+    async def on_request_failed(self, msg: pb.RequestFailedMessage):
+        """Handle an order request that failed"""
+
+    async def on_pnl(self, msg: pb.PnLMessage):
+        """Handle an update of the bot's PnL"""
+
+    async def on_trade(self, msg: pb.TradeMessage):
+        """Handle a trade between any two competitors"""
+
+    async def on_fill(self, msg: pb.FillMessage):
+        """Handle a fill of one of the bot's orders"""
+
+    async def on_snapshot(self, msg: pb.MarketSnapshotMessage):
+        """Handle a market snapshot"""
+
+    async def on_liquidation(self, msg: pb.LiquidationMessage):
+        """Handle the bot's position being liquidated"""
+
+    async def on_generic(self, msg: pb.GenericMessage):
+        """Handle a generic event (e.g. case data sent as a MESSAGE, round end)"""
+
+    async def on_cancelled(self, msg: pb.OrderCancelledMessage):
+        """Handle orders of the bot being cancelled"""
+
+    async def handle_flat_snapshot(self, snapshot: FlatSnapshot):
+        """
+        Handle a market snapshot decoded by the fast decoder. Only called if
+        the bot was created with fast_decode=True. Override this to read the
+        snapshot's arrays directly; by default the snapshot is rebuilt as a
+        pb.FeedMessage and passed to on_snapshot, or handle_exchange_update if
+        on_snapshot isn't overridden.
+        """
+        update = snapshot.to_message()
+        await self._handlers[_SNAPSHOT_FIELD](update, update.market_snapshot_msg)
+
     async def handle_round_started(self):
         """Handle a round being started. Is only called if registration was successful"""
         # TODO when you subclass this bot, you should implement this
@@ -191,7 +653,7 @@ class UTCBot:
         # Register the competitor on the exchange
         while True:
             try:
-                reg_resp = await self._service_stub.register(creds=self.creds)
+                reg_resp = await self._transport.register(self.creds)
                 break
             except OSError:
                 print(" > Unable to connect to exchange... Trying again in 5s")
@@ -206,7 +668,7 @@ class UTCBot:
 
         # Wait for the case to start
         # TODO: is it necessary to add a timeout here? Needs to be tested
-        start_resp = await self._service_stub.await_trading_start(creds=self.creds)
+        start_resp = await self._transport.await_trading_start(self.creds)
         if not start_resp.started:
             print(
                 " > Unable to await case start: likely due to request timeout or round ending"
@@ -219,17 +681,100 @@ class UTCBot:
         await self.handle_round_started()
 
         # Request and update stream from the exchange
-        update_stream = self._service_stub.stream_messages(creds=self.creds)
-        async for update in update_stream:
-            self.__check_message(update)
-            await self.handle_exchange_update(update)
+        if self._fast_decode or (
+            self._subscribed_fields is not None and self._transport.native_raw_stream
+        ):
+            update_stream = self.__decode_stream(
+                self._transport.stream_raw_messages(self.creds)
+            )
+        else:
+            update_stream = self._transport.stream_messages(self.creds)
+        if not self._conflate_snapshots:
+            async for update in update_stream:
+                await self.__dispatch(update)
+        else:
+            self._feed_queue = SnapshotConflatingQueue(self._feed_queue_size)
+            await self.__handle_conflated(update_stream, self._feed_queue)
+
+    def __mark_skipped(self):
+        """Acknowledge an update that is dropped before reaching any handler"""
+        self.updates_skipped += 1
+        if self._conflate_snapshots:
+            self._transport.mark_handled()
+
+    async def __handle_conflated(self, update_stream, queue: SnapshotConflatingQueue):
+        """
+        Drain the update stream into the conflating queue from a reader task
+        while this task hands the queued updates to handle_exchange_update.
+        The transport is told an update was handled only once its handler has
+        returned, not when the reader queued it
+        """
+        self._transport.defer_handled()
 
-    def __check_message(self, update: pb.FeedMessage):
+        async def read_updates():
+            try:
+                async for update in update_stream:
+                    await queue.put(update)
+            finally:
+                await queue.close()
+
+        reader = asyncio.ensure_future(read_updates())
+        try:
+            while True:
+                counted = await queue.get_counted()
+                if counted is None:
+                    break
+                update, count = counted
+                await self.__dispatch(update)
+                self._transport.mark_handled(count)
+            await reader
+        finally:
+            reader.cancel()
+
+    async def __decode_stream(self, raw_stream) -> AsyncIterator[Update]:
+        """
+        Decode a stream of serialized updates, dropping those of unsubscribed
+        kinds by their oneof field number before decoding anything
+        """
+        decode = decode_feed_message if self._fast_decode else parse_feed_message
+        wanted = self._subscribed_fields
+        if wanted is not None:
+            wanted = wanted | {FEED_MESSAGE_FIELDS[kind] for kind in REQUIRED_KINDS}
+        async for data in raw_stream:
+            if wanted is not None and peek_field(data) not in wanted:
+                self.__mark_skipped()
+                continue
+            yield decode(data)
+
+    async def __dispatch(self, update: Update):
+        """
+        Hand an update to the handler for its kind. The oneof is resolved
+        once here and the handler looked up by field number
+        """
+        started = time.perf_counter()
+        if isinstance(update, FlatSnapshot):
+            field = _SNAPSHOT_FIELD
+            await self.handle_flat_snapshot(update)
+        else:
+            msg_type, value = betterproto.which_one_of(update, "msg")
+            field = FEED_MESSAGE_FIELDS.get(msg_type, 0)
+            if msg_type in REQUIRED_KINDS:
+                self.__check_message(update, msg_type)
+            if (
+                self._subscribed_fields is not None
+                and field not in self._subscribed_fields
+            ):
+                self.updates_skipped += 1
+                return
+            await self._handlers[field](update, value)
+        self._hook_calls[field] += 1
+        self._hook_seconds[field] += time.perf_counter() - started
+
+    def __check_message(self, update: pb.FeedMessage, msg_type: str):
         """
         Check if the message is something concerning. If it is, print out a warning to the console
         to let competitors know
         """
-        msg_type, _ = betterproto.which_one_of(update, "msg")
         if msg_type == "request_failed_msg":
             warnings.warn(
                 "REQUEST_DENIED: " + update.request_failed_msg.message,
@@ -250,7 +795,7 @@ class UTCBot:
 
     def cleanup(self):
         """Cleans up any loose ends"""
-        self._channel.close()
+        self._transport.close()
 
 
 def __formatwarning(message, category, filename, lineno, line=None):
@@ -305,8 +850,42 @@ def start_bot(bot_type: Type[UTCBot]):
         help="The port of the competitor gRPC server (defaults to 9090)",
     )
 
+    parser.add_argument(
+        "--conflate",
+        action="store_true",
+        help="Only handle the newest market snapshot of each asset when the bot falls behind the feed",
+    )
+
+    parser.add_argument(
+        "--fast-decode",
+        action="store_true",
+        help="Decode market snapshots by hand instead of with betterproto (see lib/feed_decoder.py)",
+    )
+
+    parser.add_argument(
+        "--order-channels",
+        type=int,
+        default=0,
+        help="The number of gRPC channels dedicated to order requests (defaults to 0, sharing the update stream's channel)",
+    )
+    parser.add_argument(
+        "--channel-selection",
+        choices=["round_robin", "least_busy"],
+        default="round_robin",
+        help="How an order channel is chosen for each request (defaults to round_robin)",
+    )
+
     args = parser.parse_args()
-    bot = bot_type(args.username, args.key, args.host, args.port)
+    bot = bot_type(
+        args.username,
+        args.key,
+        args.host,
+        args.port,
+        conflate_snapshots=args.conflate,
+        order_channels=args.order_channels,
+        channel_selection=args.channel_selection,
+        fast_decode=args.fast_decode,
+    )
 
     loop = asyncio.get_event_loop()
     loop.set_exception_handler(panic_exc_handler(bot.cleanup))
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# sweep_case1.py - Backtests PositionTrackerBot over a grid or random sample of
+# its market making parameters, one simulated round per worker process
+#
+# Run from the repository root, e.g.
+#   python sweep_case1.py edge=0.003,0.005,0.008 size=5,10
+#   python sweep_case1.py --samples 50 edge=0.002:0.01 limit=50:150
+#
+# Results are appended to a JSON lines file as each round finishes; running
+# the same sweep again skips the combinations it already has.
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+import warnings
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from backtest_case1 import DEFAULT_DATA_DIR, Case1Data, load_case1_data, run_backtest
+from case1 import DEFAULT_PARAMS, PositionTrackerBot
+from lib.backtest import SharedArray, SimulatedClock, map_shared, quiet, share_array
+from lib.data_store import open_dataset
+from lib.local_exchange import CASE_ASSETS, CASE_LIMITS, LocalExchange
+from lib.transport import InProcessTransport
+from lib.utc_bot import XChangeWarning
+
+DEFAULT_RESULTS = "sweep_case1.jsonl"
+
+Value = Union[int, float]
+Params = Dict[str, Value]
+
+
+def _parse_value(text: str) -> Value:
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_spec(spec: str) -> Tuple[str, Union[List[Value], Tuple[Value, Value]]]:
+    """
+    Parse NAME=V1,V2,... (values to choose from) or NAME=LOW:HIGH (a range to
+    sample uniformly, in integers if both bounds are integers)
+    """
+    name, sep, values = spec.partition("=")
+    if not sep or not values:
+        raise ValueError(f"Expected NAME=VALUES, got {spec!r}")
+    if name not in DEFAULT_PARAMS:
+        raise ValueError(
+            f"Unknown parameter {name!r}, expected one of {list(DEFAULT_PARAMS)}"
+        )
+    if ":" in values:
+        low, _, high = values.partition(":")
+        return name, (_parse_value(low), _parse_value(high))
+    return name, [_parse_value(value) for value in values.split(",")]
+
+
+def combinations(
+    specs: Sequence[str], samples: int = 0, sample_seed: int = 0
+) -> List[Params]:
+    """
+    The parameter combinations to run: every combination of the specs' values,
+    or samples random draws from them. Draws are seeded so the same sweep
+    always draws the same combinations, which is what lets it resume.
+    """
+    parsed = [parse_spec(spec) for spec in specs]
+    names = [name for name, _ in parsed]
+    if not samples:
+        for name, values in parsed:
+            if isinstance(values, tuple):
+                raise ValueError(f"{name} is a range; pass --samples to sample it")
+        return [
+            dict(zip(names, combo))
+            for combo in itertools.product(*(values for _, values in parsed))
+        ]
+
+    rng = random.Random(sample_seed)
+    combos = []
+    for _ in range(samples):
+        combo = {}
+        for name, values in parsed:
+            if isinstance(values, list):
+                combo[name] = rng.choice(values)
+            elif isinstance(values[0], int) and isinstance(values[1], int):
+                combo[name] = rng.randint(*values)
+            else:
+                combo[name] = rng.uniform(*values)
+        combos.append(combo)
+    return combos
+
+
+def run_key(params: Params, settings: Dict) -> str:
+    """Identifies a round, for skipping the ones a results file already has"""
+    return json.dumps({"params": params, **settings}, sort_keys=True)
+
+
+def read_results(path: str) -> List[Dict]:
+    """
+    The records in a results file. A line cut short by an interrupted write is
+    dropped from the file, so appending to it afterwards is safe.
+    """
+    if not os.path.exists(path):
+        return []
+    records, valid = [], True
+    with open(path) as f:
+        lines = f.readlines()
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            valid = False
+    if not valid or (lines and not lines[-1].endswith("\n")):
+        with open(path, "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+    return records
+
+
+###
+# Worker processes
+###
+
+# Set in each worker by _init_worker
+_data: Optional[Case1Data] = None
+_shm: Optional[shared_memory.SharedMemory] = None
+_settings: Dict = {}
+
+
+def _init_worker(
+    rates: SharedArray, announcements: List[Tuple[int, str, float]], settings: Dict
+):
+    global _data, _shm, _settings
+    # Map the parent's rates instead of copying or re-reading them
+    shared_rates, _shm = map_shared(rates)
+    _data = Case1Data(shared_rates, announcements)
+    _settings = settings
+
+
+def _run_round(params: Params) -> Dict:
+    clock = SimulatedClock()
+    exchange = LocalExchange(
+        CASE_ASSETS["case1"], clock=clock, position_limits=CASE_LIMITS["case1"]
+    )
+    bot = PositionTrackerBot(
+        "backtest",
+        "password",
+        "",
+        0,
+        transport=InProcessTransport(exchange),
+        params=params,
+    )
+    # Keep the bot's output and exchange warnings (ROUND_ENDED, denied
+    # cancels) from interleaving across workers
+    with quiet(), warnings.catch_warnings():
+        warnings.simplefilter("ignore", XChangeWarning)
+        result = asyncio.run(
+            run_backtest(
+                bot,
+                exchange,
+                clock,
+                _data,
+                _settings["spot_vol"],
+                _settings["seed"],
+                _settings["ticks"],
+            )
+        )
+    return {
+        "params": params,
+        **_settings,
+        "m2m_pnl": result.m2m_pnl,
+        "realized_pnl": result.realized_pnl,
+        "fills": result.fills,
+        "trades": result.trades,
+        "elapsed": result.elapsed,
+    }
+
+
+def run_sweep(
+    data: Case1Data,
+    combos: Sequence[Params],
+    settings: Dict,
+    results_path: str = DEFAULT_RESULTS,
+    workers: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Backtest every combination not already in the results file in a pool of
+    worker processes, appending each result to the file as it finishes. The
+    rates are shared with the workers once (see lib.backtest.share_array).
+
+    Args:
+        data (Case1Data): The round's rates and announcements
+        combos (Sequence[Params]): The parameter overrides of each round
+        settings (Dict): The seed, spot_vol and ticks of run_backtest, and
+        the key of the dataset data was loaded from
+        results_path (str): The JSON lines file of results
+        workers (Optional[int]): The number of processes. Defaults to one per CPU
+
+    Returns:
+        List[Dict]: The records of this sweep's combinations, old and new
+    """
+    records = {
+        run_key(record["params"], {name: record.get(name) for name in settings}): record
+        for record in read_results(results_path)
+    }
+    wanted = {run_key(params, settings): params for params in combos}
+    pending = [params for key, params in wanted.items() if key not in records]
+    print(
+        f"Rounds:       {len(pending)} to run, "
+        f"{len(wanted) - len(pending)} already in {results_path}"
+    )
+
+    if pending:
+        with share_array(data.rates) as rates, open(results_path, "a") as out:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(rates, data.announcements, settings),
+            )
+            try:
+                futures = [pool.submit(_run_round, params) for params in pending]
+                for done, future in enumerate(as_completed(futures), 1):
+                    record = future.result()
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+                    records[run_key(record["params"], settings)] = record
+                    print(
+                        f"  [{done}/{len(pending)}] {record['params']} m2m {record['m2m_pnl']:.2f}"
+                    )
+            finally:
+                pool.shutdown(cancel_futures=True)
+
+    return [record for key, record in records.items() if key in wanted]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sweep PositionTrackerBot's parameters over the case 1 round"
+    )
+    parser.add_argument(
+        "params",
+        nargs="+",
+        help=f"NAME=V1,V2,... or NAME=LOW:HIGH (with --samples) for any of {', '.join(DEFAULT_PARAMS)}",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=0,
+        help="Draw this many random combinations instead of a grid",
+    )
+    parser.add_argument(
+        "--sample-seed", type=int, default=0, help="Seed of the random combinations"
+    )
+    parser.add_argument(
+        "--data", default=DEFAULT_DATA_DIR, help="The case 1 data directory"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the spot rate paths"
+    )
+    parser.add_argument(
+        "--spot-vol", type=float, default=0.002, help="Spot volatility per tick"
+    )
+    parser.add_argument(
+        "--ticks", type=int, default=0, help="Only run the first TICKS ticks"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "-o",
+        "--results",
+        default=DEFAULT_RESULTS,
+        help=f"Results file to append to (defaults to {DEFAULT_RESULTS})",
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="The number of best combinations to show"
+    )
+    args = parser.parse_args()
+
+    combos = combinations(args.params, args.samples, args.sample_seed)
+    # Results are only reused for the same data, by the hash of its CSVs
+    settings = {
+        "data": open_dataset(args.data).key,
+        "seed": args.seed,
+        "spot_vol": args.spot_vol,
+        "ticks": args.ticks,
+    }
+    data = load_case1_data(args.data)
+
+    started = time.perf_counter()
+    try:
+        records = run_sweep(data, combos, settings, args.results, args.workers)
+    except KeyboardInterrupt:
+        print(" > Keyboard interrupt received; run the same sweep again to resume")
+        return
+    elapsed = time.perf_counter() - started
+
+    records.sort(key=lambda record: record["m2m_pnl"], reverse=True)
+    print(f"Best of {len(records)}:")
+    for record in records[: args.top]:
+        print(
+            f"  m2m {record['m2m_pnl']:12.2f}  realized {record['realized_pnl']:10.2f}  "
+            f"fills {record['fills']:6d}  {record['params']}"
+        )
+    print(f"Elapsed:      {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()